@@ -86,10 +86,49 @@ def create_app(config_class=Config):
         from .startup_builder import builder_bp
         from .startup_builder import builder_bp
         app.register_blueprint(builder_bp)
+        from .startup_builder import preview_bp
+        app.register_blueprint(preview_bp)
         
         # Import sockets to register events
         from .startup_builder import sockets
 
+        import threading
+        from .startup_builder.routes import manager as builder_manager
+        from .startup_builder.manager import warm_pool, STACK_LABEL
+        from .startup_builder.hibernation import hibernator
+        from .startup_builder.admission import admission
+        from .startup_builder.pkgcache import package_caches
+        from .startup_builder.templates import project_templates
+        from .startup_builder.snapshots import workspace_snapshots
+        from .startup_builder.gateway import preview_gateway
+        from .startup_builder.asyncengine import docker_loop
+        from .startup_builder.llmcache import llm_cache
+        from .startup_builder.stepdag import step_scheduler
+        from .startup_builder.taskscheduler import task_scheduler
+        from .startup_builder.contextbudget import context_builder
+        warm_pool.configure(app.config.get('BUILDER_WARM_POOL_SIZES', {}), max_total=app.config.get('BUILDER_WARM_POOL_MAX', 10))
+        admission.configure(app.config.get('BUILDER_HOST_CPUS', 0), app.config.get('BUILDER_HOST_MEMORY_MB', 0), app.config.get('BUILDER_HOST_RESERVE', 0.1),
+                            app.config.get('BUILDER_ADMISSION_TIMEOUT', 1800))
+        hibernator.configure(app.config.get('BUILDER_IDLE_PAUSE_SECONDS', 0), app.config.get('BUILDER_IDLE_STOP_SECONDS', 0))
+        package_caches.configure(app.config.get('BUILDER_PACKAGE_CACHE_MB', 0))
+        project_templates.configure(app.config.get('BUILDER_TEMPLATE_DIR'))
+        workspace_snapshots.configure(app.config.get('BUILDER_SNAPSHOT_DIR'), keep=app.config.get('BUILDER_SNAPSHOT_KEEP', 20))
+        llm_cache.configure(
+            app.config.get('BUILDER_LLM_CACHE_PATH'), ttl=app.config.get('BUILDER_LLM_CACHE_TTL', 604800),
+            max_entries=app.config.get('BUILDER_LLM_CACHE_MAX_ENTRIES', 5000), nodes=app.config.get('BUILDER_LLM_CACHE_NODES')
+        )
+        step_scheduler.configure(app.config.get('BUILDER_STEP_PARALLELISM', 1))
+        task_scheduler.configure(app.config.get('BUILDER_TASK_WORKERS', 1))
+        context_builder.configure(app.config.get('BUILDER_CONTEXT_TOKENS', 8000), app.config.get('BUILDER_CONTEXT_BUDGETS'))
+        docker_loop.configure(app.config.get('BUILDER_DOCKER_CONCURRENCY', 64))
+        preview_gateway.configure(app.config.get('BUILDER_PREVIEW_PUBLISHED_PORTS', False))
+        if app.config.get('BUILDER_PREBUILD_IMAGES'):
+            threading.Thread(target=builder_manager.prebuild_images, daemon=True).start()
+        for docker_client in builder_manager.daemons.clients():
+            warm_pool.start(docker_client)
+            hibernator.start(docker_client, STACK_LABEL, exclude_prefixes=(warm_pool.NAME_PREFIX,))
+            package_caches.start(docker_client)
+
 
         # Import tasks so that they are registered with Celery
         from . import tasks
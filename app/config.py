@@ -58,6 +58,50 @@ class Config:
     # Session Configuration
     SESSION_TYPE = os.getenv('SESSION_TYPE', 'sqlalchemy')
 
+    # Startup Builder Configuration
+    # Build stack images in the background at startup so the first environment doesn't wait
+    BUILDER_PREBUILD_IMAGES = os.getenv('BUILDER_PREBUILD_IMAGES', 'False') == 'True'
+    # Idle pre-started containers per stack, e.g. "MERN=2,NextJS=1,Python-Data=1" (empty disables the pool)
+    BUILDER_WARM_POOL_SIZES = {
+        stack.strip(): int(size)
+        for stack, size in (entry.split('=') for entry in os.getenv('BUILDER_WARM_POOL_SIZES', '').split(',') if '=' in entry)
+    }
+    BUILDER_WARM_POOL_MAX = int(os.getenv('BUILDER_WARM_POOL_MAX', 10))
+    # Idle builder containers are paused, then stopped, after these many seconds (0 disables)
+    BUILDER_IDLE_PAUSE_SECONDS = int(os.getenv('BUILDER_IDLE_PAUSE_SECONDS', 1800))
+    BUILDER_IDLE_STOP_SECONDS = int(os.getenv('BUILDER_IDLE_STOP_SECONDS', 14400))
+    # Capacity of each Docker daemon for builds and agent runs (0 = detect from Docker), minus a reserved fraction
+    BUILDER_HOST_CPUS = float(os.getenv('BUILDER_HOST_CPUS', 0))
+    BUILDER_HOST_MEMORY_MB = int(os.getenv('BUILDER_HOST_MEMORY_MB', 0))
+    BUILDER_HOST_RESERVE = float(os.getenv('BUILDER_HOST_RESERVE', 0.1))
+    # Seconds a build or agent run waits for host capacity before it fails
+    BUILDER_ADMISSION_TIMEOUT = int(os.getenv('BUILDER_ADMISSION_TIMEOUT', 1800))
+    # Size limit of each shared npm/pip/node-gyp cache volume per Docker daemon (0 disables the caches)
+    BUILDER_PACKAGE_CACHE_MB = int(os.getenv('BUILDER_PACKAGE_CACHE_MB', 5120))
+    # Where pre-built project template tarballs are stored (empty = system temp directory)
+    BUILDER_TEMPLATE_DIR = os.getenv('BUILDER_TEMPLATE_DIR', '')
+    # Workspace snapshot storage (empty = system temp directory) and automatic snapshots kept per startup (0 keeps all)
+    BUILDER_SNAPSHOT_DIR = os.getenv('BUILDER_SNAPSHOT_DIR', '')
+    BUILDER_SNAPSHOT_KEEP = int(os.getenv('BUILDER_SNAPSHOT_KEEP', 20))
+    # Reach previewed apps through published host ports instead of the Docker network (needed when
+    # the backend cannot route to container IPs, e.g. Docker Desktop)
+    BUILDER_PREVIEW_PUBLISHED_PORTS = os.getenv('BUILDER_PREVIEW_PUBLISHED_PORTS', 'False') == 'True'
+    # Docker API operations the builder's event loop runs at once (execs, archives, log follows connecting)
+    BUILDER_DOCKER_CONCURRENCY = int(os.getenv('BUILDER_DOCKER_CONCURRENCY', 64))
+    # Persistent cache of agent LLM responses: SQLite file, entry lifetime (seconds), size bound, and the
+    # comma-separated agent nodes served from it (empty disables it)
+    BUILDER_LLM_CACHE_PATH = os.getenv('BUILDER_LLM_CACHE_PATH', 'llm_cache.sqlite')
+    BUILDER_LLM_CACHE_TTL = int(os.getenv('BUILDER_LLM_CACHE_TTL', 604800))
+    BUILDER_LLM_CACHE_MAX_ENTRIES = int(os.getenv('BUILDER_LLM_CACHE_MAX_ENTRIES', 5000))
+    BUILDER_LLM_CACHE_NODES = os.getenv('BUILDER_LLM_CACHE_NODES', 'context_manager,task_manager,reasoning,planner')
+    # Plan steps the executor runs at once when the planner declares them independent (1 = sequential)
+    BUILDER_STEP_PARALLELISM = int(os.getenv('BUILDER_STEP_PARALLELISM', 1))
+    # Tasks of one startup built at once by parallel workers in auto-approve runs (1 = one task at a time)
+    BUILDER_TASK_WORKERS = int(os.getenv('BUILDER_TASK_WORKERS', 1))
+    # Token budget of the project context in agent prompts, and per-node overrides ("planner:12000,reasoning:6000")
+    BUILDER_CONTEXT_TOKENS = int(os.getenv('BUILDER_CONTEXT_TOKENS', 8000))
+    BUILDER_CONTEXT_BUDGETS = os.getenv('BUILDER_CONTEXT_BUDGETS', '')
+
 class DevelopmentConfig(Config):
     """Development configuration"""
     DEBUG = True
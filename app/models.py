@@ -268,6 +268,8 @@ class Startup(db.Model):
     next_milestone = db.Column(db.String(255), nullable=True)
     recent_activity = db.Column(db.JSON, nullable=True) # Store as JSON array of strings
     container_name = db.Column(db.String(100), nullable=True, unique=True) # Docker container name
+    workspace_volume = db.Column(db.String(100), nullable=True) # Docker volume mounted at /app (if not startup_vol_<id>)
+    docker_host = db.Column(db.String(255), nullable=True) # Docker daemon the container and volume are placed on (default daemon if null)
     
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -1,5 +1,6 @@
 from flask import Blueprint
 
 builder_bp = Blueprint('builder', __name__, url_prefix='/api/builder')
+preview_bp = Blueprint('preview', __name__, url_prefix='/preview')
 
-from . import routes
+from . import routes, preview
@@ -0,0 +1,249 @@
+import threading
+import time
+
+# Resource requests are recorded on containers as labels, so utilization can be
+# computed from a cheap container listing and survives process restarts
+CPU_LABEL = "startup_builder.cpus"
+MEMORY_LABEL = "startup_builder.memory_mb"
+
+# Per-stack container requests, also enforced as cgroup limits
+STACK_RESOURCES = {
+    "MERN": {"cpus": 1.0, "memory_mb": 2048},
+    "NextJS": {"cpus": 1.5, "memory_mb": 3072},
+    "Python-Data": {"cpus": 1.0, "memory_mb": 2048}
+}
+DEFAULT_RESOURCES = {"cpus": 1.0, "memory_mb": 2048}
+
+# Host-side cost of an agent run (graph loop, LLM calls, docker API traffic);
+# the commands it runs are already capped by the container's limits
+AGENT_RESOURCES = {"cpus": 0.5, "memory_mb": 512}
+# Nothing to reserve, e.g. an agent run on a workspace whose container is already running
+NO_RESOURCES = {"cpus": 0.0, "memory_mb": 0}
+
+ADMISSION_TIMEOUT = 1800 # seconds a request may wait in the queue before it gives up
+
+def stack_resources(stack_type):
+    return STACK_RESOURCES.get(stack_type, DEFAULT_RESOURCES)
+
+def container_limits(stack_type):
+    """Returns (containers.run kwargs, labels) enforcing the stack's cgroup CPU and memory limits."""
+    resources = stack_resources(stack_type)
+    kwargs = {
+        "nano_cpus": int(resources["cpus"] * 1e9),
+        "mem_limit": f"{resources['memory_mb']}m"
+    }
+    labels = {CPU_LABEL: str(resources["cpus"]), MEMORY_LABEL: str(resources["memory_mb"])}
+    return kwargs, labels
+
+class _Ticket:
+    def __init__(self, kind, key, resources, notify):
+        self.kind = kind
+        self.key = key
+        self.resources = resources
+        self.notify = notify
+        self.enqueued_at = time.time()
+        self.position = None # Last position reported through notify
+
+class AdmissionController:
+    """
+    Admits container builds and agent runs only while the Docker daemons have room for them.
+    Committed capacity is the limits of running builder containers (only the memory of
+    paused ones, which use no CPU) plus the requests of in-flight builds and agent runs.
+    Requests beyond capacity wait in a FIFO queue, are told their position through the
+    notify callback, and give up after timeout seconds.
+    """
+    def __init__(self):
+        self.cpus = 0 # 0 = take the host's CPU count from Docker
+        self.memory_mb = 0 # 0 = take the host's memory from Docker
+        self.reserve = 0.1 # Fraction of the host kept free for the daemon and the app itself
+        self.poll_interval = 5 # Seconds between re-checks; containers can stop without telling us
+        self.timeout = ADMISSION_TIMEOUT
+        self._cond = threading.Condition()
+        self._queue = [] # FIFO of waiting _Ticket
+        self._active = [] # Admitted _Ticket
+        self._capacity = {} # Key: daemon base url, Value: {"cpus", "memory_mb"}
+        self.admitted = 0
+        self.queued = 0
+        self.total_wait = 0.0
+        self.timeouts = 0
+
+    def configure(self, cpus=0, memory_mb=0, reserve=0.1, timeout=ADMISSION_TIMEOUT):
+        with self._cond:
+            self.cpus = cpus
+            self.memory_mb = memory_mb
+            self.reserve = reserve
+            self.timeout = timeout
+            self._capacity = {}
+
+    def host_capacity(self, client):
+        """Returns {"cpus", "memory_mb"} one daemon offers builder workloads (0 = unknown)."""
+        key = client.api.base_url
+        if key not in self._capacity:
+            cpus, memory_mb = self.cpus, self.memory_mb
+            if not (cpus and memory_mb):
+                try:
+                    info = client.info()
+                    cpus = cpus or info.get("NCPU", 0)
+                    memory_mb = memory_mb or info.get("MemTotal", 0) // (1024 * 1024)
+                except Exception as e:
+                    print(f"Admission: could not read host capacity: {e}")
+                    return {"cpus": 0, "memory_mb": 0}
+            self._capacity[key] = {
+                "cpus": round(cpus * (1 - self.reserve), 2),
+                "memory_mb": int(memory_mb * (1 - self.reserve))
+            }
+        return self._capacity[key]
+
+    def capacity(self, clients):
+        """Returns the combined capacity of all daemons (0 = unknown, unlimited)."""
+        total = {"cpus": 0.0, "memory_mb": 0}
+        for client in clients:
+            capacity = self.host_capacity(client)
+            total["cpus"] += capacity["cpus"]
+            total["memory_mb"] += capacity["memory_mb"]
+        return total
+
+    def container_usage(self, client):
+        """
+        Returns the resources requested by one daemon's builder containers: CPU and memory of
+        running ones, memory only of paused (hibernated) ones, whose frozen processes use no CPU.
+        """
+        usage = {"cpus": 0.0, "memory_mb": 0}
+        for status in ("running", "paused"):
+            for container in client.containers.list(sparse=True, filters={"label": CPU_LABEL, "status": status}):
+                labels = container.attrs.get("Labels") or {}
+                if status == "running":
+                    usage["cpus"] += float(labels.get(CPU_LABEL, 0))
+                usage["memory_mb"] += int(labels.get(MEMORY_LABEL, 0))
+        return usage
+
+    def committed(self, clients):
+        usage = {"cpus": 0.0, "memory_mb": 0}
+        for client in clients:
+            for key, value in self.container_usage(client).items():
+                usage[key] += value
+        for ticket in self._active:
+            usage["cpus"] += ticket.resources["cpus"]
+            usage["memory_mb"] += ticket.resources["memory_mb"]
+        return usage
+
+    def _fits(self, clients, resources):
+        capacity = self.capacity(clients)
+        if not capacity["cpus"] or not capacity["memory_mb"]:
+            return True
+        try:
+            committed = self.committed(clients)
+        except Exception as e:
+            print(f"Admission: could not list containers: {e}")
+            return True
+        # An oversized request is still admitted once nothing else is in flight
+        if not self._active and not committed["cpus"] and not committed["memory_mb"]:
+            return True
+        return (committed["cpus"] + resources["cpus"] <= capacity["cpus"] and
+                committed["memory_mb"] + resources["memory_mb"] <= capacity["memory_mb"])
+
+    def _positions_changed(self):
+        """Returns (ticket, position, queue_length) for waiters whose position moved. Caller holds the lock."""
+        changed = []
+        for position, ticket in enumerate(self._queue, start=1):
+            if ticket.position != position:
+                if ticket.position is None:
+                    self.queued += 1
+                ticket.position = position
+                changed.append((ticket, position, len(self._queue)))
+        return changed
+
+    def _notify(self, changed):
+        for ticket, position, queue_length in changed:
+            if ticket.notify:
+                try:
+                    ticket.notify(position, queue_length)
+                except Exception as e:
+                    print(f"Admission: queue notification failed: {e}")
+
+    def acquire(self, clients, kind, key, resources, notify=None, timeout=None):
+        """
+        Blocks until the request fits on the Docker daemons (clients), at most timeout seconds
+        (default self.timeout). Returns a ticket for release(), or None if the wait timed out.
+        notify(position, queue_length) is called while queued, and once with position 0 when admitted.
+        Requests for no resources are admitted right away.
+        """
+        ticket = _Ticket(kind, key, resources, notify)
+        timeout = self.timeout if timeout is None else timeout
+        timed_out = False
+        with self._cond:
+            if not resources["cpus"] and not resources["memory_mb"]:
+                self._active.append(ticket)
+                self.admitted += 1
+                return ticket
+            self._queue.append(ticket)
+            while not (self._queue[0] is ticket and self._fits(clients, resources)):
+                changed = self._positions_changed()
+                if changed:
+                    self._cond.release()
+                    try:
+                        self._notify(changed)
+                    finally:
+                        self._cond.acquire()
+                    continue
+                remaining = ticket.enqueued_at + timeout - time.time()
+                if remaining <= 0:
+                    timed_out = True
+                    break
+                self._cond.wait(min(self.poll_interval, remaining))
+
+            if timed_out:
+                self._queue.remove(ticket)
+                self.timeouts += 1
+            else:
+                self._queue.pop(0)
+                self._active.append(ticket)
+                self.admitted += 1
+                self.total_wait += time.time() - ticket.enqueued_at
+            was_queued = ticket.position is not None
+            changed = self._positions_changed()
+            queue_length = len(self._queue)
+            self._cond.notify_all()
+
+        if timed_out:
+            print(f"Admission: {kind} for {key} gave up after waiting {time.time() - ticket.enqueued_at:.1f}s")
+            self._notify(changed)
+            return None
+        if was_queued:
+            print(f"Admission: {kind} for {key} admitted after {time.time() - ticket.enqueued_at:.1f}s")
+            changed.append((ticket, 0, queue_length))
+        self._notify(changed)
+        return ticket
+
+    def release(self, ticket):
+        with self._cond:
+            if ticket in self._active:
+                self._active.remove(ticket)
+            self._cond.notify_all()
+
+    def get_stats(self, clients):
+        capacity = self.capacity(clients)
+        with self._cond:
+            try:
+                committed = self.committed(clients)
+            except Exception as e:
+                committed = {"error": str(e)}
+            now = time.time()
+            stats = {
+                "capacity": capacity,
+                "committed": committed,
+                "active": [{"kind": t.kind, "key": t.key} for t in self._active],
+                "queue": [{"kind": t.kind, "key": t.key, "waiting_seconds": round(now - t.enqueued_at, 1)} for t in self._queue],
+                "admitted": self.admitted,
+                "queued": self.queued,
+                "timeouts": self.timeouts,
+                "avg_wait_seconds": round(self.total_wait / self.admitted, 2) if self.admitted else 0.0
+            }
+        if "error" not in committed and capacity["cpus"] and capacity["memory_mb"]:
+            stats["utilization"] = {
+                "cpus": round(committed["cpus"] / capacity["cpus"], 3),
+                "memory": round(committed["memory_mb"] / capacity["memory_mb"], 3)
+            }
+        return stats
+
+admission = AdmissionController()
@@ -1,17 +1,27 @@
 import os
 import json
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
 from langchain_openai import AzureChatOpenAI
 from langchain_core.messages import HumanMessage, SystemMessage
 from .manager import DockerManager, Linter
 from .memory import MemoryManager
-from .graph import AgentStateEnum
+from .graph import AgentStateEnum, create_task_graph
 from .utils import JsonRepair
+from .review import review_rules
+from .llmcache import llm_cache
+from .stepdag import step_scheduler, is_server_command
+from .asyncengine import docker_loop
+from .taskscheduler import task_scheduler
+from .locks import workspace_locks, SHARED_PATHS
+from .contextbudget import context_builder
 
 class MultiAgentSystem:
     def __init__(self):
         self.docker_manager = DockerManager()
         self.linter = Linter(self.docker_manager)
         self.memory_managers = {} # Cache for MemoryManager instances
+        self._task_graph = None # Sub-graph of parallel task workers, compiled on first use
         self._init_llm()
 
     def _get_memory_manager(self, startup_id):
@@ -19,6 +29,17 @@ class MultiAgentSystem:
             self.memory_managers[startup_id] = MemoryManager(startup_id)
         return self.memory_managers[startup_id]
 
+    def get_stats(self):
+        """Returns statistics of the agent-side caches and schedulers."""
+        return {
+            "review_rules": review_rules.get_stats(),
+            "llm_cache": llm_cache.get_stats(),
+            "step_scheduler": step_scheduler.get_stats(),
+            "task_scheduler": task_scheduler.get_stats(),
+            "workspace_locks": workspace_locks.get_stats(),
+            "context_builder": context_builder.get_stats()
+        }
+
 
     def _init_llm(self):
         self.api_key = os.environ.get("AZURE_OPENAI_API_KEY")
@@ -42,20 +63,48 @@ class MultiAgentSystem:
         else:
             self.llm = None
 
+    def _llm_for(self, node, cached=True):
+        """The chat model for a node: behind the persistent response cache if the node opted in and cached is set."""
+        return llm_cache.wrap(self.llm, node) if cached else self.llm
+
     # --- Nodes ---
 
-    def _get_relevant_context(self, startup_id, goal):
+    def _template_note(self, startup_id):
+        """
+        Context note for workspaces seeded from a pre-built project template: they are already
+        initialized, so the agent must not run the stack's init command (e.g. create-react-app) again.
+        """
+        template = self.docker_manager.workspace_template(startup_id)
+        if not template:
+            return ""
+        return (
+            f"\n\nNOTE: This project was created from the pre-built {template.get('stack')} project template. "
+            "It is already initialized and its dependencies are installed. "
+            "Do NOT run an initialization command (e.g. `npx create-react-app .`); build on the existing files."
+        )
+
+    def _claim_note(self, startup_id):
+        """
+        Context note for a task running in a parallel worker: it may only write the paths its
+        task claimed (plus the shared bookkeeping files), other writes are refused.
+        """
+        claim = workspace_locks.own_claim(startup_id)
+        if not claim or "" in claim:
+            return ""
+        return (
+            f"\n\nNOTE: This task runs in parallel with other tasks. It may only write files under: {', '.join(claim)} "
+            f"(and the shared files {', '.join(SHARED_PATHS)}). Writes to any other path are refused; do not plan them."
+        )
+
+    def _get_relevant_context(self, startup_id, goal, node="planner"):
         """
-        Retrieves scoped context by selecting and reading only relevant files.
+        Retrieves scoped context by selecting and reading only relevant files,
+        assembled within the node's token budget (contextbudget).
         """
         print(f"DEBUG: Context Manager identifying files for goal: {goal}")
         
-        # 1. List all files
-        ls_result = self.docker_manager.run_command(startup_id, "git ls-files --cached --others --exclude-standard")
-        if ls_result.get("exit_code") != 0:
-             ls_result = self.docker_manager.run_command(startup_id, "find . -maxdepth 3 -name .git -prune -o -name node_modules -prune -o -not -name '.*' -print")
-        
-        all_files = ls_result.get("output", "")
+        # 1. List all files (from the cached file-tree index)
+        all_files = self.docker_manager.list_project_files(startup_id)
         if not all_files:
             return "Project is empty."
 
@@ -70,6 +119,8 @@ class MultiAgentSystem:
             - Files directly mentioned in the task.
             - Configuration files (package.json, tsconfig.json) if setup is needed.
             - Core logic files (models, controllers) related to the feature.
+        4. "All Files" is a tree: directory lines end with "/" and list their files by name below them.
+           Return full paths (directory + file name).
         
         Example Output:
         {"files": ["backend/src/app.ts", "backend/package.json"]}
@@ -78,7 +129,7 @@ class MultiAgentSystem:
         user_message = f"""
         Task: {goal}
         All Files:
-        {all_files}
+        {context_builder.fit_tree(all_files, context_builder.budget("context_manager"))}
         """
         
         messages = [
@@ -86,7 +137,7 @@ class MultiAgentSystem:
             HumanMessage(content=user_message)
         ]
         
-        json_llm = self.llm.bind(response_format={"type": "json_object"})
+        json_llm = self._llm_for("context_manager").bind(response_format={"type": "json_object"})
         
         selected_files = []
         try:
@@ -102,34 +153,49 @@ class MultiAgentSystem:
             
         except Exception as e:
             print(f"Context Manager failed to select files: {e}")
+            if hasattr(json_llm, "forget"):
+                json_llm.forget(messages)
 
         # 3. Semantic Search (RAG)
         memory_manager = self._get_memory_manager(startup_id)
         semantic_snippets = memory_manager.retrieve(goal, k=3)
         print(f"Context Manager retrieved {len(semantic_snippets)} semantic snippets.")
 
-        # 4. Read content of selected files & Combine
-        context_str = f"Project Structure:\n{all_files}\n\n"
+        # 4. Read content of selected files & Combine within the token budget
+        # Sections go from most compact to full: the file list as a shallow to complete tree,
+        # long source files as signatures, history and snippets cut short. The priorities
+        # decide what keeps its full form: selected files, then snippets, then history
+        sections = [{"title": "Project Structure", "variants": context_builder.tree_variants(all_files), "priority": 0}]
         
-        # Always read Project History
+        # Always read Project History; fetch it with the selected files in one archive stream
         progress_path = "artifacts/PROGRESS.md"
-        progress_data = self.docker_manager.read_file(startup_id, progress_path)
+        read_result = self.docker_manager.read_files(startup_id, [progress_path] + selected_files)
+        file_contents = read_result.get("files", {})
+        progress_data = file_contents.get(progress_path, {})
         if "content" in progress_data:
-            context_str += f"--- PROJECT HISTORY ({progress_path}) ---\n{progress_data['content']}\n\n"
-        
-        if semantic_snippets:
-            context_str += "--- Semantic Search Results (Relevant Code) ---\n"
-            for i, snippet in enumerate(semantic_snippets):
-                context_str += f"Snippet {i+1}:\n{snippet}\n\n"
+            # The latest entries matter most: cuts keep the end of the history
+            sections.append({
+                "title": f"PROJECT HISTORY ({progress_path})",
+                "variants": [context_builder.truncate(progress_data["content"], 300, keep="tail"), progress_data["content"]],
+                "priority": 3, "keep": "tail"
+            })
+        
+        for i, snippet in enumerate(semantic_snippets):
+            sections.append({
+                "title": f"Semantic Search Result {i+1} (Relevant Code)",
+                "variants": [context_builder.truncate(snippet, 200), snippet], "priority": 2
+            })
         
-        context_str += "--- Selected File Contents ---\n"
         for file_path in selected_files:
-            file_data = self.docker_manager.read_file(startup_id, file_path)
+            file_data = file_contents.get(file_path, {})
             if "content" in file_data:
-                context_str += f"\n--- {file_path} ---\n{file_data['content']}\n"
+                summary = context_builder.summarize(file_path, file_data["content"])
+                variants = [summary, file_data["content"]] if summary and len(summary) < len(file_data["content"]) else [file_data["content"]]
             else:
-                context_str += f"\n--- {file_path} ---\n(File not found or unreadable)\n"
-                
+                variants = ["(File not found or unreadable)"]
+            sections.append({"title": f"Selected File: {file_path}", "variants": variants, "priority": 1})
+        
+        context_str, _ = context_builder.build(node, sections)
         return context_str
 
     def architect_node(self, state):
@@ -148,14 +214,8 @@ class MultiAgentSystem:
         # But to do RAG properly, we need the content.
         # Let's try to use the 'find' command to get file structure first, which is fast.
         
-        # Try git ls-files first (respects .gitignore)
-        ls_result = self.docker_manager.run_command(startup_id, "git ls-files --cached --others --exclude-standard")
-        
-        # Fallback to find if git fails (e.g. not a git repo)
-        if ls_result.get("exit_code") != 0:
-             ls_result = self.docker_manager.run_command(startup_id, "find . -maxdepth 3 -name .git -prune -o -name node_modules -prune -o -not -name '.*' -print")
-             
-        files = ls_result.get("output", "")
+        # The cached file-tree index skips node_modules, .git and build output
+        files = self.docker_manager.list_project_files(startup_id)
         
         context = f"Project Files:\n{files}\n\nGoal: {goal}"
         
@@ -179,7 +239,7 @@ class MultiAgentSystem:
         ]
         
         try:
-            response = self.llm.invoke(messages)
+            response = self._llm_for("architect").invoke(messages)
             spec_content = response.content
             
             # Save spec to artifacts
@@ -284,9 +344,22 @@ class MultiAgentSystem:
         
         CRITICAL RULES:
         1. Return a JSON OBJECT with a single key "tasks".
-        2. "tasks" must be a list of strings (Task Titles).
+        2. "tasks" must be a list of objects, each with:
+           - "title": string (Task Title)
+           - "depends_on": list of the ids (1-based positions) of earlier tasks it builds on, [] if none
+           - "paths": list of the files or directories the task will create or change
         3. Order them logically (Dependencies first).
         4. Keep them granular (e.g., "Setup React Router", "Create Login Component").
+        5. Tasks that neither depend on each other nor share paths may be built at the same time.
+        
+        Example Output:
+        {
+            "tasks": [
+                {"title": "Setup Express server", "depends_on": [], "paths": ["server/index.js", "package.json"]},
+                {"title": "Create Login Component", "depends_on": [], "paths": ["client/src/components/Login.jsx"]},
+                {"title": "Add login API route", "depends_on": [1], "paths": ["server/routes/auth.js"]}
+            ]
+        }
         """
         
         messages = [
@@ -294,7 +367,7 @@ class MultiAgentSystem:
             HumanMessage(content=f"Specification:\n{spec}")
         ]
         
-        json_llm = self.llm.bind(response_format={"type": "json_object"})
+        json_llm = self._llm_for("task_manager").bind(response_format={"type": "json_object"})
         response = json_llm.invoke(messages)
         
         try:
@@ -304,10 +377,16 @@ class MultiAgentSystem:
             elif "```" in content:
                 content = content.split("```")[1]
                 
-            task_list = json.loads(content).get("tasks", [])
-            
-            # Save tasks to artifacts/tasks.json with status
-            formatted_tasks = [{"id": i+1, "title": t, "status": "pending"} for i, t in enumerate(task_list)]
+            # Save tasks to artifacts/tasks.json with status (plus dependencies and paths for parallel workers)
+            formatted_tasks = []
+            for i, t in enumerate(json.loads(content).get("tasks", [])):
+                entry = {"id": i+1, "title": t.get("title", "") if isinstance(t, dict) else t, "status": "pending"}
+                if isinstance(t, dict):
+                    for key in ("depends_on", "paths"):
+                        if isinstance(t.get(key), list):
+                            entry[key] = t[key]
+                formatted_tasks.append(entry)
+            task_list = [t["title"] for t in formatted_tasks]
             self.docker_manager.run_command(startup_id, "mkdir -p artifacts")
             self.docker_manager.write_file(startup_id, tasks_path, json.dumps(formatted_tasks, indent=2))
             
@@ -320,6 +399,8 @@ class MultiAgentSystem:
             }
         except Exception as e:
             print(f"Task Manager Error: {e}")
+            if hasattr(json_llm, "forget"):
+                json_llm.forget(messages)
             return {"status": "failed", "logs": state.get("logs", []) + [f"Task Manager failed: {e}"]}
 
     def reasoning_node(self, state):
@@ -329,7 +410,8 @@ class MultiAgentSystem:
         goal = state["goal"]
         
         # Context Manager: Get Scoped Context
-        context = self._get_relevant_context(startup_id, goal)
+        context = (self._get_relevant_context(startup_id, goal, node="reasoning") + self._template_note(startup_id)
+                   + self._claim_note(startup_id))
         
         system_prompt = """You are a Senior Software Architect.
         Analyze the user's request and the current project context.
@@ -354,7 +436,8 @@ class MultiAgentSystem:
         ]
         
         try:
-            response = self.llm.invoke(messages)
+            # After a strategist PIVOT the prompt is often unchanged: a cached answer would repeat the failed strategy
+            response = self._llm_for("reasoning", cached=state.get("status") != "strategizing").invoke(messages)
             reasoning = response.content
             
             # Append reasoning to context for the Planner
@@ -378,7 +461,8 @@ class MultiAgentSystem:
         
         # Context Manager: Get Scoped Context for Planning
         # We re-fetch context here because the Planner might need more detail than Reasoning
-        context = self._get_relevant_context(startup_id, current_task)
+        context = (self._get_relevant_context(startup_id, current_task, node="planner") + self._template_note(startup_id)
+                   + self._claim_note(startup_id))
         
         system_prompt = """You are a Senior DevOps Engineer & Developer.
         Create a detailed, step-by-step execution plan for the given task.
@@ -395,17 +479,20 @@ class MultiAgentSystem:
            - "command": string (if action is command)
            - "file_path": string (if action is write_file)
            - "content": string (if action is write_file)
+           - "depends_on": list of step ids (optional) that must finish before this step
         3. **File Paths**: Must be relative to project root.
         4. **Granularity**: One logical change per step.
         5. **Verification**: Do NOT include "verify" steps. The Reviewer handles that.
         6. **Output Format**: Return ONLY valid JSON. Do not include markdown formatting, code blocks, or explanations.
         7. **Interactive Commands**: Prefer non-interactive commands. However, if an interactive command is absolutely necessary (e.g. `npm login`, `cypress open`), set `"interactive": true` in the step object.
+        8. **Dependencies**: Give every step "depends_on": the ids of the earlier steps it needs (files it reads or imports, packages it uses, directories it works in). Use [] when it needs none. Steps that do not depend on each other may run at the same time, so two commands using the same package manager in the same directory must depend on one another.
         
         Example Output:
         {
             "steps": [
-                {"id": 1, "description": "Install axios", "action": "command", "command": "npm install axios"},
-                {"id": 2, "description": "Open Cypress", "action": "command", "command": "npx cypress open", "interactive": true}
+                {"id": 1, "description": "Install axios", "action": "command", "command": "npm install axios", "depends_on": []},
+                {"id": 2, "description": "Create API client", "action": "write_file", "file_path": "src/api.js", "content": "...", "depends_on": [1]},
+                {"id": 3, "description": "Open Cypress", "action": "command", "command": "npx cypress open", "interactive": true, "depends_on": [2]}
             ]
         }
         """
@@ -416,7 +503,8 @@ class MultiAgentSystem:
         ]
         
         # Use JSON Mode
-        json_llm = self.llm.bind(response_format={"type": "json_object"})
+        # After a strategist REPLAN (or PIVOT) the prompt is often unchanged: a cached plan would be the failed one
+        json_llm = self._llm_for("planner", cached=state.get("status") != "strategizing").bind(response_format={"type": "json_object"})
         
         max_retries = 3
         current_messages = messages.copy()
@@ -431,6 +519,9 @@ class MultiAgentSystem:
                     data = JsonRepair.parse(content)
                 except ValueError as e:
                     print(f"Planner JSON Parse Error (Attempt {attempt+1}/{max_retries}): {e}")
+                    # An unusable answer must not be replayed from the response cache
+                    if hasattr(json_llm, "forget"):
+                        json_llm.forget(current_messages)
                     # Feedback loop: Add error to messages and retry
                     current_messages.append(HumanMessage(content=f"JSON Error: {str(e)}. Please fix the JSON format and return ONLY the JSON object."))
                     continue
@@ -438,6 +529,8 @@ class MultiAgentSystem:
                 plan = data.get("steps", [])
                 if not plan and isinstance(data, list):
                     plan = data
+                # Independent steps are grouped into waves the executor runs concurrently
+                plan = step_scheduler.schedule(plan)
                 
                 # Format log as JSON string for UI parsing
                 log_entry = {
@@ -469,6 +562,17 @@ class MultiAgentSystem:
             "logs": state.get("logs", []) + ["Planner: Failed to generate valid plan."]
         }
 
+    def _snapshot_boundary(self, startup_id, label):
+        """
+        Takes an automatic workspace snapshot at a task boundary. Returns its id, or None on failure.
+        Only the archive capture happens here; chunking and pruning run on the snapshot worker.
+        """
+        result = self.docker_manager.snapshot_workspace(startup_id, label=label, auto=True, background=True)
+        if result.get("error"):
+            print(f"Developer: Snapshot failed: {result['error']}")
+            return None
+        return result["snapshot_id"]
+
     def developer_node(self, state):
         """Manages task queue and prepares steps for execution."""
         print("--- Developer Node ---")
@@ -482,17 +586,26 @@ class MultiAgentSystem:
         if not current_task:
             if not task_queue:
                 print("Developer: No more tasks in queue.")
+                self._snapshot_boundary(state["startup_id"], "All tasks complete")
                 return {"status": "execution_done"}
+
+            if len(task_queue) > 1 and task_scheduler.enabled(state["startup_id"]):
+                return self._hand_to_workers(state, task_queue)
             
             current_task = task_queue.pop(0)
             print(f"Developer: Starting new task: {current_task}")
+            # Task boundary: a bad run of this task can be rolled back to here
+            snapshot_id = self._snapshot_boundary(state["startup_id"], f"Before task: {current_task}")
+            logs = [f"Developer: Starting task: {current_task}"]
+            if snapshot_id:
+                logs.append(f"Developer: Workspace snapshot {snapshot_id} taken before task.")
             return {
                 "current_task": current_task,
                 "task_queue": task_queue,
                 "goal": current_task,
                 "plan": [],
                 "current_step_index": 0,
-                "logs": state.get("logs", []) + [f"Developer: Starting task: {current_task}"],
+                "logs": state.get("logs", []) + logs,
                 "status": "planning_needed" # Trigger Planner
             }
 
@@ -509,29 +622,38 @@ class MultiAgentSystem:
             completed_tasks = state.get("completed_tasks", 0) + 1
             
             # Auto-Update PROGRESS.md
-            try:
-                progress_entry = f"- [x] **{current_task}** (Completed)\\n"
-                # Ensure artifacts dir exists
-                self.docker_manager.run_command(state["startup_id"], "mkdir -p artifacts")
-                # Append to file
-                cmd = f"echo '{progress_entry}' >> artifacts/PROGRESS.md"
-                self.docker_manager.run_command(state["startup_id"], cmd)
-                print(f"Developer: Updated artifacts/PROGRESS.md")
+            # Parallel task workers update the shared bookkeeping files one at a time
+            with workspace_locks.hold(state["startup_id"], ["artifacts/PROGRESS.md", "artifacts/tasks.json"]):
+                try:
+                    progress_entry = f"- [x] **{current_task}** (Completed)\\n"
+                    # Ensure artifacts dir exists
+                    self.docker_manager.run_command(state["startup_id"], "mkdir -p artifacts")
+                    # Append to file
+                    cmd = f"echo '{progress_entry}' >> artifacts/PROGRESS.md"
+                    self.docker_manager.run_command(state["startup_id"], cmd)
+                    print(f"Developer: Updated artifacts/PROGRESS.md")
                 
-                # Resumability: Update tasks.json
-                tasks_path = "artifacts/tasks.json"
-                tasks_data = self.docker_manager.read_file(state["startup_id"], tasks_path)
-                if "content" in tasks_data:
-                    all_tasks = json.loads(tasks_data["content"])
-                    for t in all_tasks:
-                        if t["title"] == current_task:
-                            t["status"] = "completed"
-                            break
-                    self.docker_manager.write_file(state["startup_id"], tasks_path, json.dumps(all_tasks, indent=2))
-                    print(f"Developer: Updated status in tasks.json")
+                    # Resumability: Update tasks.json
+                    tasks_path = "artifacts/tasks.json"
+                    tasks_data = self.docker_manager.read_file(state["startup_id"], tasks_path)
+                    if "content" in tasks_data:
+                        all_tasks = json.loads(tasks_data["content"])
+                        for t in all_tasks:
+                            if t["title"] == current_task:
+                                t["status"] = "completed"
+                                break
+                        self.docker_manager.write_file(state["startup_id"], tasks_path, json.dumps(all_tasks, indent=2))
+                        print(f"Developer: Updated status in tasks.json")
                     
-            except Exception as e:
-                print(f"Failed to update PROGRESS.md or tasks.json: {e}")
+                except Exception as e:
+                    print(f"Failed to update PROGRESS.md or tasks.json: {e}")
+
+            # Task boundary: the task's remaining steps and its bookkeeping are committed together
+            checkpoint = self.docker_manager.flush_checkpoints(
+                state["startup_id"], paths=["artifacts/PROGRESS.md", "artifacts/tasks.json"], task=current_task
+            )
+            if checkpoint:
+                print(f"Developer: Task '{current_task}' committed as {checkpoint['commit'][:12]}")
             
             # Auto-Index Codebase (RAG Update)
             print(f"Developer: Task complete. Indexing codebase...")
@@ -539,30 +661,35 @@ class MultiAgentSystem:
                 memory_manager = self._get_memory_manager(state["startup_id"])
                 startup_id = state["startup_id"]
                 
-                # Sync: Copy files from Container to Host for Indexing
-                # We use 'docker cp' via the CLI or python client.
-                # Since DockerManager wraps the client, we can add a method or use run_command with tar?
-                # 'docker cp' is a host command, not a container command.
-                
-                # Workaround: We will use a temporary directory on host.
+                # Sync: Mirror only changed files from Container to Host for Indexing
                 local_workspace = f"./temp_workspaces/{startup_id}"
-                os.makedirs(local_workspace, exist_ok=True)
                 
                 # Copy files from container (assuming /app is workdir)
-                success = self.docker_manager.copy_from_container(startup_id, "/app", local_workspace)
+                # Task workers finishing together sync and index one at a time
+                with workspace_locks.hold(startup_id, ["/app"]):
+                    sync_result = self.docker_manager.sync_workspace(startup_id, "/app", local_workspace)
                 
-                if success:
-                    # Index the local copy
-                    memory_manager.index_codebase(local_workspace)
-                    print("Developer: Codebase indexed successfully.")
-                else:
-                    print("Developer: Failed to sync code for indexing.")
+                    if "error" in sync_result:
+                        print(f"Developer: Failed to sync code for indexing: {sync_result['error']}")
+                    elif sync_result["changed"] or sync_result["deleted"]:
+                        # Re-index only what changed since the last sync
+                        memory_manager.index_codebase(
+                            local_workspace,
+                            changed_paths=sync_result["changed"],
+                            deleted_paths=sync_result["deleted"]
+                        )
+                        print("Developer: Codebase indexed successfully.")
+                    else:
+                        print("Developer: Codebase unchanged since last index.")
                 
             except Exception as e:
                 print(f"Indexing failed: {e}")
 
             if not task_queue:
                  return {"status": "execution_done", "completed_tasks": completed_tasks}
+
+            if len(task_queue) > 1 and task_scheduler.enabled(state["startup_id"]):
+                return {**self._hand_to_workers(state, task_queue), "completed_tasks": completed_tasks}
             
             next_task = task_queue.pop(0)
             print(f"Developer: Starting next task: {next_task}")
@@ -577,10 +704,33 @@ class MultiAgentSystem:
                 "status": "planning_needed"
             }
             
-        step = plan[idx]
+        # Steps of the same wave that are ready together are handed to the executor at once
+        wave = step_scheduler.next_wave(plan, idx)
+        for step in wave:
+            self._prepare_step(step)
+        step = wave[0]
+
+        if len(wave) > 1:
+            print(f"Developer: Processing steps {idx + 1}-{idx + len(wave)}/{len(plan)} in parallel")
+            descriptions = "; ".join(s.get("description", "") for s in wave)
+            return {
+                "current_step": step,
+                "current_steps": wave,
+                "status": "coding",
+                "logs": state.get("logs", []) + [f"Developer: Prepared {len(wave)} parallel steps: {descriptions}"]
+            }
+
         print(f"Developer: Processing step {idx + 1}/{len(plan)}")
-        
-        # Validation Logic (Placeholders & JSON)
+        return {
+            "current_step": step,
+            "current_steps": [],
+            "status": "coding",
+            "logs": state.get("logs", []) + [f"Developer: Prepared step: {step.get('description')}"]
+        }
+
+    @staticmethod
+    def _prepare_step(step):
+        """Validation Logic (Placeholders & JSON), fixing the step in place."""
         if step.get("action") == "write_file":
             path = step.get("file_path", "")
             if "<" in path or ">" in path or "[" in path or "path-to-" in path:
@@ -594,10 +744,121 @@ class MultiAgentSystem:
                      if "```" in content:
                          step["content"] = content.split("```")[1].replace("json", "").strip()
 
+    def _hand_to_workers(self, state, task_queue):
+        print(f"Developer: Handing {len(task_queue)} tasks to parallel workers.")
         return {
-            "current_step": step,
-            "status": "coding",
-            "logs": state.get("logs", []) + [f"Developer: Prepared step: {step.get('description')}"]
+            "current_task": "",
+            "plan": [],
+            "current_step_index": 0,
+            "logs": state.get("logs", []) + [f"Developer: Running {len(task_queue)} tasks with parallel workers."],
+            "status": "parallel_tasks"
+        }
+
+    def _queued_tasks(self, startup_id, task_queue):
+        """tasks.json entries (with their dependencies and paths) of the queued task titles, in queue order."""
+        entries = {}
+        tasks_data = self.docker_manager.read_file(startup_id, "artifacts/tasks.json")
+        try:
+            entries = {t["title"]: t for t in json.loads(tasks_data.get("content") or "[]")}
+        except (ValueError, TypeError, KeyError) as e:
+            print(f"Task Workers: Could not read tasks.json, running tasks in queue order: {e}")
+        # Tasks missing from tasks.json get an id of their own and the serial defaults
+        return [entries.get(title) or {"id": f"queued-{i}", "title": title} for i, title in enumerate(task_queue)]
+
+    def _get_task_graph(self):
+        if self._task_graph is None:
+            self._task_graph = create_task_graph(
+                self.developer_node, self.reasoning_node, self.planner_node, self.executor_node,
+                self.reviewer_node, self.debugger_node, self.strategist_node
+            )
+        return self._task_graph
+
+    def _run_task_worker(self, state, task, log):
+        """Runs one task through the task sub-graph. Returns its final state, status "completed" or "failed"."""
+        worker_state = {
+            "startup_id": state["startup_id"],
+            "goal": task["title"],
+            "context": "",
+            "plan": [],
+            "current_step_index": 0,
+            "current_step": {},
+            "current_steps": [],
+            "step_results": [],
+            "code_changes": {},
+            "error_history": [],
+            "logs": [],
+            "task_queue": [], # The worker ends with its task
+            "current_task": task["title"],
+            "total_tasks": state.get("total_tasks", 0),
+            "completed_tasks": 0,
+            "status": "planning_needed"
+        }
+        reported = 0
+        try:
+            for event in self._get_task_graph().stream(worker_state, config={"recursion_limit": 100}):
+                for value in event.values():
+                    if isinstance(value, dict):
+                        worker_state.update(value)
+                logs = worker_state.get("logs", [])
+                for line in logs[reported:]:
+                    log(line)
+                reported = len(logs)
+        finally:
+            # The worker's commands ran on a shell session of its own (see task_scheduler)
+            self.docker_manager.close_worker_shell(state["startup_id"])
+        succeeded = worker_state.get("status") == "execution_done"
+        return {**worker_state, "status": "completed" if succeeded else "failed"}
+
+    def task_workers_node(self, state):
+        """
+        Runs the queued tasks in parallel workers (taskscheduler), each through the task
+        sub-graph, and merges their progress back into this run. A failed task becomes the
+        current task again, so it escalates or stops the run as a failed step would.
+        """
+        print("--- Task Workers Node ---")
+        startup_id = state["startup_id"]
+        task_queue = state.get("task_queue", [])
+        tasks = self._queued_tasks(startup_id, task_queue)
+
+        logs = state.get("logs", [])
+        # One boundary for the whole batch: the workers' tasks interleave in the workspace
+        snapshot_id = self._snapshot_boundary(startup_id, f"Before {len(tasks)} parallel tasks")
+        if snapshot_id:
+            logs = logs + [f"Task Workers: Workspace snapshot {snapshot_id} taken before tasks."]
+
+        outcome = task_scheduler.run(
+            startup_id, tasks, lambda task, log: self._run_task_worker(state, task, log),
+            completed_base=state.get("completed_tasks", 0)
+        )
+        logs = logs + outcome["logs"]
+        completed_tasks = state.get("completed_tasks", 0) + len(outcome["completed"])
+        remaining = [task["title"] for task in outcome["not_run"]]
+
+        if outcome["failed"]:
+            task, result = outcome["failed"][0]
+            # Other failed tasks go back to the queue ahead of the tasks that never started
+            retry = [other["title"] for other, _ in outcome["failed"][1:]]
+            return {
+                "current_task": task["title"],
+                "task_queue": retry + remaining,
+                "goal": task["title"],
+                "plan": result.get("plan", []),
+                "current_step_index": result.get("current_step_index", 0),
+                "completed_tasks": completed_tasks,
+                "error_category": result.get("error_category"),
+                "error_history": state.get("error_history", []) + result.get("error_history", []),
+                "logs": logs + [f"Task Workers: {len(outcome['completed'])} tasks completed; '{task['title']}' failed."],
+                "status": "failed"
+            }
+
+        return {
+            "current_task": "",
+            "task_queue": remaining,
+            "plan": [],
+            "current_step_index": 0,
+            "completed_tasks": completed_tasks,
+            "logs": logs + [f"Task Workers: {len(outcome['completed'])} tasks completed."],
+            "status": "tasks_done"
         }
 
     def debugger_node(self, state):
@@ -629,7 +890,7 @@ class MultiAgentSystem:
         ]
         
         # Use JSON Mode
-        json_llm = self.llm.bind(response_format={"type": "json_object"})
+        json_llm = self._llm_for("debugger").bind(response_format={"type": "json_object"})
         
         try:
             response = json_llm.invoke(messages)
@@ -698,7 +959,7 @@ class MultiAgentSystem:
         ]
         
         # Use JSON Mode
-        json_llm = self.llm.bind(response_format={"type": "json_object"})
+        json_llm = self._llm_for("strategist").bind(response_format={"type": "json_object"})
         
         try:
             response = json_llm.invoke(messages)
@@ -733,6 +994,9 @@ class MultiAgentSystem:
              return {"status": "failed", "logs": state.get("logs", []) + ["Executor: Aborting due to previous failure."]}
 
         startup_id = state["startup_id"]
+        if len(state.get("current_steps") or []) > 1:
+            return self._execute_wave(state, state["current_steps"])
+
         step = state["current_step"]
         print(f"Executor: Running step: {step.get('description')}")
         
@@ -758,25 +1022,18 @@ class MultiAgentSystem:
         
         if action == "command":
             cmd = step.get("command")
-            detach = step.get("background", False)
-            
-            # Auto-detect server start commands to prevent blocking
-            if "npm start" in cmd or "node api.js" in cmd or "python app.py" in cmd or "python3 app.py" in cmd:
-                detach = True
-                print(f"Executor: Detaching server command: {cmd}")
-                
-            result = self.docker_manager.run_command(startup_id, cmd, detach=detach)
+            result = self.docker_manager.run_command(startup_id, cmd, detach=self._detached(step))
         
         elif action == "write_file":
             path = step.get("file_path")
             content = step.get("content")
             print(f"DEBUG: Writing file to {path}. Content length: {len(content) if content else 0}")
             
-            result = self.docker_manager.write_file(startup_id, path, content)
+            # write_files reports the size and checksum the Reviewer verifies against
+            result = self.docker_manager.write_files(startup_id, {path: content})
             print(f"DEBUG: Write Result: {result}")
             
-            # Auto-Linting
-            lint_result = self.linter.lint_file(startup_id, path)
+            lint_result = self._lint_writes(state, startup_id, {path: content}, 1)[path]
             if not lint_result["passed"]:
                 print(f"Linter Failed for {path}: {lint_result['errors']}")
                 # We don't fail the step immediately, but we append errors to logs
@@ -785,32 +1042,114 @@ class MultiAgentSystem:
             else:
                 print(f"Linter Passed for {path}")
             
+        self._checkpoint(state, step, result)
+        
+        return {
+            "last_result": result,
+            "step_results": [],
+            "logs": state.get("logs", []) + [self._executor_log(step, result)]
+        }
+
+    @staticmethod
+    def _detached(step):
+        """Whether a command step runs in the background."""
+        cmd = step.get("command") or ""
+        # Auto-detect server start commands to prevent blocking
+        if is_server_command(cmd):
+            print(f"Executor: Detaching server command: {cmd}")
+            return True
+        return step.get("background", False)
+
+    def _lint_writes(self, state, startup_id, files, steps_running):
+        """
+        Auto-Linting: the plan's upcoming file writes are linted in the same batch, so
+        their steps are answered from the lint cache unless the content changes.
+        Returns {path: lint result} for files and the upcoming writes.
+        """
+        lint_batch = dict(files)
+        for upcoming in state.get("plan", [])[state.get("current_step_index", 0) + steps_running:]:
+            if upcoming.get("action") == "write_file" and upcoming.get("file_path") not in lint_batch \
+                    and isinstance(upcoming.get("content"), str):
+                lint_batch[upcoming["file_path"]] = upcoming["content"]
+        return self.linter.lint_files(startup_id, lint_batch)
+
+    def _checkpoint(self, state, step, result):
         # --- Git Automation ---
-        if result.get("exit_code", 0) == 0:
+        # Steps are committed in batches (per task or time window), staging only the paths
+        # a write touched; result["commit"] is set when this step's batch was committed
+        if result.get("exit_code", 0) == 0 and "error" not in result:
             try:
-                # Ensure git is initialized
-                self.docker_manager.run_command(startup_id, "git init")
-                self.docker_manager.run_command(startup_id, "git config user.email 'ai@startup.studio'")
-                self.docker_manager.run_command(startup_id, "git config user.name 'AI Developer'")
-                
-                # Commit changes
-                commit_msg = f"Step {step.get('id')}: {step.get('description')}"
-                self.docker_manager.run_command(startup_id, "git add .")
-                self.docker_manager.run_command(startup_id, f"git commit -m '{commit_msg}'")
+                paths = [step.get("file_path")] if step.get("action") == "write_file" else None
+                record = self.docker_manager.checkpoint_step(state["startup_id"], step, paths=paths, task=state.get("current_task"))
+                if record:
+                    result["commit"] = record["commit"]
             except Exception as e:
                 print(f"Git automation failed: {e}")
                 # Don't fail the step just because git failed
-        
+
+    @staticmethod
+    def _executor_log(step, result):
         # Format log as JSON string for UI parsing
+        action = step.get("action")
         log_entry = {
             "agent": "Executor",
             "message": f"Ran {action}: {step.get('command') if action == 'command' else step.get('file_path')}",
             "details": result.get('output', '') if action == 'command' else f"Written {len(step.get('content', ''))} bytes"
         }
-        
+        return json.dumps(log_entry)
+
+    def _execute_wave(self, state, steps):
+        """
+        Runs a wave of independent steps concurrently: commands as parallel execs, all file
+        writes as one archive. Results come back in step order (step_results), and the
+        git checkpoints and logs are recorded in that order too, so a wave merges into the
+        state the same way however its steps interleaved. Commands run from /app as one-off
+        execs, not through the shell session, so an earlier step's `cd` or `export` does not apply.
+        """
+        startup_id = state["startup_id"]
+        print(f"Executor: Running {len(steps)} steps in parallel: {[step.get('id') for step in steps]}")
+        writes = {step.get("file_path"): step.get("content") for step in steps if step.get("action") == "write_file"}
+
+        async def run_step(step):
+            if step.get("action") != "command":
+                return {"exit_code": 1, "output": "Unknown action"}
+            if self._detached(step):
+                return await docker_loop.run_blocking(lambda: self.docker_manager.run_command(startup_id, step.get("command"), detach=True))
+            return await self.docker_manager.run_command_async(startup_id, step.get("command"))
+
+        operations = [run_step(step) for step in steps if step.get("action") != "write_file"]
+        if writes:
+            operations.append(self.docker_manager.write_files_async(startup_id, writes))
+        outcomes = [{"error": str(outcome)} if isinstance(outcome, BaseException) else outcome
+                    for outcome in docker_loop.gather(operations)]
+        write_result = outcomes.pop() if writes else None
+        outcomes = iter(outcomes)
+
+        lint_results = {}
+        if writes and "error" not in write_result:
+            lint_results = self._lint_writes(state, startup_id, writes, len(steps))
+
+        results = []
+        for step in steps:
+            if step.get("action") == "write_file":
+                path = step.get("file_path")
+                if "error" in write_result:
+                    result = dict(write_result)
+                else:
+                    # Each step reports (and its review verifies) only its own file
+                    result = {"status": "success", "files": {path: write_result["files"][path]}}
+                    if not lint_results[path]["passed"]:
+                        print(f"Linter Failed for {path}: {lint_results[path]['errors']}")
+                        result["linter_errors"] = lint_results[path]["errors"]
+            else:
+                result = next(outcomes)
+            self._checkpoint(state, step, result)
+            results.append(result)
+
         return {
-            "last_result": result,
-            "logs": state.get("logs", []) + [json.dumps(log_entry)]
+            "last_result": results[0],
+            "step_results": results,
+            "logs": state.get("logs", []) + [self._executor_log(step, result) for step, result in zip(steps, results)]
         }
 
     def _take_screenshot(self, startup_id):
@@ -818,18 +1157,11 @@ class MultiAgentSystem:
         try:
             from playwright.sync_api import sync_playwright
             
-            # Get port (assuming 3000 for MVP)
-            # In production, we should get the mapped port from DockerManager
-            # But since we are running on the same host, we can use localhost:mapped_port
-            # We need to ask DockerManager for the port.
-            
-            container_info = self.docker_manager.ensure_container(startup_id)
-            ports = container_info.get("ports", {})
-            if not ports or '3000/tcp' not in ports or not ports['3000/tcp']:
+            # Same route the preview gateway uses: the detected server port on the Docker network
+            route = self.docker_manager.preview_route(startup_id)
+            if "error" in route:
                 return None
-                
-            port = ports['3000/tcp'][0]['HostPort']
-            url = f"http://localhost:{port}"
+            url = f"http://{route['host']}:{route['port']}"
             
             with sync_playwright() as p:
                 browser = p.chromium.launch()
@@ -850,9 +1182,88 @@ class MultiAgentSystem:
             print(f"Screenshot failed: {e}")
             return None
 
+    def _review_outcome(self, state, status, reason, category, output, rule=None):
+        """State update for a reviewer verdict, from the LLM or (with rule) from the fast-path rules."""
+        if status == "success":
+            source = f" (rule: {rule})" if rule else ""
+            return {
+                "status": "done",
+                "current_step_index": state.get("current_step_index", 0) + 1,
+                "logs": state.get("logs", []) + [f"Reviewer: Step verified{source}. Reason: {reason}"]
+            }
+
+        # Failure Logic
+        error_history = state.get("error_history", [])
+        error_msg = f"{reason} (Output: {output[:100]}...)"
+
+        if len(error_history) >= 3 and error_msg in error_history[-2:]:
+            return {
+                "status": "failed",
+                "error_category": category,
+                "error_history": error_history + [error_msg],
+                "logs": state.get("logs", []) + [f"Reviewer: CRITICAL - Loop detected. Aborting. Error: {error_msg}"]
+            }
+
+        return {
+            "status": "failed",
+            "error_category": category,
+            "error_history": error_history + [error_msg],
+            "logs": state.get("logs", []) + [f"Reviewer: Step failed. Reason: {reason}. Category: {category}. Requesting fix..."]
+        }
+
+    def _review_wave(self, state):
+        """
+        Reviews a parallel wave: each step on its own (concurrently), verdicts merged in
+        step order. If all passed, the plan moves past the wave. Otherwise the passed steps
+        are moved ahead of the failed ones (a wave's steps are independent, so any order is
+        valid), and the first failure takes the usual debugger/strategist route while the
+        other failed steps run again in a later wave.
+        """
+        steps = state["current_steps"]
+        results = state.get("step_results") or []
+        results = results + [{"error": "Step did not run"}] * (len(steps) - len(results))
+        substates = [
+            {**state, "current_step": step, "last_result": result, "current_steps": []}
+            for step, result in zip(steps, results)
+        ]
+        with ThreadPoolExecutor(max_workers=len(steps)) as pool:
+            # Reviewers keep the caller's context variables (Flask's app context, the task worker's owner)
+            futures = [pool.submit(contextvars.copy_context().run, self.reviewer_node, substate) for substate in substates]
+            reviews = [future.result() for future in futures]
+
+        logs = state.get("logs", [])
+        new_logs = [line for review in reviews for line in review.get("logs", logs)[len(logs):]]
+        passed = [i for i, review in enumerate(reviews) if review.get("status") != "failed"]
+        failed = [i for i, review in enumerate(reviews) if review.get("status") == "failed"]
+        idx = state.get("current_step_index", 0)
+        if not failed:
+            return {
+                "status": "done",
+                "current_step_index": idx + len(steps),
+                "current_steps": [],
+                "logs": logs + new_logs
+            }
+
+        plan = list(state.get("plan", []))
+        plan[idx:idx + len(steps)] = [steps[i] for i in passed] + [steps[i] for i in failed]
+        first = reviews[failed[0]]
+        return {
+            "status": "failed",
+            "plan": plan,
+            "current_step_index": idx + len(passed),
+            "current_step": steps[failed[0]],
+            "current_steps": [],
+            "last_result": results[failed[0]],
+            "error_category": first.get("error_category"),
+            "error_history": first.get("error_history", state.get("error_history", [])),
+            "logs": logs + new_logs
+        }
+
     def reviewer_node(self, state):
         """Checks the execution result using an LLM."""
         print("--- Reviewer Node (Smart) ---")
+        if len(state.get("current_steps") or []) > 1:
+            return self._review_wave(state)
         result = state.get("last_result", {})
         step = state.get("current_step", {})
         
@@ -863,6 +1274,24 @@ class MultiAgentSystem:
         
         print(f"DEBUG: Reviewer checking: {command} (Exit: {exit_code})")
         
+        # --- Verification for File Writes ---
+        # Re-read written files in one archive stream and compare checksums
+        written_files = result.get("files", {})
+        if step.get("action") == "write_file" and written_files:
+            read_result = self.docker_manager.read_files(state["startup_id"], list(written_files))
+            for path, expected in written_files.items():
+                actual = read_result.get("files", {}).get(path, {})
+                if actual.get("sha256") != expected["sha256"]:
+                    reason = actual.get("error") or read_result.get("error") or "checksum mismatch"
+                    error_msg = f"Verification failed: File {path} does not match what was written ({reason})."
+                    print(f"Reviewer: {error_msg}")
+                    return {
+                        "status": "failed",
+                        "error_category": "MISSING_IMPLEMENTATION",
+                        "error_history": state.get("error_history", []) + [error_msg],
+                        "logs": state.get("logs", []) + [f"Reviewer: {error_msg}"]
+                    }
+
         # Immediate Fail on Linter Errors
         if linter_errors:
             error_msg = f"Linter Errors Detected:\n" + "\n".join(linter_errors[:10])
@@ -874,6 +1303,12 @@ class MultiAgentSystem:
                 "logs": state.get("logs", []) + [f"Reviewer: Step failed due to linter errors."]
             }
         
+        # Fast path: clear-cut outcomes are settled locally, only ambiguous ones reach the LLM
+        verdict = review_rules.evaluate(step, result, verified_files=step.get("action") == "write_file" and bool(written_files))
+        if verdict:
+            print(f"Reviewer Verdict (rule {verdict['rule']}): {verdict['status']} - {verdict['reason']}")
+            return self._review_outcome(state, verdict["status"], verdict["reason"], verdict["category"], output, rule=verdict["rule"])
+
         system_prompt = """You are a cynical QA Engineer.
         Analyze the execution result of a development step.
         
@@ -907,7 +1342,7 @@ class MultiAgentSystem:
         ]
         
         # Use JSON Mode
-        json_llm = self.llm.bind(response_format={"type": "json_object"})
+        json_llm = self._llm_for("reviewer").bind(response_format={"type": "json_object"})
         
         try:
             response = json_llm.invoke(messages)
@@ -923,32 +1358,7 @@ class MultiAgentSystem:
             category = verdict.get("category", "LOGIC_SYNTAX") # Default to logic if unknown
             
             print(f"Reviewer Verdict: {status} - {reason} ({category})")
-            
-            if status == "success":
-                 return {
-                    "status": "done",
-                    "current_step_index": state.get("current_step_index", 0) + 1,
-                    "logs": state.get("logs", []) + [f"Reviewer: Step verified. Reason: {reason}"]
-                }
-            else:
-                # Failure Logic
-                error_history = state.get("error_history", [])
-                error_msg = f"{reason} (Output: {output[:100]}...)"
-                
-                if len(error_history) >= 3 and error_msg in error_history[-2:]:
-                    return {
-                        "status": "failed",
-                        "error_category": category,
-                        "error_history": error_history + [error_msg],
-                        "logs": state.get("logs", []) + [f"Reviewer: CRITICAL - Loop detected. Aborting. Error: {error_msg}"]
-                    }
-
-                return {
-                    "status": "failed",
-                    "error_category": category,
-                    "error_history": error_history + [error_msg],
-                    "logs": state.get("logs", []) + [f"Reviewer: Step failed. Reason: {reason}. Category: {category}. Requesting fix..."]
-                }
+            return self._review_outcome(state, status, reason, category, output)
                 
         except Exception as e:
             print(f"Reviewer LLM failed: {e}")
@@ -975,43 +1385,7 @@ class MultiAgentSystem:
                 "logs": state.get("logs", []) + [f"Reviewer: Step failed. Error: {error_msg}. Requesting fix..."]
             }
 
-        # --- Verification for File Writes ---
-        if step.get("action") == "write_file":
-            path = step.get("file_path")
-            # Verify file content
-            read_result = self.docker_manager.read_file(startup_id, path)
-            if "error" in read_result:
-                error_msg = f"Verification failed: Could not read file {path}: {read_result['error']}"
-                print(f"Reviewer: {error_msg}")
-                return {
-                    "status": "failed",
-                    "error_category": "MISSING_IMPLEMENTATION",
-                    "error_history": state.get("error_history", []) + [error_msg],
-                    "logs": state.get("logs", []) + [f"Reviewer: {error_msg}"]
-                }
-            
-            content = read_result.get("content", "")
-            if not content or len(content.strip()) == 0:
-                error_msg = f"Verification failed: File {path} is empty."
-                print(f"Reviewer: {error_msg}")
-                return {
-                    "status": "failed",
-                    "error_category": "LOGIC_SYNTAX",
-                    "error_history": state.get("error_history", []) + [error_msg],
-                    "logs": state.get("logs", []) + [f"Reviewer: {error_msg}"]
-                }
-            
-            # Optional: Check if content matches expected (fuzzy check)
-            expected_len = len(step.get("content", ""))
-            actual_len = len(content)
-            # Allow some variance for whitespace/encoding
-            if abs(expected_len - actual_len) > expected_len * 0.2: # >20% difference
-                 print(f"Reviewer Warning: Content length mismatch. Expected ~{expected_len}, got {actual_len}.")
-                 # We don't fail here, just log, as encoding might change length slightly
-            
-            logs = state.get("logs", []) + [f"Reviewer: Verified file {path} (Size: {actual_len} bytes)."]
-        else:
-            logs = state.get("logs", []) + ["Reviewer: Step verified."]
+        logs = state.get("logs", []) + ["Reviewer: Step verified."]
         
         # --- Visual QA ---
         # Heuristic: If step involves UI changes
@@ -1094,7 +1468,7 @@ class MultiAgentSystem:
         ]
         
         try:
-            response = self.llm.invoke(messages)
+            response = self._llm_for("test_gen").invoke(messages)
             script_content = response.content.replace("```python", "").replace("```", "").strip()
             
             # Write the script
@@ -1160,31 +1534,11 @@ class MultiAgentSystem:
             
         logs.append(f"Tester: Server started (PID: {start_result.get('pid')}). Verifying health...")
         
-        # 2. Health Check
-        import time
-        max_retries = 3 # Wait up to 9 seconds (3 * 3s)
-        server_healthy = False
+        # 2. Health Check: wait for the server to listen (adaptive timeout per stack)
+        readiness = self.docker_manager.wait_until_ready(startup_id)
         
-        for i in range(max_retries):
-            # Check localhost:3000 (React) or 5000/8000 (Python)
-            # We can try multiple ports or just the one mapped
-            # For now, we assume 3000 as per MERN stack default
-            result = self.docker_manager.run_command(startup_id, "curl -I http://localhost:3000")
-            
-            if result.get("exit_code") == 0:
-                server_healthy = True
-                break
-            
-            # If 3000 fails, try 8000 (Python)
-            result_alt = self.docker_manager.run_command(startup_id, "curl -I http://localhost:8000")
-            if result_alt.get("exit_code") == 0:
-                 server_healthy = True
-                 break
-                 
-            time.sleep(3)
-            
-        if server_healthy:
-            logs.append("Tester: Application is responsive (HTTP 200 OK).")
+        if readiness.get("ready"):
+            logs.append(f"Tester: Application is listening on port {readiness['port']} (ready in {readiness['time_to_ready']}s).")
             return {"status": "qa_passed", "logs": logs}
         else:
             # 3. Runtime Error Analysis
@@ -1196,7 +1550,8 @@ class MultiAgentSystem:
             if len(app_log) > 2000:
                 app_log = app_log[-2000:]
                 
-            error_msg = f"Server failed to start/respond.\n\n--- app.log ---\n{app_log}"
+            reason = readiness.get("reason") or readiness.get("error", "unknown")
+            error_msg = f"Server failed to start/respond ({reason}).\n\n--- app.log ---\n{app_log}"
             logs.append(f"Tester: Runtime Error Detected. Logs:\n{app_log}")
             
             return {
@@ -0,0 +1,440 @@
+import asyncio
+import collections
+import concurrent.futures
+import contextlib
+import contextvars
+import os
+import ssl
+import struct
+import threading
+import aiohttp
+from .shell import SHELL_COMMAND_TIMEOUT, SHELL_MAX_OUTPUT, TIMEOUT_EXIT_CODE
+
+DOCKER_CONCURRENCY = 64 # Docker API operations in flight at once, across all daemons
+CONNECT_TIMEOUT = 10 # seconds
+DEFAULT_SOCKET_PATH = "/var/run/docker.sock"
+
+# Wraps exec commands so the first stdout line is the command's PID inside the container,
+# which is what a cancelled or timed-out exec is killed by
+_PID_WRAPPER = ["sh", "-c", 'echo $$; exec "$@"', "sh"]
+
+def _eventlet_patched():
+    """True when eventlet has monkey-patched threading (run.py does, before anything else)."""
+    try:
+        from eventlet import patcher
+    except ImportError:
+        return False
+    return patcher.is_monkey_patched("thread")
+
+def _os_threading():
+    """The threading module with real OS threads and locks, even under eventlet's monkey-patching."""
+    if _eventlet_patched():
+        from eventlet import patcher
+        return patcher.original("threading")
+    return threading
+
+class _HubBridge:
+    """
+    Runs functions on the eventlet hub of the thread that created it, from any OS thread.
+    Calls are queued and a byte on a pipe wakes a green thread that spawns each of them,
+    so green locks, sockets and events are only ever used from the hub they belong to.
+    """
+    def __init__(self):
+        import eventlet
+        from eventlet.hubs import trampoline
+        self._spawn = eventlet.spawn_n
+        self._trampoline = trampoline
+        self._lock = _os_threading().Lock()
+        self._calls = collections.deque()
+        self._read_fd, self._write_fd = os.pipe()
+        os.set_blocking(self._read_fd, False)
+        eventlet.spawn_n(self._dispatch)
+
+    def call(self, fn, *args):
+        with self._lock:
+            wake = not self._calls # One byte per batch: the dispatcher drains the whole queue
+            self._calls.append((fn, args))
+        if wake:
+            os.write(self._write_fd, b"\0")
+
+    def _dispatch(self):
+        while True:
+            self._trampoline(self._read_fd, read=True)
+            try:
+                os.read(self._read_fd, 4096)
+            except BlockingIOError:
+                pass
+            with self._lock:
+                calls, self._calls = self._calls, collections.deque()
+            for fn, args in calls:
+                self._spawn(fn, *args)
+
+def _settle(future, task):
+    """Copies a finished asyncio task's outcome to the concurrent future its caller waits on."""
+    if future.done():
+        return
+    if task.cancelled():
+        future.cancel()
+    elif task.exception() is not None:
+        future.set_exception(task.exception())
+    else:
+        future.set_result(task.result())
+
+def _resolve(future, result, error):
+    if not future.done():
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+class DockerEngineError(Exception):
+    def __init__(self, status, message):
+        super().__init__(f"Docker API error {status}: {message}")
+        self.status = status
+
+async def iter_frames(content):
+    """
+    Yields (stream, payload) from a multiplexed (non-TTY) exec or log stream.
+    Async counterpart of shell.iter_exec_frames: 8-byte header (stream type, size) + payload.
+    """
+    while True:
+        try:
+            header = await content.readexactly(8)
+            payload = await content.readexactly(struct.unpack('>I', header[4:])[0])
+        except asyncio.IncompleteReadError:
+            return
+        yield header[0], payload
+
+class AsyncDockerEngine:
+    """
+    Minimal Docker Engine API client on aiohttp for one daemon, built from a docker-py
+    client so it talks to the same endpoint, API version and TLS settings.
+    Must only be used on the DockerEventLoop's loop.
+    """
+    def __init__(self, client):
+        api = client.api
+        self.version = api._version
+        self._unix_socket = None
+        self._ssl = None
+        if api.base_url.startswith("http+docker://"):
+            adapter = getattr(api, "_custom_adapter", None)
+            self._unix_socket = getattr(adapter, "socket_path", None) or DEFAULT_SOCKET_PATH
+            self.base_url = "http://docker"
+        else:
+            self.base_url = api.base_url
+            if self.base_url.startswith("https://"):
+                self._ssl = ssl.create_default_context(cafile=api.verify if isinstance(api.verify, str) else None)
+                if api.verify is False:
+                    self._ssl.check_hostname = False
+                    self._ssl.verify_mode = ssl.CERT_NONE
+                if isinstance(api.cert, tuple):
+                    self._ssl.load_cert_chain(*api.cert)
+                elif api.cert:
+                    self._ssl.load_cert_chain(api.cert)
+        self._session = None
+
+    def _get_session(self):
+        if self._session is None or self._session.closed:
+            connector = aiohttp.UnixConnector(path=self._unix_socket) if self._unix_socket \
+                else aiohttp.TCPConnector(ssl=self._ssl if self._ssl else False, limit=0)
+            # No total timeout: log follows and long execs stay open; callers bound their own waits
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=None, connect=CONNECT_TIMEOUT, sock_connect=CONNECT_TIMEOUT)
+            )
+        return self._session
+
+    async def _request(self, method, path, **kwargs):
+        response = await self._get_session().request(method, f"{self.base_url}/v{self.version}{path}", **kwargs)
+        if response.status >= 400:
+            try:
+                message = (await response.json(content_type=None)).get("message", "")
+            except Exception:
+                message = response.reason
+            finally:
+                response.release()
+            raise DockerEngineError(response.status, message)
+        return response
+
+    async def _json(self, method, path, **kwargs):
+        response = await self._request(method, path, **kwargs)
+        try:
+            return await response.json(content_type=None)
+        finally:
+            response.release()
+
+    async def inspect(self, container_id):
+        async with docker_loop.slot():
+            return await self._json("GET", f"/containers/{container_id}/json")
+
+    async def exec_run(self, container_id, cmd, workdir=None, environment=None, timeout=SHELL_COMMAND_TIMEOUT, max_output=SHELL_MAX_OUTPUT):
+        """
+        Runs cmd (a string runs under bash -c) as a one-off exec and collects its output.
+        On timeout or cancellation the process is killed inside the container.
+        Returns: {"exit_code", "output"} like shell sessions do.
+        """
+        if isinstance(cmd, str):
+            cmd = ["bash", "-c", cmd]
+        async with docker_loop.slot():
+            created = await self._json("POST", f"/containers/{container_id}/exec", json={
+                "AttachStdout": True, "AttachStderr": True, "Cmd": _PID_WRAPPER + list(cmd),
+                "WorkingDir": workdir or "", "Env": [f"{k}={v}" for k, v in (environment or {}).items()]
+            })
+            exec_id = created["Id"]
+            response = await self._request("POST", f"/exec/{exec_id}/start", json={"Detach": False, "Tty": False})
+            state = {"pid": None, "output": bytearray(), "truncated": False}
+            try:
+                await asyncio.wait_for(self._collect(response, state, max_output), timeout)
+            except asyncio.TimeoutError:
+                await self._kill(container_id, state["pid"])
+                output = state["output"].decode('utf-8', errors='replace')
+                return {"exit_code": TIMEOUT_EXIT_CODE, "output": output + f"\n[Command timed out after {timeout}s]"}
+            except asyncio.CancelledError:
+                # Shielded: the kill has to go out even though this task is being cancelled
+                await asyncio.shield(self._kill(container_id, state["pid"]))
+                raise
+            finally:
+                response.release()
+            info = await self._json("GET", f"/exec/{exec_id}/json")
+        output = state["output"].decode('utf-8', errors='replace')
+        if state["truncated"]:
+            output += f"\n[Output truncated at {max_output} bytes]"
+        return {"exit_code": info.get("ExitCode"), "output": output}
+
+    @staticmethod
+    async def _collect(response, state, max_output):
+        pending_pid = b""
+        async for stream, payload in iter_frames(response.content):
+            if state["pid"] is None and stream == 1:
+                pending_pid += payload
+                if b"\n" not in pending_pid:
+                    continue
+                pid, payload = pending_pid.split(b"\n", 1)
+                state["pid"] = int(pid) if pid.strip().isdigit() else 0
+            room = max_output - len(state["output"])
+            if len(payload) > room:
+                state["truncated"] = True
+                payload = payload[:max(room, 0)]
+            state["output"] += payload
+
+    async def _kill(self, container_id, pid):
+        if not pid:
+            return
+        try:
+            created = await self._json("POST", f"/containers/{container_id}/exec", json={"Cmd": ["kill", "-9", str(pid)]})
+            response = await self._request("POST", f"/exec/{created['Id']}/start", json={"Detach": True, "Tty": False})
+            response.release()
+        except Exception as e:
+            print(f"Error killing exec process {pid} in {container_id[:12]}: {e}")
+
+    async def get_archive(self, container_id, path):
+        """Returns the tar archive of path as bytes."""
+        async with docker_loop.slot():
+            response = await self._request("GET", f"/containers/{container_id}/archive", params={"path": path})
+            try:
+                return await response.read()
+            finally:
+                response.release()
+
+    async def put_archive(self, container_id, path, data):
+        """Extracts a tar archive (bytes, possibly gzipped) into path."""
+        async with docker_loop.slot():
+            response = await self._request(
+                "PUT", f"/containers/{container_id}/archive", params={"path": path}, data=data,
+                headers={"Content-Type": "application/x-tar"}
+            )
+            response.release()
+            return True
+
+    async def logs(self, container_id, follow=False, since=None, until=None, tail=None):
+        """
+        Yields the (non-TTY) container's stdout/stderr as bytes. A follow stream only holds a
+        concurrency slot while connecting, not for as long as it stays open.
+        """
+        params = {"stdout": 1, "stderr": 1, "follow": int(follow)}
+        # Fractional timestamps are passed as "seconds.nanoseconds"
+        if since is not None:
+            params["since"] = f"{since:.9f}" if isinstance(since, float) else str(since)
+        if until is not None:
+            params["until"] = f"{until:.9f}" if isinstance(until, float) else str(until)
+        if tail is not None:
+            params["tail"] = tail
+        async with docker_loop.slot():
+            response = await self._request("GET", f"/containers/{container_id}/logs", params=params)
+        try:
+            async for _, payload in iter_frames(response.content):
+                yield payload
+        finally:
+            response.release()
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+
+class DockerEventLoop:
+    """
+    One asyncio event loop, on its own thread, for Docker API I/O. Operations are
+    coroutines scheduled from any thread; at most max_concurrency talk to Docker at once
+    instead of each holding an OS thread, and a caller that stops waiting cancels the
+    operation. Coroutines run with the caller's context variables (e.g. Flask's app context).
+
+    Under eventlet (run.py monkey-patches the server) the loop still gets a real OS thread,
+    since a green thread blocked in the loop's selector would stall the hub. Green
+    primitives must then stay on the hub: results go back to callers through a _HubBridge,
+    and coroutines reach state shared with the app (caches, registries, docker-py, the
+    database) only through call_shared() and run_blocking(). scripts/verify_eventlet_loop.py
+    checks this against a monkey-patched process.
+    """
+    def __init__(self):
+        self.max_concurrency = DOCKER_CONCURRENCY
+        self._lock = _os_threading().Lock() # Also taken on the loop thread (engine())
+        self._loop = None
+        self._bridge = None # _HubBridge to the eventlet hub, when monkey-patched
+        self._semaphore = None
+        self._engines = {} # Key: docker-py client id, Value: AsyncDockerEngine
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.waiting = 0
+        self.completed = 0
+        self.cancelled = 0
+        self.timeouts = 0
+
+    def configure(self, max_concurrency=DOCKER_CONCURRENCY):
+        self.max_concurrency = max_concurrency or DOCKER_CONCURRENCY
+
+    def _ensure_loop(self):
+        with self._lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                self._semaphore = asyncio.Semaphore(self.max_concurrency)
+                if _eventlet_patched():
+                    self._bridge = _HubBridge()
+                _os_threading().Thread(target=loop.run_forever, name="docker-event-loop", daemon=True).start()
+                self._loop = loop
+            return self._loop
+
+    def lock(self):
+        """A lock both coroutines on the loop and callers may take (a real one, even under eventlet)."""
+        return _os_threading().Lock()
+
+    def _to_caller(self, fn, *args):
+        """Runs fn(*args) on the callers' side: the eventlet hub, or right away when unpatched."""
+        if self._bridge is not None:
+            self._bridge.call(fn, *args)
+        else:
+            fn(*args)
+
+    async def _on_hub(self, fn, *args):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+
+        def call():
+            try:
+                result = fn(*args)
+            except Exception as e:
+                loop.call_soon_threadsafe(_resolve, future, None, e)
+            else:
+                loop.call_soon_threadsafe(_resolve, future, result, None)
+
+        # The coroutine's context (the submitting caller's) carries over
+        self._bridge.call(contextvars.copy_context().run, call)
+        return await future
+
+    async def call_shared(self, fn, *args):
+        """
+        Calls a quick function that touches state shared with the app (file-tree cache,
+        container registry, ...). Under eventlet that state is guarded by green locks, which
+        only the hub may take, so the call runs there; otherwise it runs right here.
+        """
+        if self._bridge is None:
+            return fn(*args)
+        return await self._on_hub(fn, *args)
+
+    async def run_blocking(self, fn, *args):
+        """Runs a blocking function (docker-py, database) off the loop: on the hub under eventlet, else in a worker thread."""
+        if self._bridge is None:
+            return await asyncio.to_thread(fn, *args)
+        return await self._on_hub(fn, *args)
+
+    def engine(self, client):
+        """Returns the async engine for a docker-py client's daemon."""
+        with self._lock:
+            engine = self._engines.get(id(client))
+            if engine is None:
+                engine = AsyncDockerEngine(client)
+                self._engines[id(client)] = engine
+            return engine
+
+    @contextlib.asynccontextmanager
+    async def slot(self):
+        """Holds one of the max_concurrency Docker operation slots."""
+        self.waiting += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.waiting -= 1
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        try:
+            yield
+            self.completed += 1
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        finally:
+            self.in_flight -= 1
+            self._semaphore.release()
+
+    def submit(self, coro):
+        """Schedules coro on the loop. Returns a concurrent.futures.Future; cancelling it cancels coro."""
+        loop = self._ensure_loop()
+        context = contextvars.copy_context()
+        future = concurrent.futures.Future() # Only touched on the callers' side
+        tasks = []
+
+        def start():
+            # create_task copies the current context: the caller's, entered here
+            task = context.run(loop.create_task, coro)
+            tasks.append(task)
+            task.add_done_callback(lambda done: self._to_caller(_settle, future, done))
+
+        def cancel(_):
+            if future.cancelled():
+                # Runs after start(): call_soon_threadsafe keeps the order
+                loop.call_soon_threadsafe(lambda: tasks and tasks[0].cancel())
+
+        loop.call_soon_threadsafe(start)
+        future.add_done_callback(cancel)
+        return future
+
+    def run(self, coro, timeout=None):
+        """Runs coro on the loop and waits for its result. On timeout the operation is cancelled and TimeoutError raised."""
+        future = self.submit(coro)
+        try:
+            return future.result(timeout)
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            self.timeouts += 1
+            raise TimeoutError(f"Docker operation timed out after {timeout}s")
+
+    def gather(self, coros, timeout=None):
+        """Runs coroutines concurrently and waits for all. Returns their results, exceptions in place of failures."""
+        async def _gather():
+            return await asyncio.gather(*coros, return_exceptions=True)
+        return self.run(_gather(), timeout=timeout)
+
+    def get_stats(self):
+        return {
+            "running": self._loop is not None,
+            "max_concurrency": self.max_concurrency,
+            "in_flight": self.in_flight,
+            "peak_in_flight": self.peak_in_flight,
+            "waiting": self.waiting,
+            "completed": self.completed,
+            "cancelled": self.cancelled,
+            "timeouts": self.timeouts,
+            "engines": len(self._engines),
+            "eventlet_bridge": self._bridge is not None
+        }
+
+docker_loop = DockerEventLoop()
@@ -0,0 +1,240 @@
+import posixpath
+import re
+import threading
+
+DEFAULT_CONTEXT_TOKENS = 8000 # budget of nodes without one of their own
+NODE_CONTEXT_TOKENS = {"context_manager": 4000, "reasoning": 6000, "planner": 12000}
+TOKEN_ENCODING = "cl100k_base"
+MIN_SECTION_TOKENS = 40 # a section cut shorter than this is dropped instead
+TREE_FILES_PER_DIR = 25 # files listed per directory in the compressed file tree
+
+# Lines kept when a long file is summarized by its signatures, per extension
+_PY_SIGNATURES = re.compile(r"^\s*(async\s+def|def|class)\s+\w+|^(import|from)\s+\S+|^[A-Z][A-Z0-9_]*\s*=|^\s*@\w+")
+_JS_SIGNATURES = re.compile(
+    r"^\s*(export\s+)?(default\s+)?(async\s+)?(function\*?|class|interface|type|enum)\s+\w+"
+    r"|^\s*(export\s+)?(const|let|var)\s+\w+\s*=\s*(async\s*)?(\([^)]*\)|\w+)\s*=>"
+    r"|^\s*(export\s+)?(const|let|var)\s+\w+\s*=\s*(require\(|new\s|styled|create|React\.)"
+    r"|^\s*(import\s|export\s+\{|export\s+\*|module\.exports)"
+    r"|^\s*(app|router)\.(get|post|put|patch|delete|use|listen)\("
+    r"|^\s*(async\s+)?\w+\s*\([^)]*\)\s*\{\s*$"
+)
+SIGNATURE_PATTERNS = {
+    ".py": _PY_SIGNATURES,
+    ".js": _JS_SIGNATURES, ".jsx": _JS_SIGNATURES, ".ts": _JS_SIGNATURES, ".tsx": _JS_SIGNATURES,
+    ".mjs": _JS_SIGNATURES, ".cjs": _JS_SIGNATURES
+}
+
+class ContextBuilder:
+    """
+    Assembles prompt context within a token budget per agent node.
+    Context is a list of sections, each with variants from most compact to full (e.g. a
+    file's signatures, then its content). Every section first gets its most compact
+    variant, in priority order, cut or dropped once the budget runs out; the remaining
+    budget then upgrades sections, in priority order, to the fullest variant that fits.
+    Sections keep their given order in the output. Tokens are counted with tiktoken,
+    or estimated (4 characters per token) if its encoding cannot be loaded.
+    """
+    def __init__(self):
+        self.default_tokens = DEFAULT_CONTEXT_TOKENS
+        self.budgets = dict(NODE_CONTEXT_TOKENS)
+        self._encoding = None
+        self._encoding_failed = False
+        self._lock = threading.Lock()
+        self.nodes = {} # Key: node, Value: {"calls", "tokens_used", "tokens_dropped"}
+        self.summarized = 0
+        self.truncated = 0
+        self.omitted = 0
+
+    def configure(self, default_tokens=DEFAULT_CONTEXT_TOKENS, budgets=None):
+        """budgets: "node:tokens" pairs, comma-separated (e.g. "planner:12000,reasoning:6000")."""
+        self.default_tokens = default_tokens or DEFAULT_CONTEXT_TOKENS
+        for pair in (budgets or "").split(","):
+            node, _, tokens = pair.partition(":")
+            if node.strip() and tokens.strip().isdigit():
+                self.budgets[node.strip()] = int(tokens)
+
+    def budget(self, node):
+        return self.budgets.get(node, self.default_tokens)
+
+    def _get_encoding(self):
+        if self._encoding is None and not self._encoding_failed:
+            try:
+                import tiktoken
+                self._encoding = tiktoken.get_encoding(TOKEN_ENCODING)
+            except Exception as e:
+                # No network for the encoding download: fall back to estimates
+                print(f"Context Builder: tiktoken unavailable, estimating tokens: {e}")
+                self._encoding_failed = True
+        return self._encoding
+
+    def count(self, text):
+        encoding = self._get_encoding()
+        if encoding is None:
+            return (len(text) + 3) // 4
+        return len(encoding.encode(text, disallowed_special=()))
+
+    def truncate(self, text, tokens, keep="head"):
+        """Cuts text to at most tokens, keeping its start (head) or its end (tail)."""
+        if self.count(text) <= tokens:
+            return text
+        marker = "\n... (truncated)\n"
+        room = max(tokens - self.count(marker), 0)
+        encoding = self._get_encoding()
+        if encoding is None:
+            kept = text[:room * 4] if keep == "head" else text[len(text) - room * 4:]
+        else:
+            encoded = encoding.encode(text, disallowed_special=())
+            kept = encoding.decode(encoded[:room] if keep == "head" else encoded[len(encoded) - room:])
+        return kept + marker if keep == "head" else marker + kept
+
+    @staticmethod
+    def summarize(path, content):
+        """Signature lines of a source file (imports, classes, functions, routes), or None if its type has no summary."""
+        pattern = SIGNATURE_PATTERNS.get(posixpath.splitext(path)[1].lower())
+        if pattern is None:
+            return None
+        lines = content.splitlines()
+        signatures = [f"{number}: {line.rstrip()}" for number, line in enumerate(lines, 1) if pattern.match(line)]
+        return f"(summary of {len(lines)} lines: signatures only)\n" + "\n".join(signatures) + "\n"
+
+    @staticmethod
+    def directory_tree(paths, max_depth=None, max_files=None):
+        """
+        Compresses a file list (one path per line) into a tree: each directory once, with
+        its files by name (at most max_files). Directories deeper than max_depth are folded
+        into a count.
+        """
+        dirs = {} # Key: directory ("" is the root), Value: file names
+        for path in paths.splitlines():
+            if path.strip():
+                directory, _, name = path.strip().rpartition("/")
+                dirs.setdefault(directory, []).append(name)
+        folded = {} # Key: directory at max_depth, Value: [files, subdirectories] folded into it
+        visible = set()
+        for directory in dirs:
+            depth = directory.count("/") + 1 if directory else 0
+            if max_depth is not None and depth > max_depth:
+                ancestor = "/".join(directory.split("/")[:max_depth])
+                entry = folded.setdefault(ancestor, [0, 0])
+                entry[0] += len(dirs[directory])
+                entry[1] += 1
+                visible.add(ancestor)
+            else:
+                visible.add(directory)
+
+        lines = []
+        for directory in sorted(visible):
+            lines.append(f"{directory}/" if directory else "./")
+            names = sorted(dirs.get(directory, []))
+            shown = names if max_files is None else names[:max_files]
+            lines.extend(f"  {name}" for name in shown)
+            if len(names) > len(shown):
+                lines.append(f"  ... ({len(names) - len(shown)} more files)")
+            if directory in folded:
+                files, subdirectories = folded[directory]
+                lines.append(f"  ... ({files} files in {subdirectories} subdirectories)")
+        return "\n".join(lines)
+
+    def tree_variants(self, paths):
+        """Trees of paths from the shallowest to the complete one (every file listed)."""
+        depth = max((path.count("/") for path in paths.splitlines() if path.strip()), default=0)
+        variants = []
+        for max_depth in list(range(1, depth + 1)) + [None]:
+            tree = self.directory_tree(paths, max_depth, TREE_FILES_PER_DIR) if max_depth else self.directory_tree(paths)
+            if not variants or variants[-1] != tree:
+                variants.append(tree)
+        return variants
+
+    def fit_tree(self, paths, tokens):
+        """The most detailed tree of paths within tokens."""
+        variants = self.tree_variants(paths)
+        for tree in reversed(variants):
+            if self.count(tree) <= tokens:
+                return tree
+        return self.truncate(variants[0], tokens)
+
+    def build(self, node, sections):
+        """
+        sections: dicts with "title", "variants" (texts, most compact first), "priority"
+        (lower is kept first) and optional "keep" ("head" or "tail", where a cut keeps).
+        Returns (context text, report {"budget", "used", "dropped", "sections"}).
+        """
+        budget = self.budget(node)
+        order = sorted(range(len(sections)), key=lambda i: sections[i].get("priority", 0))
+        costs = [[self.count(text) for text in section["variants"]] for section in sections]
+        headers = [self.count(f"--- {section['title']} ---\n") if section["title"] else 0 for section in sections]
+        chosen = [None] * len(sections) # Key: section index, Value: (text, tokens, variant index or None if cut)
+        remaining = budget
+
+        # Pass 1: the most compact variant of every section, cut or dropped when out of budget
+        for i in order:
+            text, tokens = sections[i]["variants"][0], costs[i][0]
+            if tokens + headers[i] > remaining:
+                if remaining - headers[i] < MIN_SECTION_TOKENS:
+                    continue
+                text = self.truncate(text, remaining - headers[i], sections[i].get("keep", "head"))
+                tokens = self.count(text)
+                chosen[i] = (text, tokens, None)
+            else:
+                chosen[i] = (text, tokens, 0)
+            remaining -= tokens + headers[i]
+
+        # Pass 2: upgrade sections, most important first, to the fullest variant that fits
+        for i in order:
+            if chosen[i] is None or chosen[i][2] is None:
+                continue
+            for v in range(len(costs[i]) - 1, chosen[i][2], -1):
+                if costs[i][v] - chosen[i][1] <= remaining:
+                    remaining -= costs[i][v] - chosen[i][1]
+                    chosen[i] = (sections[i]["variants"][v], costs[i][v], v)
+                    break
+
+        parts, report = [], []
+        used = dropped = 0
+        summarized = truncated = omitted = 0
+        for i, section in enumerate(sections):
+            full = costs[i][-1]
+            if chosen[i] is None:
+                state, tokens = "omitted", 0
+                omitted += 1
+            else:
+                text, tokens, variant = chosen[i]
+                tokens += headers[i]
+                parts.append(f"--- {section['title']} ---\n{text}" if section["title"] else text)
+                if variant is None:
+                    state = "truncated"
+                    truncated += 1
+                elif variant < len(costs[i]) - 1:
+                    state = "compact"
+                    summarized += 1
+                else:
+                    state = "full"
+            used += tokens
+            dropped += max(full + headers[i] - tokens, 0) if chosen[i] else full
+            report.append({"title": section["title"], "state": state, "tokens": tokens, "full_tokens": full})
+
+        with self._lock:
+            stats = self.nodes.setdefault(node, {"calls": 0, "tokens_used": 0, "tokens_dropped": 0})
+            stats["calls"] += 1
+            stats["tokens_used"] += used
+            stats["tokens_dropped"] += dropped
+            self.summarized += summarized
+            self.truncated += truncated
+            self.omitted += omitted
+        print(f"Context Builder ({node}): used {used}/{budget} tokens, dropped {dropped} "
+              f"({summarized} compacted, {truncated} truncated, {omitted} omitted sections)")
+        return "\n\n".join(parts) + "\n", {"budget": budget, "used": used, "dropped": dropped, "sections": report}
+
+    def get_stats(self):
+        with self._lock:
+            return {
+                "token_counter": "estimate" if self._encoding_failed else "tiktoken",
+                "default_budget": self.default_tokens,
+                "budgets": dict(self.budgets),
+                "nodes": {node: dict(stats) for node, stats in self.nodes.items()},
+                "sections_compacted": self.summarized,
+                "sections_truncated": self.truncated,
+                "sections_omitted": self.omitted
+            }
+
+context_builder = ContextBuilder()
@@ -0,0 +1,113 @@
+import os
+import threading
+import docker
+from .admission import admission
+
+DEFAULT_DOCKER_HOST = "unix:///var/run/docker.sock"
+
+class DockerDaemonPool:
+    """
+    The Docker daemons startup containers can be placed on.
+    Endpoints come from BUILDER_DOCKER_HOSTS, a comma-separated list of local sockets or
+    TCP daemons; without it the environment's daemon (DOCKER_HOST) is the only endpoint.
+    A startup's daemon is recorded in Startup.docker_host and never changes, since its
+    workspace volume lives there.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._clients = {} # Key: endpoint url, Value: DockerClient
+        self._pending = {} # Key: endpoint url, Value: resources placed but not running yet
+        self.default_host = None
+        self.connected = False
+        self.placements = {} # Key: endpoint url, Value: number of containers placed there
+
+    def connect(self, hosts=None):
+        """Connects (once per process) to the given endpoints, or to the environment's daemon."""
+        with self._lock:
+            if self.connected:
+                return
+            self.connected = True
+            hosts = [host.strip() for host in (hosts or "").split(",") if host.strip()]
+            if not hosts:
+                try:
+                    client = docker.from_env()
+                    self._clients[os.environ.get("DOCKER_HOST", DEFAULT_DOCKER_HOST)] = client
+                except Exception as e:
+                    print(f"Error initializing Docker client: {e}")
+            for host in hosts:
+                try:
+                    client = docker.DockerClient(base_url=host)
+                    client.ping()
+                    self._clients[host] = client
+                except Exception as e:
+                    print(f"Docker daemon {host} unavailable, skipping: {e}")
+            # The first endpoint also holds containers created before placement was recorded
+            self.default_host = next(iter(self._clients), None)
+
+    def hosts(self):
+        return list(self._clients)
+
+    def clients(self):
+        return list(self._clients.values())
+
+    def get(self, host=None):
+        """Returns the client for host (the default daemon when host is None), or None if unavailable."""
+        return self._clients.get(host or self.default_host)
+
+    def _load(self, host, client, resources):
+        """Fraction of the daemon's capacity committed once resources are placed on it."""
+        capacity = admission.host_capacity(client)
+        usage = admission.container_usage(client)
+        pending = self._pending.get(host, {"cpus": 0.0, "memory_mb": 0})
+        loads = []
+        for key in ("cpus", "memory_mb"):
+            committed = usage[key] + pending[key] + resources[key]
+            # Unknown capacity: fall back to comparing raw committed resources
+            loads.append(committed / capacity[key] if capacity[key] else committed)
+        return max(loads)
+
+    def place(self, resources):
+        """
+        Picks the least loaded reachable daemon for a new container needing resources and
+        reserves them there until release() is called. Returns the endpoint url or None.
+        """
+        best_host, best_load = None, None
+        for host, client in list(self._clients.items()):
+            try:
+                load = self._load(host, client, resources)
+            except Exception as e:
+                print(f"Docker daemon {host} unavailable for placement: {e}")
+                continue
+            if best_load is None or load < best_load:
+                best_host, best_load = host, load
+
+        if best_host:
+            with self._lock:
+                pending = self._pending.setdefault(best_host, {"cpus": 0.0, "memory_mb": 0})
+                pending["cpus"] += resources["cpus"]
+                pending["memory_mb"] += resources["memory_mb"]
+                self.placements[best_host] = self.placements.get(best_host, 0) + 1
+        return best_host
+
+    def release(self, host, resources):
+        with self._lock:
+            pending = self._pending.get(host)
+            if pending:
+                pending["cpus"] = max(0.0, pending["cpus"] - resources["cpus"])
+                pending["memory_mb"] = max(0, pending["memory_mb"] - resources["memory_mb"])
+
+    def get_stats(self):
+        stats = {"default": self.default_host, "daemons": {}}
+        for host, client in list(self._clients.items()):
+            try:
+                usage = admission.container_usage(client)
+                stats["daemons"][host] = {
+                    "capacity": admission.host_capacity(client),
+                    "committed": usage,
+                    "placements": self.placements.get(host, 0)
+                }
+            except Exception as e:
+                stats["daemons"][host] = {"error": str(e)}
+        return stats
+
+docker_daemons = DockerDaemonPool()
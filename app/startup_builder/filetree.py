@@ -0,0 +1,276 @@
+import posixpath
+import threading
+import time
+import uuid
+from .shell import TIMEOUT_EXIT_CODE
+
+# Directories listed in the tree but never descended into
+TREE_EXCLUDES = ["node_modules", ".git", "dist", "build", "__pycache__", "coverage", ".next"]
+
+# A cached tree younger than this is served without re-validating against the container
+TREE_MAX_AGE = 2 # seconds
+# Same, while a change watcher marks the tree dirty on every change (safety net only)
+TREE_WATCHED_MAX_AGE = 30
+TREE_MAX_OUTPUT = 16 * 1024 * 1024 # bytes of listing accepted from the container
+
+STAMP = "/tmp/.filetree_stamp"
+
+_PRUNE = "\\( " + " -o ".join(f"-name '{name}'" for name in TREE_EXCLUDES) + " \\) -prune"
+_ENTRY = "-printf 'E\\t%y\\t%s\\t%T@\\t%p\\n'"
+
+# Filesystem timestamps use a coarse clock, so the stamp is backdated by a second;
+# anything changed in that window is simply reported again on the next refresh.
+_TOUCH_STAMP = f'touch -d "@$(( $(date +%s) - 1 ))" {STAMP}.new'
+
+# Full listing: every entry under /app, excluded directories listed but not descended into
+BUILD_SCRIPT = f"""
+{_TOUCH_STAMP}
+find . -mindepth 1 {_PRUNE} {_ENTRY} -o {_ENTRY}
+mv -f {STAMP}.new {STAMP}
+"""
+
+# Incremental refresh: a directory's mtime changes whenever an entry is created, deleted or
+# renamed in it, so re-listing the directories newer than the stamp (plus the changed files)
+# catches every change made by agent commands, the terminal or the dev server.
+REFRESH_SCRIPT = f"""
+[ -f {STAMP} ] || {{ echo NOSTAMP; exit 0; }}
+{_TOUCH_STAMP}
+find . {_PRUNE} -o -newer {STAMP} -type d -print | while IFS= read -r d; do
+  printf 'D\\t%s\\n' "$d"
+  find "$d" -mindepth 1 -maxdepth 1 {_PRUNE} {_ENTRY} -o {_ENTRY}
+done
+find . {_PRUNE} -o -newer {STAMP} ! -type d {_ENTRY}
+mv -f {STAMP}.new {STAMP}
+"""
+
+# Recursive listing of directories that appeared with old mtimes (e.g. moved into /app)
+SUBTREE_SCRIPT = f"find __DIRS__ -mindepth 1 {_PRUNE} {_ENTRY} -o {_ENTRY}"
+
+ENTRY_TYPES = {"d": "directory", "f": "file", "l": "symlink"}
+
+def _normalize(path):
+    """Container listing path ('./src/app.js', '.') -> tree key ('src/app.js', '')."""
+    path = posixpath.normpath(path or ".")
+    return "" if path == "." else path.lstrip("/")
+
+def _parse_entry(line):
+    """Parses an 'E\\t<type>\\t<size>\\t<mtime>\\t<path>' line into (key, entry)."""
+    _, kind, size, mtime, path = line.split("\t", 4)
+    key = _normalize(path)
+    entry = {"type": ENTRY_TYPES.get(kind, "other"), "size": int(size), "mtime": round(float(mtime), 3)}
+    if entry["type"] == "directory" and posixpath.basename(key) in TREE_EXCLUDES:
+        entry["indexed"] = False
+    return key, entry
+
+class _Tree:
+    def __init__(self):
+        self.entries = {} # Key: path relative to /app, Value: {"type", "size", "mtime"}
+        self.generation = 0
+        self.validated_at = 0
+        self.dirty = True
+        self.lock = threading.Lock()
+
+class FileTreeCache:
+    """
+    One recursive file-tree index per container, with size and mtime metadata.
+    write_files updates it in place, commands mark it dirty, and a stamp-file
+    change scan inside the container refreshes it incrementally when it is read.
+    The ETag changes only when the tree's content does.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._trees = {} # Key: container id, Value: _Tree
+        self._token = uuid.uuid4().hex[:8] # Keeps ETags from one process lifetime apart
+        self.hits = 0
+        self.builds = 0
+        self.refreshes = 0
+
+    def _tree(self, container_id):
+        with self._lock:
+            return self._trees.setdefault(container_id, _Tree())
+
+    def etag(self, container_id, tree):
+        return f"{container_id[:12]}-{self._token}-{tree.generation}"
+
+    def _load(self, container_id, run, max_age):
+        """Returns the container's tree, building or refreshing it first if needed. Caller holds tree.lock."""
+        tree = self._tree(container_id)
+        if not tree.entries and tree.validated_at == 0:
+            self._build(tree, run)
+        elif tree.dirty or time.time() - tree.validated_at > max_age:
+            self._refresh(tree, run)
+        else:
+            with self._lock:
+                self.hits += 1
+        return tree
+
+    def _run(self, run, script):
+        result = run(script, 120)
+        if result.get("error"):
+            raise RuntimeError(result["error"])
+        if result.get("exit_code") == TIMEOUT_EXIT_CODE:
+            # A partial listing would index a workspace with files missing
+            raise RuntimeError("File tree listing timed out")
+        output = result.get("output", "")
+        if "[Output truncated" in output:
+            print("File tree listing truncated; the index will be incomplete")
+        return output
+
+    def _build(self, tree, run):
+        entries = {}
+        for line in self._run(run, BUILD_SCRIPT).splitlines():
+            if line.startswith("E\t"):
+                key, entry = _parse_entry(line)
+                entries[key] = entry
+        tree.entries = entries
+        tree.generation += 1
+        tree.validated_at = time.time()
+        tree.dirty = False
+        with self._lock:
+            self.builds += 1
+
+    def _refresh(self, tree, run):
+        output = self._run(run, REFRESH_SCRIPT)
+        if output.strip() == "NOSTAMP":
+            self._build(tree, run)
+            return
+
+        relisted = {} # Key: directory, Value: {child path: entry}
+        changed = {}
+        current = None
+        for line in output.splitlines():
+            if line.startswith("D\t"):
+                current = _normalize(line[2:])
+                relisted[current] = {}
+            elif line.startswith("E\t"):
+                key, entry = _parse_entry(line)
+                if current is not None and posixpath.dirname(key) == current:
+                    relisted[current][key] = entry
+                else:
+                    changed[key] = entry
+
+        entries = tree.entries
+        before = len(entries)
+        modified = False
+
+        # Drop children (and their subtrees) that vanished from re-listed directories
+        gone = [key for key in entries if key and posixpath.dirname(key) in relisted
+                and key not in relisted[posixpath.dirname(key)]]
+        for key in gone:
+            prefix = key + "/"
+            for sub in [k for k in entries if k == key or k.startswith(prefix)]:
+                del entries[sub]
+
+        new_dirs = []
+        for children in relisted.values():
+            for key, entry in children.items():
+                if key not in entries and entry["type"] == "directory" and entry.get("indexed", True) \
+                        and key not in relisted:
+                    new_dirs.append(key)
+                if entries.get(key) != entry:
+                    entries[key] = entry
+                    modified = True
+        for key, entry in changed.items():
+            if entries.get(key) != entry:
+                entries[key] = entry
+                modified = True
+
+        # Directories with old mtimes that are new to us were not scanned; list them in full
+        if new_dirs:
+            dirs = " ".join("'./" + d.replace("'", "'\\''") + "'" for d in new_dirs)
+            for line in self._run(run, SUBTREE_SCRIPT.replace("__DIRS__", dirs)).splitlines():
+                if line.startswith("E\t"):
+                    key, entry = _parse_entry(line)
+                    entries[key] = entry
+
+        if modified or gone or new_dirs or len(entries) != before:
+            tree.generation += 1
+        tree.validated_at = time.time()
+        tree.dirty = False
+        with self._lock:
+            self.refreshes += 1
+
+    def list_dir(self, container_id, run, path=".", max_age=TREE_MAX_AGE):
+        """
+        Returns (children, etag) of path: [{"name", "type", "path", "size", "mtime"}], or (None, etag)
+        if path is not a directory in the index (e.g. inside node_modules).
+        """
+        base = _normalize(path)
+        tree = self._tree(container_id)
+        with tree.lock:
+            self._load(container_id, run, max_age)
+            if base and tree.entries.get(base, {}).get("type") != "directory":
+                return None, self.etag(container_id, tree)
+            if base and tree.entries[base].get("indexed") is False:
+                return None, self.etag(container_id, tree)
+            children = [
+                dict(entry, name=posixpath.basename(key), path=key)
+                for key, entry in tree.entries.items()
+                if key and posixpath.dirname(key) == base
+            ]
+            return sorted(children, key=lambda c: (c["type"] != "directory", c["name"])), self.etag(container_id, tree)
+
+    def list_tree(self, container_id, run, path=".", max_age=TREE_MAX_AGE):
+        """Returns ([{"path", "type", "size", "mtime"}] for everything under path, etag)."""
+        base = _normalize(path)
+        prefix = base + "/" if base else ""
+        tree = self._tree(container_id)
+        with tree.lock:
+            self._load(container_id, run, max_age)
+            items = [
+                dict(entry, path=key)
+                for key, entry in tree.entries.items()
+                if key and key.startswith(prefix)
+            ]
+            return sorted(items, key=lambda item: item["path"]), self.etag(container_id, tree)
+
+    def mark_dirty(self, container_id):
+        """Called after commands that may have changed the workspace."""
+        with self._lock:
+            tree = self._trees.get(container_id)
+        if tree:
+            tree.dirty = True
+
+    def record_writes(self, container_id, files):
+        """Write-through update for files written via put_archive. files: {path: size}"""
+        with self._lock:
+            tree = self._trees.get(container_id)
+        if not tree:
+            return
+        now = round(time.time(), 3)
+        with tree.lock:
+            if not tree.entries:
+                return
+            for path, size in files.items():
+                key = _normalize(path)
+                if any(tree.entries.get(parent, {}).get("indexed") is False for parent in self._parents(key)):
+                    continue
+                tree.entries[key] = {"type": "file", "size": size, "mtime": now}
+                parent = posixpath.dirname(key)
+                while parent and parent not in tree.entries:
+                    tree.entries[parent] = {"type": "directory", "size": 4096, "mtime": now}
+                    parent = posixpath.dirname(parent)
+            tree.generation += 1
+
+    @staticmethod
+    def _parents(key):
+        parent = posixpath.dirname(key)
+        while parent:
+            yield parent
+            parent = posixpath.dirname(parent)
+
+    def drop(self, container_id):
+        with self._lock:
+            self._trees.pop(container_id, None)
+
+    def get_stats(self):
+        with self._lock:
+            return {
+                "trees": len(self._trees),
+                "entries": sum(len(tree.entries) for tree in self._trees.values()),
+                "hits": self.hits,
+                "builds": self.builds,
+                "refreshes": self.refreshes
+            }
+
+file_trees = FileTreeCache()
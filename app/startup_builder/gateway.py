@@ -0,0 +1,201 @@
+import socket
+import threading
+import time
+from urllib.parse import urlparse
+import urllib3
+
+DEFAULT_PREVIEW_PORT = 3000
+ROUTE_TTL = 30 # seconds a resolved route is trusted without re-checking the container
+POOL_SIZE = 10 # keep-alive connections per upstream
+UPSTREAM_TIMEOUT = urllib3.Timeout(connect=5, read=120)
+STREAM_CHUNK = 64 * 1024
+
+# Headers that describe one connection and must not be forwarded (RFC 9110 7.6.1)
+HOP_BY_HOP = {"connection", "keep-alive", "proxy-authenticate", "proxy-authorization",
+              "te", "trailer", "transfer-encoding", "upgrade"}
+
+class PreviewGateway:
+    """
+    Reverse proxy from /preview/<startup_id>[:<port>]/... to the dev server inside the
+    startup's container. Routes are resolved from the (cached) container handle once and
+    kept for ROUTE_TTL; upstream connections are reused from keep-alive pools.
+    Local daemons are reached over the Docker network (container IP, any port); remote
+    daemons, or every daemon when use_published_ports is set, through published host ports.
+    """
+    def __init__(self):
+        self.use_published_ports = False
+        self._lock = threading.Lock()
+        self._routes = {} # Key: (startup_id, port or None), Value: route dict
+        self._pool = urllib3.PoolManager(num_pools=200, maxsize=POOL_SIZE, block=False, retries=False)
+        self.requests = 0
+        self.websockets = 0
+        self.route_hits = 0
+        self.route_misses = 0
+        self.errors = 0
+
+    def configure(self, use_published_ports=False):
+        self.use_published_ports = use_published_ports
+
+    def resolve(self, startup_id, port, get_container, default_port=None):
+        """
+        Returns the route {"host", "port", "container_id", "container_name"} to the startup's
+        app, from cache when fresh. get_container(startup_id) is only called on a miss.
+        default_port(container_id): the port to use when none is given.
+        Raises LookupError if the container or port is unreachable.
+        """
+        key = (str(startup_id), port)
+        now = time.time()
+        with self._lock:
+            route = self._routes.get(key)
+            if route and route["expires"] > now:
+                self.route_hits += 1
+                return route
+            self.route_misses += 1
+
+        container = get_container(startup_id)
+        if container.status != 'running':
+            raise LookupError("Container not running")
+        target_port = port or (default_port(container.id) if default_port else None) or DEFAULT_PREVIEW_PORT
+        host, host_port = self._address(container, target_port)
+        route = {
+            "host": host, "port": host_port, "container_id": container.id,
+            "container_name": container.name, "expires": now + ROUTE_TTL
+        }
+        with self._lock:
+            self._routes[key] = route
+        return route
+
+    def _address(self, container, port):
+        base_url = urlparse(container.client.api.base_url)
+        remote = base_url.scheme in ("tcp", "http", "https") and base_url.hostname not in ("localhost", "127.0.0.1")
+        if not remote and not self.use_published_ports:
+            networks = container.attrs['NetworkSettings'].get('Networks') or {}
+            for network in networks.values():
+                if network.get('IPAddress'):
+                    return network['IPAddress'], port
+        mappings = (container.attrs['NetworkSettings'].get('Ports') or {}).get(f"{port}/tcp")
+        if not mappings:
+            raise LookupError(f"Port {port} is not published")
+        host = base_url.hostname if remote else "127.0.0.1"
+        return host, int(mappings[0]['HostPort'])
+
+    def forget(self, startup_id=None, container_id=None):
+        """Drops cached routes of a startup or container, e.g. after a connection failure."""
+        with self._lock:
+            for key, route in list(self._routes.items()):
+                if (startup_id is not None and key[0] == str(startup_id)) or route["container_id"] == container_id:
+                    del self._routes[key]
+
+    @staticmethod
+    def upstream_headers(environ, route, prefix):
+        """Request headers for the upstream: hop-by-hop headers dropped, X-Forwarded-* added."""
+        headers = {}
+        for key, value in environ.items():
+            if key.startswith("HTTP_"):
+                name = key[5:].replace("_", "-").title()
+                headers[name] = value
+        if environ.get("CONTENT_TYPE"):
+            headers["Content-Type"] = environ["CONTENT_TYPE"]
+        if environ.get("CONTENT_LENGTH"):
+            headers["Content-Length"] = environ["CONTENT_LENGTH"]
+        connection_tokens = {token.strip().lower() for token in headers.get("Connection", "").split(",")}
+        headers = {k: v for k, v in headers.items() if k.lower() not in HOP_BY_HOP | connection_tokens}
+        # Dev servers (webpack, vite) reject unknown Host headers but always accept localhost
+        headers["Host"] = f"localhost:{route['port']}"
+        forwarded_for = environ.get("HTTP_X_FORWARDED_FOR")
+        remote = environ.get("REMOTE_ADDR", "")
+        headers["X-Forwarded-For"] = f"{forwarded_for}, {remote}" if forwarded_for else remote
+        headers["X-Forwarded-Proto"] = environ.get("wsgi.url_scheme", "http")
+        headers["X-Forwarded-Host"] = environ.get("HTTP_HOST", "")
+        headers["X-Forwarded-Prefix"] = prefix
+        return headers
+
+    def request(self, route, method, path, headers, body):
+        """Sends the request over a pooled connection. Returns the unread urllib3 response."""
+        with self._lock:
+            self.requests += 1
+        return self._pool.urlopen(
+            method, f"http://{route['host']}:{route['port']}{path}", body=body, headers=headers,
+            redirect=False, preload_content=False, decode_content=False, timeout=UPSTREAM_TIMEOUT
+        )
+
+    @staticmethod
+    def response_headers(upstream, route, prefix):
+        """Response headers for the client; redirects into the app stay under the preview prefix."""
+        headers = []
+        for name, value in upstream.headers.items():
+            if name.lower() in HOP_BY_HOP or name.lower() == "content-length" and upstream.headers.get("Transfer-Encoding"):
+                continue
+            if name.lower() == "location":
+                for origin in (f"http://{route['host']}:{route['port']}", f"http://localhost:{route['port']}"):
+                    if value.startswith(origin):
+                        value = value[len(origin):] or "/"
+                if value.startswith("/") and not value.startswith("//"):
+                    value = prefix + value
+            headers.append((name, value))
+        return headers
+
+    @staticmethod
+    def stream(upstream):
+        try:
+            for chunk in upstream.stream(STREAM_CHUNK, decode_content=False):
+                yield chunk
+        finally:
+            upstream.release_conn()
+
+    def tunnel(self, client_sock, route, environ, path, prefix):
+        """
+        Relays a websocket (or any Upgrade) handshake and then raw bytes in both directions
+        between the client socket and the upstream until either side closes.
+        """
+        upstream = socket.create_connection((route["host"], route["port"]), timeout=5)
+        upstream.settimeout(None)
+        headers = self.upstream_headers(environ, route, prefix)
+        # The upgrade itself is the point here, so these hop-by-hop headers are forwarded
+        headers["Connection"] = "Upgrade"
+        headers["Upgrade"] = environ.get("HTTP_UPGRADE", "websocket")
+        head = f"{environ['REQUEST_METHOD']} {path} HTTP/1.1\r\n" + \
+            "".join(f"{name}: {value}\r\n" for name, value in headers.items()) + "\r\n"
+        upstream.sendall(head.encode('latin-1'))
+        with self._lock:
+            self.websockets += 1
+
+        def pump(source, destination):
+            try:
+                while True:
+                    data = source.recv(STREAM_CHUNK)
+                    if not data:
+                        break
+                    destination.sendall(data)
+            except OSError:
+                pass
+            finally:
+                for sock in (source, destination):
+                    try:
+                        sock.shutdown(socket.SHUT_RDWR)
+                    except OSError:
+                        pass
+
+        to_client = threading.Thread(target=pump, args=(upstream, client_sock), daemon=True)
+        to_client.start()
+        pump(client_sock, upstream)
+        to_client.join()
+        upstream.close()
+
+    def record_error(self):
+        with self._lock:
+            self.errors += 1
+
+    def get_stats(self):
+        with self._lock:
+            total = self.route_hits + self.route_misses
+            return {
+                "routes": len(self._routes),
+                "requests": self.requests,
+                "websockets": self.websockets,
+                "route_hit_rate": round(self.route_hits / total, 3) if total else 0.0,
+                "upstream_pools": len(self._pool.pools),
+                "errors": self.errors
+            }
+
+preview_gateway = PreviewGateway()
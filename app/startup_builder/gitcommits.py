@@ -0,0 +1,182 @@
+import re
+import shlex
+import threading
+import time
+from collections import deque
+
+COMMIT_WINDOW = 30 # seconds a batch of step changes may stay uncommitted
+COMMIT_HISTORY = 500 # commits remembered per startup for step lookups
+MAINTENANCE_EVERY = 50 # commits between background `git maintenance` runs
+
+# Never worth versioning, even when the project has no .gitignore yet
+GIT_EXCLUDES = ["node_modules/", "__pycache__/", ".next/", "coverage/", "app.log", "server.pid"]
+
+_SHA_PATTERN = re.compile(r"^__COMMIT__ ([0-9a-f]{40})$", re.MULTILINE)
+
+# One exec per batch: initializes the repository on first use (with the untracked cache on,
+# so `git add -A` of command steps does not rescan unchanged directories), stages the
+# batch's paths and commits if anything changed
+_COMMIT_SCRIPT = """
+if [ ! -d .git ]; then
+  git init -q
+  git config user.email 'ai@startup.studio'
+  git config user.name 'AI Developer'
+  git config core.untrackedCache true
+  git config feature.manyFiles true
+  printf '%s\\n' __EXCLUDES__ >> .git/info/exclude
+fi
+__STAGE__
+if ! git diff --cached --quiet 2>/dev/null; then
+  git commit -q --no-verify -F - <<'__STEP_COMMIT_MESSAGE__'
+__MESSAGE__
+__STEP_COMMIT_MESSAGE__
+fi
+echo "__COMMIT__ $(git rev-parse -q --verify HEAD)"
+"""
+
+class _Batch:
+    def __init__(self, task):
+        self.task = task
+        self.paths = set()
+        self.all_paths = False # a command step ran: its changes are unknown, so everything is staged
+        self.steps = []
+        self.opened = time.time()
+
+class WorkspaceCommits:
+    """
+    Git checkpoints of agent steps, committed in batches.
+    Steps are recorded with the paths they wrote; a batch is committed at a task boundary
+    or once it is COMMIT_WINDOW old, staging only those paths (`git add -A -- <paths>`)
+    instead of rescanning the whole workspace. Every step maps to the commit that
+    contains it, which is what rollbacks target.
+    run: callable(command, timeout) -> {"exit_code", "output"} in the container's /app.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._batches = {} # Key: startup_id, Value: _Batch not committed yet
+        self._history = {} # Key: startup_id, Value: deque of commit records, oldest first
+        self._since_maintenance = {} # Key: startup_id, Value: commits since the last maintenance run
+        self.commits = 0
+        self.steps = 0
+        self.full_stages = 0
+
+    def record(self, run, startup_id, step, paths=None, task=None):
+        """
+        Adds a step to the startup's pending batch. paths: files the step wrote, or None when
+        the step may have changed anything. Commits the batch if its window has passed.
+        Returns the commit record if the step was committed now, else None.
+        """
+        with self._lock:
+            batch = self._batches.get(startup_id)
+            if batch is None or (task is not None and batch.task != task):
+                # A batch never spans tasks; the previous task's changes are committed first
+                previous = batch
+                batch = self._batches[startup_id] = _Batch(task)
+            else:
+                previous = None
+            if paths is None:
+                batch.all_paths = True
+            else:
+                batch.paths.update(paths)
+            batch.steps.append({"id": step.get("id"), "description": step.get("description", "")})
+            self.steps += 1
+            due = time.time() - batch.opened >= COMMIT_WINDOW
+        if previous is not None:
+            self._commit(run, startup_id, previous)
+        return self.flush(run, startup_id) if due else None
+
+    def flush(self, run, startup_id, paths=(), task=None):
+        """Commits the pending batch (plus paths, e.g. task bookkeeping files). Returns the commit record or None."""
+        with self._lock:
+            batch = self._batches.pop(startup_id, None)
+            if batch is None and not paths:
+                return None
+            batch = batch or _Batch(task)
+            batch.paths.update(paths)
+            batch.task = batch.task or task
+        return self._commit(run, startup_id, batch)
+
+    def _commit(self, run, startup_id, batch):
+        if batch.all_paths or not batch.paths:
+            stage = "git add -A"
+        else:
+            quoted = " ".join(shlex.quote(path) for path in sorted(batch.paths))
+            # A path deleted again later in the batch makes the pathspec fail; fall back to a full stage
+            stage = f"git add -A -- {quoted} 2>/dev/null || git add -A"
+        script = _COMMIT_SCRIPT.replace("__EXCLUDES__", " ".join(shlex.quote(e) for e in GIT_EXCLUDES)) \
+            .replace("__STAGE__", stage).replace("__MESSAGE__", self._message(batch))
+        result = run(script, 120)
+        output = result.get("output", "") or ""
+        match = _SHA_PATTERN.search(output)
+        if not match:
+            if "__COMMIT__" in output:
+                return None # Nothing committed yet and nothing to commit
+            print(f"Git checkpoint failed for {startup_id}: {result.get('error') or result.get('output', '')[-500:]}")
+            return None
+
+        record = {"commit": match.group(1), "task": batch.task, "steps": batch.steps, "committed_at": time.time()}
+        with self._lock:
+            history = self._history.setdefault(startup_id, deque(maxlen=COMMIT_HISTORY))
+            if not history or history[-1]["commit"] != record["commit"]:
+                self.commits += 1
+                self._since_maintenance[startup_id] = self._since_maintenance.get(startup_id, 0) + 1
+            history.append(record)
+            if batch.all_paths:
+                self.full_stages += 1
+            maintenance_due = self._since_maintenance.get(startup_id, 0) >= MAINTENANCE_EVERY
+            if maintenance_due:
+                self._since_maintenance[startup_id] = 0
+        if maintenance_due:
+            # Repacks and commit-graph updates run detached, off the agent's path
+            run("nohup git maintenance run --auto --quiet > /dev/null 2>&1 &", 30)
+        return record
+
+    @staticmethod
+    def _message(batch):
+        steps = batch.steps
+        if len(steps) == 1:
+            subject = f"Step {steps[0]['id']}: {steps[0]['description']}"
+        elif steps:
+            subject = f"Steps {steps[0]['id']}-{steps[-1]['id']}" + (f" of {batch.task}" if batch.task else "")
+        else:
+            subject = f"Task: {batch.task}" if batch.task else "Workspace checkpoint"
+        body = "\n".join(f"- Step {s['id']}: {s['description']}" for s in steps) if len(steps) > 1 else ""
+        # The message is fed through a quoted heredoc; its terminator must not appear on a line of its own
+        message = (subject.splitlines()[0] if subject else "") + ("\n\n" + body if body else "")
+        return message.replace("__STEP_COMMIT_MESSAGE__", "STEP_COMMIT_MESSAGE")
+
+    def pending(self, startup_id):
+        with self._lock:
+            batch = self._batches.get(startup_id)
+            return len(batch.steps) if batch else 0
+
+    def history(self, startup_id):
+        """Returns the startup's commit records, newest first."""
+        with self._lock:
+            return list(reversed(self._history.get(startup_id, ())))
+
+    def commit_for(self, startup_id, step_id, task=None):
+        """Returns the SHA of the latest commit containing the step (optionally within task), or None."""
+        for record in self.history(startup_id):
+            if task is not None and record["task"] != task:
+                continue
+            if any(str(step["id"]) == str(step_id) for step in record["steps"]):
+                return record["commit"]
+        return None
+
+    def discard(self, startup_id):
+        """Drops pending step records, e.g. after a rollback made them moot."""
+        with self._lock:
+            self._batches.pop(startup_id, None)
+
+    def get_stats(self):
+        with self._lock:
+            return {
+                "commits": self.commits,
+                "steps": self.steps,
+                "steps_per_commit": round(self.steps / self.commits, 2) if self.commits else None,
+                "full_stages": self.full_stages,
+                "pending_batches": len(self._batches)
+            }
+
+workspace_commits = WorkspaceCommits()
@@ -25,6 +25,8 @@ class AgentState(TypedDict):
     plan: List[dict]
     current_step_index: int
     current_step: dict
+    current_steps: List[dict] # Parallel wave being executed (empty when running one step)
+    step_results: List[dict] # Results of current_steps, in the same order
     code_changes: dict
     error_history: List[str]
     logs: List[str]
@@ -34,7 +36,7 @@ class AgentState(TypedDict):
     completed_tasks: int # Number of completed tasks
     status: str # "planning", "coding", "reviewing", "done", "failed", "waiting_approval"
 
-def create_graph(architect_node, spec_approval_node, task_manager_node, reasoning_node, planner_node, developer_node, executor_node, reviewer_node, debugger_node, strategist_node, overseer_node, tester_node, test_gen_node, db_path="checkpoints.sqlite"):
+def create_graph(architect_node, spec_approval_node, task_manager_node, reasoning_node, planner_node, developer_node, executor_node, reviewer_node, debugger_node, strategist_node, overseer_node, tester_node, test_gen_node, task_workers_node=None, db_path="checkpoints.sqlite"):
     # Initialize Checkpointer
     conn = sqlite3.connect(db_path, check_same_thread=False)
     checkpointer = SqliteSaver(conn)
@@ -106,6 +108,8 @@ def developer_route(state):
         return "reasoning" # Go to planning
     elif state["status"] == "coding":
         return "executor"
+    elif state["status"] == "parallel_tasks":
+        return "task_workers" # Pending tasks go to parallel workers
     elif state["status"] == "execution_done":
         return "overseer" # Go to QA
     return "overseer"
@@ -139,7 +143,15 @@ def strategist_route(state):
         return "developer" # Skip step, go back to dev
     return "failed"
 
-def create_graph(architect_node, spec_approval_node, task_manager_node, reasoning_node, planner_node, developer_node, executor_node, reviewer_node, debugger_node, strategist_node, overseer_node, tester_node, test_gen_node, db_path="checkpoints.sqlite"):
+def task_workers_route(state):
+    if state["status"] == "failed":
+        # A worker's task that needs the environment re-planned escalates like a failed step would
+        if state.get("error_category") == "INFRASTRUCTURE":
+            return "architect"
+        return "failed"
+    return "developer"
+
+def create_graph(architect_node, spec_approval_node, task_manager_node, reasoning_node, planner_node, developer_node, executor_node, reviewer_node, debugger_node, strategist_node, overseer_node, tester_node, test_gen_node, task_workers_node=None, db_path="checkpoints.sqlite"):
     # Initialize Checkpointer
     conn = sqlite3.connect(db_path, check_same_thread=False)
     checkpointer = SqliteSaver(conn)
@@ -162,6 +174,8 @@ def create_graph(architect_node, spec_approval_node, task_manager_node, reasonin
     workflow.add_node("reviewer", reviewer_node)
     workflow.add_node("debugger", debugger_node)
     workflow.add_node("strategist", strategist_node) # New Node
+    if task_workers_node:
+        workflow.add_node("task_workers", task_workers_node)
 
     # Team C: QA
     workflow.add_node("tester", tester_node)
@@ -200,15 +214,23 @@ def create_graph(architect_node, spec_approval_node, task_manager_node, reasonin
     workflow.add_edge("planner", "overseer") 
 
     # Execution Loop
-    workflow.add_conditional_edges(
-        "developer",
-        developer_route,
-        {
-            "reasoning": "reasoning",
-            "executor": "executor",
-            "overseer": "overseer"
-        }
-    )
+    developer_routes = {
+        "reasoning": "reasoning",
+        "executor": "executor",
+        "overseer": "overseer"
+    }
+    if task_workers_node:
+        developer_routes["task_workers"] = "task_workers"
+        workflow.add_conditional_edges(
+            "task_workers",
+            task_workers_route,
+            {
+                "developer": "developer", # All tasks done (or the rest stays queued)
+                "architect": "architect",
+                "failed": END
+            }
+        )
+    workflow.add_conditional_edges("developer", developer_route, developer_routes)
 
     workflow.add_edge("executor", "reviewer")
     
@@ -246,3 +268,60 @@ def create_graph(architect_node, spec_approval_node, task_manager_node, reasonin
 
     # Compile
     return workflow.compile(checkpointer=checkpointer, interrupt_before=["executor", "spec_approval"])
+
+def create_task_graph(developer_node, reasoning_node, planner_node, executor_node, reviewer_node, debugger_node, strategist_node):
+    """
+    Sub-graph a parallel task worker runs: the execution loop for a single task, from
+    planning to its last reviewed step. It has no checkpointer or approvals and ends
+    where the main graph would leave the loop (task done, escalation or failure);
+    QA runs once in the main graph after all workers finish.
+    """
+    workflow = StateGraph(AgentState)
+
+    workflow.add_node("developer", developer_node)
+    workflow.add_node("reasoning", reasoning_node)
+    workflow.add_node("planner", planner_node)
+    workflow.add_node("executor", executor_node)
+    workflow.add_node("reviewer", reviewer_node)
+    workflow.add_node("debugger", debugger_node)
+    workflow.add_node("strategist", strategist_node)
+
+    workflow.set_entry_point("developer")
+
+    workflow.add_conditional_edges(
+        "developer",
+        developer_route,
+        {
+            "reasoning": "reasoning",
+            "executor": "executor",
+            "overseer": END # Task complete
+        }
+    )
+    workflow.add_edge("reasoning", "planner")
+    workflow.add_edge("planner", "developer")
+    workflow.add_edge("executor", "reviewer")
+    workflow.add_conditional_edges(
+        "reviewer",
+        reviewer_route,
+        {
+            "debugger": "debugger",
+            "strategist": "strategist",
+            "architect": END, # Infrastructure escalations are handled by the main graph
+            "next_step": "developer",
+            "complete": "developer",
+            "failed": END
+        }
+    )
+    workflow.add_edge("debugger", "executor")
+    workflow.add_conditional_edges(
+        "strategist",
+        strategist_route,
+        {
+            "planner": "planner",
+            "reasoning": "reasoning",
+            "developer": "developer",
+            "failed": END
+        }
+    )
+
+    return workflow.compile()
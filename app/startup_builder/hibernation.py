@@ -0,0 +1,138 @@
+import threading
+import time
+
+class ContainerHibernator:
+    """
+    Pauses, then stops, builder containers that have been idle for too long.
+    Activity is recorded by DockerManager (agent steps, file API calls) and by the
+    terminal socket handlers via touch(). Paused containers are unpaused, and
+    containers stopped here are started again, on their next use.
+    Stopping a container also stops its dev server; the Tester restarts it when needed.
+    """
+    def __init__(self):
+        self.pause_after = 0 # seconds idle before pausing, 0 disables
+        self.stop_after = 0 # seconds idle before stopping, 0 disables
+        self.check_interval = 60
+        self._lock = threading.Lock()
+        self._last_activity = {} # Key: container name, Value: timestamp
+        self._hibernated = {} # Key: container name, Value: "paused" | "stopped"
+        self._memory = {} # Key: container name, Value: memory usage (bytes) when it went idle
+        self._baseline = time.time() # Containers not seen since startup count as active at startup
+        self._workers = {} # Key: daemon base url, Value: check thread
+        self.paused = 0
+        self.stopped = 0
+        self.resumed = 0
+        self.reclaimed_bytes = 0
+
+    def configure(self, pause_after, stop_after, check_interval=60):
+        self.pause_after = pause_after
+        self.stop_after = stop_after
+        self.check_interval = check_interval
+
+    def start(self, client, label, exclude_prefixes=()):
+        """
+        Starts (once per process and daemon) the idle check loop over containers carrying label.
+        Containers whose names start with one of exclude_prefixes (e.g. the warm pool) are left alone.
+        """
+        with self._lock:
+            worker = self._workers.get(client.api.base_url)
+            if not (self.pause_after or self.stop_after) or (worker and worker.is_alive()):
+                return
+            worker = threading.Thread(target=self._run, args=(client, label, exclude_prefixes), daemon=True)
+            self._workers[client.api.base_url] = worker
+            worker.start()
+
+    def touch(self, container_name):
+        with self._lock:
+            self._last_activity[container_name] = time.time()
+
+    def is_hibernated(self, container_name):
+        with self._lock:
+            return container_name in self._hibernated
+
+    def resume(self, container):
+        """Unpauses or starts a hibernated container. Returns True if it was resumed."""
+        with self._lock:
+            state = self._hibernated.pop(container.name, None)
+            self._last_activity[container.name] = time.time()
+        if container.status == 'paused':
+            container.unpause()
+        elif state == "stopped" and container.status != 'running':
+            container.start()
+        else:
+            return False
+        container.reload()
+        with self._lock:
+            self.resumed += 1
+        print(f"Hibernation: resumed {container.name}")
+        return True
+
+    def _run(self, client, label, exclude_prefixes):
+        while True:
+            try:
+                self.check(client, label, exclude_prefixes)
+            except Exception as e:
+                print(f"Hibernation check error: {e}")
+            time.sleep(self.check_interval)
+
+    def check(self, client, label, exclude_prefixes=()):
+        now = time.time()
+        for container in client.containers.list(filters={"label": label, "status": "running"}) + \
+                         client.containers.list(filters={"label": label, "status": "paused"}):
+            name = container.name
+            if name.startswith(tuple(exclude_prefixes)):
+                continue
+            with self._lock:
+                idle = now - self._last_activity.get(name, self._baseline)
+
+            if self.stop_after and idle >= self.stop_after:
+                self._stop(container)
+            elif self.pause_after and idle >= self.pause_after and container.status == 'running':
+                self._pause(container)
+
+    def _memory_usage(self, container):
+        try:
+            return container.stats(stream=False).get("memory_stats", {}).get("usage", 0) or 0
+        except Exception:
+            return 0
+
+    def _pause(self, container):
+        usage = self._memory_usage(container)
+        container.pause()
+        with self._lock:
+            self._hibernated[container.name] = "paused"
+            self._memory[container.name] = usage
+            self.paused += 1
+        print(f"Hibernation: paused idle container {container.name} ({usage // (1024 * 1024)} MB)")
+
+    def _stop(self, container):
+        with self._lock:
+            usage = self._memory.pop(container.name, None)
+        if usage is None:
+            usage = self._memory_usage(container)
+        if container.status == 'paused':
+            container.unpause()
+        container.stop()
+        with self._lock:
+            self._hibernated[container.name] = "stopped"
+            self.stopped += 1
+            self.reclaimed_bytes += usage
+        print(f"Hibernation: stopped idle container {container.name}, reclaimed {usage // (1024 * 1024)} MB")
+
+    def get_stats(self):
+        with self._lock:
+            states = list(self._hibernated.values())
+            return {
+                "pause_after": self.pause_after,
+                "stop_after": self.stop_after,
+                "currently_paused": states.count("paused"),
+                "currently_stopped": states.count("stopped"),
+                "paused": self.paused,
+                "stopped": self.stopped,
+                "resumed": self.resumed,
+                # Paused containers keep their memory; it is only freed once they are stopped
+                "paused_bytes": sum(self._memory.values()),
+                "reclaimed_bytes": self.reclaimed_bytes
+            }
+
+hibernator = ContainerHibernator()
@@ -0,0 +1,291 @@
+import hashlib
+import json
+import threading
+import uuid
+from collections import OrderedDict
+from .shell import iter_exec_frames, send_exec_input
+
+LINT_TIMEOUT = 120 # seconds per batch
+LINT_CACHE_SIZE = 5000 # cached results, across containers
+
+# Files whose change can alter lint results
+LINT_CONFIG_FILES = ("eslint.config.js", "eslint.config.mjs", "eslint.config.cjs", ".flake8", "setup.cfg", "tox.ini")
+
+LINT_TOOLS = {".js": "eslint", ".jsx": "eslint", ".ts": "eslint", ".tsx": "eslint", ".py": "flake8"}
+
+DEFAULT_ESLINT_CONFIG = 'module.exports = [{files: ["**/*.js", "**/*.ts", "**/*.jsx", "**/*.tsx"], rules: {"no-unused-vars": "warn", "no-undef": "error"}}];'
+
+# Both daemons read one JSON request per line on stdin:
+#   {"id", "files": [{"path": "/app/...", "text": "..."}]}
+# and answer with one JSON line: {"id", "results": {path: {"errors": int, "output": str}}} or {"id", "error"}.
+# They lint the given text as if it were at path, so files need not be written yet.
+
+ESLINT_DAEMON = r'''
+const fs = require('fs');
+const path = require('path');
+const readline = require('readline');
+const { execSync } = require('child_process');
+
+const DEFAULT_CONFIG = '/tmp/eslint.config.js';
+const CONFIG_NAMES = ['eslint.config.js', 'eslint.config.mjs', 'eslint.config.cjs'];
+let eslintModule = null;
+let cached = { key: null };
+
+function loadESLint() {
+  if (!eslintModule) {
+    // Prefer the project's own eslint, then the global install
+    const paths = ['/app'];
+    try { paths.push(execSync('npm root -g').toString().trim()); } catch (e) {}
+    eslintModule = require(require.resolve('eslint', { paths }));
+  }
+  return eslintModule;
+}
+
+// Config detection is cached until the project config appears, disappears or changes
+async function getLinter() {
+  let configFile = DEFAULT_CONFIG;
+  let key = 'default';
+  for (const name of CONFIG_NAMES) {
+    const candidate = path.join('/app', name);
+    if (fs.existsSync(candidate)) {
+      configFile = candidate;
+      key = candidate + ':' + fs.statSync(candidate).mtimeMs;
+      break;
+    }
+  }
+  if (key !== cached.key) {
+    if (key === 'default' && !fs.existsSync(DEFAULT_CONFIG)) {
+      fs.writeFileSync(DEFAULT_CONFIG, __DEFAULT_CONFIG__);
+    }
+    const { ESLint } = loadESLint();
+    const linter = new ESLint({ cwd: '/app', overrideConfigFile: configFile });
+    cached = { key, linter, formatter: await linter.loadFormatter('stylish') };
+  }
+  return cached;
+}
+
+const send = (message) => process.stdout.write(JSON.stringify(message) + '\n');
+
+readline.createInterface({ input: process.stdin }).on('line', async (line) => {
+  let request;
+  try { request = JSON.parse(line); } catch (e) { return; }
+  try {
+    const { linter, formatter } = await getLinter();
+    const results = {};
+    for (const file of request.files) {
+      const lintResults = await linter.lintText(file.text, { filePath: file.path, warnIgnored: false });
+      const errors = lintResults.reduce((total, result) => total + result.errorCount, 0);
+      const warnings = lintResults.reduce((total, result) => total + result.warningCount, 0);
+      results[file.path] = { errors, output: errors || warnings ? await formatter.format(lintResults) : '' };
+    }
+    send({ id: request.id, results });
+  } catch (e) {
+    send({ id: request.id, error: String((e && e.stack) || e) });
+  }
+}).on('close', () => process.exit(0));
+'''.replace("__DEFAULT_CONFIG__", json.dumps(DEFAULT_ESLINT_CONFIG))
+
+FLAKE8_DAEMON = r'''
+import contextlib, io, json, os, sys, tempfile
+from flake8.api import legacy
+
+os.chdir("/app")
+CONFIG_FILES = (".flake8", "setup.cfg", "tox.ini")
+state = {"key": None, "guide": None}
+
+def style_guide():
+    # Config detection is cached until one of the config files changes
+    key = tuple((name, os.stat(name).st_mtime) for name in CONFIG_FILES if os.path.exists(name))
+    if key != state["key"]:
+        state["guide"], state["key"] = legacy.get_style_guide(), key
+    return state["guide"]
+
+def lint(files):
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        targets = {}
+        for file in files:
+            target = os.path.join(tmp, os.path.relpath(file["path"], "/app"))
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            with open(target, "w") as f:
+                f.write(file["text"])
+            targets[target] = file["path"]
+        buffer = io.TextIOWrapper(io.BytesIO(), encoding="utf-8")
+        with contextlib.redirect_stdout(buffer):
+            style_guide().check_files(list(targets))
+        buffer.flush()
+        lines = buffer.buffer.getvalue().decode("utf-8").splitlines()
+    for target, original in targets.items():
+        errors = [original + line[len(target):] for line in lines if line.startswith(target + ":")]
+        results[original] = {"errors": len(errors), "output": "\n".join(errors)}
+    return results
+
+for line in sys.stdin:
+    try:
+        request = json.loads(line)
+    except ValueError:
+        continue
+    try:
+        message = {"id": request["id"], "results": lint(request["files"])}
+    except Exception as e:
+        message = {"id": request["id"], "error": repr(e)}
+    sys.stdout.write(json.dumps(message) + "\n")
+    sys.stdout.flush()
+'''
+
+DAEMON_COMMANDS = {
+    "eslint": ["node", "-e", ESLINT_DAEMON],
+    "flake8": ["python3", "-c", FLAKE8_DAEMON]
+}
+
+class LintDaemonError(Exception):
+    pass
+
+class LintDaemon:
+    """A long-running eslint or flake8 process inside a container, driven over one exec socket."""
+    def __init__(self, client, container, tool):
+        self.tool = tool
+        self.alive = True
+        self._lock = threading.Lock()
+        self._pending = {} # Key: request id, Value: {"event", "response"}
+        exec_id = client.api.exec_create(container.id, cmd=DAEMON_COMMANDS[tool], stdin=True, tty=False, workdir="/app")['Id']
+        self._sock = client.api.exec_start(exec_id, detach=False, tty=False, socket=True)
+        self._stderr = b""
+        threading.Thread(target=self._read_loop, daemon=True).start()
+
+    def _read_loop(self):
+        pending = b""
+        try:
+            for stream, payload in iter_exec_frames(self._sock):
+                if stream != 1:
+                    self._stderr = (self._stderr + payload)[-4096:]
+                    continue
+                pending += payload
+                *lines, pending = pending.split(b"\n")
+                for line in lines:
+                    try:
+                        message = json.loads(line)
+                    except ValueError:
+                        continue # Stray output from a plugin
+                    with self._lock:
+                        waiter = self._pending.get(message.get("id"))
+                    if waiter:
+                        waiter["response"] = message
+                        waiter["event"].set()
+        except Exception as e:
+            print(f"Lint daemon read error: {e}")
+        finally:
+            self.alive = False
+            with self._lock:
+                waiters = list(self._pending.values())
+            for waiter in waiters:
+                waiter["event"].set()
+
+    def lint(self, files, timeout=LINT_TIMEOUT):
+        """files: {container path: text}. Returns {path: {"errors", "output"}}. Raises LintDaemonError."""
+        if not self.alive:
+            raise LintDaemonError(f"{self.tool} daemon is not running: {self._stderr.decode('utf-8', errors='replace')}")
+        request_id = uuid.uuid4().hex
+        waiter = {"event": threading.Event(), "response": None}
+        with self._lock:
+            self._pending[request_id] = waiter
+        try:
+            request = {"id": request_id, "files": [{"path": path, "text": text} for path, text in files.items()]}
+            send_exec_input(self._sock, (json.dumps(request) + "\n").encode('utf-8'))
+            if not waiter["event"].wait(timeout):
+                self.close()
+                raise LintDaemonError(f"{self.tool} timed out after {timeout}s")
+        finally:
+            with self._lock:
+                self._pending.pop(request_id, None)
+
+        response = waiter["response"]
+        if response is None:
+            raise LintDaemonError(f"{self.tool} daemon exited: {self._stderr.decode('utf-8', errors='replace')}")
+        if "error" in response:
+            raise LintDaemonError(response["error"])
+        return response["results"]
+
+    def close(self):
+        self.alive = False
+        try:
+            # Closing stdin ends the daemon's read loop
+            self._sock.close()
+        except Exception:
+            pass
+
+class LintService:
+    """
+    Keeps one warm lint daemon per container and tool, and caches results by
+    (container, path, content hash). Config changes drop a container's cached results.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._daemons = {} # Key: (container id, tool), Value: LintDaemon
+        self._results = OrderedDict() # Key: (container id, path, sha256), Value: result, LRU
+        self.hits = 0
+        self.misses = 0
+        self.batches = 0
+
+    def daemon(self, client, container, tool):
+        key = (container.id, tool)
+        with self._lock:
+            daemon = self._daemons.get(key)
+            if daemon and daemon.alive:
+                return daemon
+        daemon = LintDaemon(client, container, tool)
+        with self._lock:
+            self._daemons[key] = daemon
+        return daemon
+
+    @staticmethod
+    def cache_key(container_id, path, content):
+        return (container_id, path, hashlib.sha256(content.encode('utf-8')).hexdigest())
+
+    def cached(self, key):
+        with self._lock:
+            result = self._results.get(key)
+            if result is None:
+                self.misses += 1
+                return None
+            self._results.move_to_end(key)
+            self.hits += 1
+            return result
+
+    def store(self, key, result):
+        with self._lock:
+            self._results[key] = result
+            self._results.move_to_end(key)
+            while len(self._results) > LINT_CACHE_SIZE:
+                self._results.popitem(last=False)
+
+    def record_batch(self):
+        with self._lock:
+            self.batches += 1
+
+    def invalidate(self, container_id):
+        """Drops cached results for a container, e.g. after a lint config changed."""
+        with self._lock:
+            for key in [key for key in self._results if key[0] == container_id]:
+                del self._results[key]
+
+    def close(self, container_id):
+        with self._lock:
+            daemons = [self._daemons.pop(key) for key in list(self._daemons) if key[0] == container_id]
+        for daemon in daemons:
+            daemon.close()
+        self.invalidate(container_id)
+
+    def get_stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "daemons": sum(1 for daemon in self._daemons.values() if daemon.alive),
+                "cached_results": len(self._results),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 3) if total else 0.0,
+                "batches": self.batches
+            }
+
+lint_service = LintService()
@@ -0,0 +1,166 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from langchain_core.messages import AIMessage
+
+LLM_CACHE_TTL = 7 * 24 * 3600 # seconds a cached response stays valid
+LLM_CACHE_MAX_ENTRIES = 5000
+# Nodes whose prompts are fully determined by workspace state, so replays can reuse answers
+# (reasoning and planner bypass the cache when the strategist sends them back after a failure)
+LLM_CACHE_NODES = ("context_manager", "task_manager", "reasoning", "planner")
+
+class LLMResponseCache:
+    """
+    Persistent cache of chat completions in SQLite, keyed by a hash of the normalized
+    messages, the model, its temperature and bound options (e.g. JSON mode).
+    Entries expire after ttl seconds; past max_entries the least recently used are evicted.
+    Only nodes listed in `nodes` are served from it (see wrap()).
+    """
+    def __init__(self):
+        self.path = "llm_cache.sqlite"
+        self.ttl = LLM_CACHE_TTL
+        self.max_entries = LLM_CACHE_MAX_ENTRIES
+        self.nodes = set(LLM_CACHE_NODES)
+        self._lock = threading.Lock()
+        self._conn = None
+        self.hits = {} # Key: node, Value: cache hits
+        self.misses = {} # Key: node, Value: cache misses
+        self.seconds_saved = 0.0 # LLM latency the hits did not pay
+
+    def configure(self, path=None, ttl=LLM_CACHE_TTL, max_entries=LLM_CACHE_MAX_ENTRIES, nodes=None):
+        """nodes: comma-separated node names, "" disables the cache, None keeps the defaults."""
+        if path:
+            self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        if nodes is not None:
+            self.nodes = {node.strip() for node in nodes.split(",") if node.strip()}
+
+    def _db(self):
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS llm_responses ("
+                "key TEXT PRIMARY KEY, node TEXT, content TEXT, latency REAL, created_at REAL, last_used REAL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS llm_responses_last_used ON llm_responses (last_used)")
+        return self._conn
+
+    @staticmethod
+    def key(messages, model, temperature, options=None):
+        """Hash of the prompt. Line endings and trailing whitespace do not change it."""
+        normalized = [
+            [getattr(message, "type", type(message).__name__),
+             "\n".join(line.rstrip() for line in str(message.content).replace("\r\n", "\n").split("\n")).strip()]
+            for message in messages
+        ]
+        payload = json.dumps({"messages": normalized, "model": model, "temperature": temperature, "options": options or {}},
+                             sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def get(self, key, node):
+        """Returns the cached response content, or None."""
+        now = time.time()
+        with self._lock:
+            db = self._db()
+            row = db.execute("SELECT content, latency, created_at FROM llm_responses WHERE key = ?", (key,)).fetchone()
+            if row and now - row[2] > self.ttl:
+                db.execute("DELETE FROM llm_responses WHERE key = ?", (key,))
+                db.commit()
+                row = None
+            if row is None:
+                self.misses[node] = self.misses.get(node, 0) + 1
+                return None
+            db.execute("UPDATE llm_responses SET last_used = ? WHERE key = ?", (now, key))
+            db.commit()
+            self.hits[node] = self.hits.get(node, 0) + 1
+            self.seconds_saved += row[1] or 0.0
+            return row[0]
+
+    def put(self, key, node, content, latency):
+        now = time.time()
+        with self._lock:
+            db = self._db()
+            db.execute(
+                "INSERT OR REPLACE INTO llm_responses (key, node, content, latency, created_at, last_used) VALUES (?, ?, ?, ?, ?, ?)",
+                (key, node, content, latency, now, now)
+            )
+            # Evict expired entries, then the least recently used beyond max_entries
+            db.execute("DELETE FROM llm_responses WHERE created_at < ?", (now - self.ttl,))
+            db.execute(
+                "DELETE FROM llm_responses WHERE key IN (SELECT key FROM llm_responses ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            )
+            db.commit()
+
+    def delete(self, key):
+        with self._lock:
+            db = self._db()
+            db.execute("DELETE FROM llm_responses WHERE key = ?", (key,))
+            db.commit()
+
+    def wrap(self, llm, node):
+        """Returns llm behind the cache for node, or llm itself if node is not opted in."""
+        if llm is None or node not in self.nodes:
+            return llm
+        return CachedChatModel(llm, node, self)
+
+    def get_stats(self):
+        with self._lock:
+            hits = sum(self.hits.values())
+            total = hits + sum(self.misses.values())
+            try:
+                entries = self._db().execute("SELECT COUNT(*) FROM llm_responses").fetchone()[0]
+            except sqlite3.Error:
+                entries = None
+            return {
+                "entries": entries,
+                "hits": dict(self.hits),
+                "misses": dict(self.misses),
+                "hit_rate": round(hits / total, 3) if total else 0.0,
+                "seconds_saved": round(self.seconds_saved, 1),
+                "nodes": sorted(self.nodes)
+            }
+
+class CachedChatModel:
+    """Stands in for a chat model (invoke, bind) and answers repeated prompts from the cache."""
+    def __init__(self, llm, node, cache, options=None, settings=None):
+        self._llm = llm
+        self._node = node
+        self._cache = cache
+        self._options = options or {}
+        # Bound runnables no longer expose the model's settings, so they are taken from the base model
+        self._settings = settings or (
+            getattr(llm, "deployment_name", None) or getattr(llm, "model_name", None), getattr(llm, "temperature", None)
+        )
+
+    def bind(self, **kwargs):
+        return CachedChatModel(self._llm.bind(**kwargs), self._node, self._cache, {**self._options, **kwargs}, self._settings)
+
+    def _key(self, messages):
+        return self._cache.key(messages, *self._settings, self._options)
+
+    def invoke(self, messages, *args, **kwargs):
+        if args or kwargs:
+            return self._llm.invoke(messages, *args, **kwargs)
+        key = self._key(messages)
+        content = self._cache.get(key, self._node)
+        if content is not None:
+            return AIMessage(content=content)
+        started = time.time()
+        response = self._llm.invoke(messages)
+        self._cache.put(key, self._node, response.content, time.time() - started)
+        return response
+
+    def forget(self, messages):
+        """Drops the cached answer to messages, e.g. one that turned out to be unusable."""
+        self._cache.delete(self._key(messages))
+
+llm_cache = LLMResponseCache()
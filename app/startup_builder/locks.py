@@ -0,0 +1,162 @@
+import contextlib
+import contextvars
+import posixpath
+import threading
+
+# Bookkeeping files every task updates, writable whatever the task claimed
+SHARED_PATHS = ("README.md", "PROGRESS.md", "artifacts/PROGRESS.md", "artifacts/tasks.json")
+
+# (startup_id, owner) of the task running in this context, set by acting_as()
+_acting = contextvars.ContextVar("workspace_owner", default=None)
+# (startup_id, path) pairs held by the hold() blocks around this context
+_held = contextvars.ContextVar("workspace_held", default=frozenset())
+
+class WorkspaceLocks:
+    """
+    File-level locks on startup workspaces, for agent work running side by side.
+    - hold(): short exclusive sections on exact paths, e.g. a read-modify-write of
+      artifacts/tasks.json. Paths are acquired in sorted order, so holders never deadlock.
+    - claim()/release(): long-lived, non-blocking reservations of the files and directories
+      a task will change. A claim fails while another owner claims an overlapping path
+      (the same path, a parent or a child); "" claims the whole workspace.
+    - acting_as()/refused(): code running for an owner (a task worker) may only write inside
+      its claim, under the paths it holds or to SHARED_PATHS; DockerManager.write_files rejects
+      other workspace writes.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._mutexes = {} # Key: (startup_id, path), Value: threading.Lock
+        self._claims = {} # Key: startup_id, Value: {owner: set of normalized paths}
+        self.holds = 0
+        self.contended_holds = 0
+        self.claims = 0
+        self.refused_claims = 0
+        self.refused_writes = 0
+
+    @staticmethod
+    def normalize(path):
+        """Workspace-relative form of a path ("/app/src/" -> "src"); "" is the whole workspace."""
+        path = (path or "").strip()
+        if path == "/app" or path.startswith("/app/"):
+            path = path[len("/app"):]
+        path = posixpath.normpath(path.lstrip("/") or ".")
+        return "" if path == "." else path
+
+    @staticmethod
+    def _covers(a, b):
+        """True if path a is b or one of its parents; "" covers the whole workspace."""
+        return a == "" or a == b or b.startswith(a + "/")
+
+    @staticmethod
+    def _overlap(a, b):
+        return a == "" or b == "" or a == b or a.startswith(b + "/") or b.startswith(a + "/")
+
+    @contextlib.contextmanager
+    def hold(self, startup_id, paths):
+        """Holds the exact paths exclusively for the duration of the block."""
+        with self._lock:
+            mutexes = [self._mutexes.setdefault((startup_id, path), threading.Lock())
+                       for path in sorted({self.normalize(path) for path in paths})]
+            self.holds += 1
+        acquired = []
+        token = None
+        try:
+            for mutex in mutexes:
+                if not mutex.acquire(blocking=False):
+                    with self._lock:
+                        self.contended_holds += 1
+                    mutex.acquire()
+                acquired.append(mutex)
+            token = _held.set(_held.get() | {(startup_id, self.normalize(path)) for path in paths})
+            yield
+        finally:
+            if token is not None:
+                _held.reset(token)
+            for mutex in reversed(acquired):
+                mutex.release()
+
+    def claim(self, startup_id, owner, paths):
+        """Reserves paths for owner unless another owner holds an overlapping claim. Returns True if claimed."""
+        wanted = {self.normalize(path) for path in paths} or {""}
+        with self._lock:
+            claims = self._claims.setdefault(startup_id, {})
+            for other, held in claims.items():
+                if other != owner and any(self._overlap(a, b) for a in wanted for b in held):
+                    self.refused_claims += 1
+                    return False
+            claims.setdefault(owner, set()).update(wanted)
+            self.claims += 1
+            return True
+
+    def release(self, startup_id, owner):
+        with self._lock:
+            claims = self._claims.get(startup_id, {})
+            claims.pop(owner, None)
+            if not claims:
+                self._claims.pop(startup_id, None)
+
+    @contextlib.contextmanager
+    def acting_as(self, startup_id, owner):
+        """Runs the block on behalf of owner: its writes to the startup's workspace are checked against owner's claim."""
+        token = _acting.set((startup_id, owner))
+        try:
+            yield
+        finally:
+            _acting.reset(token)
+
+    def owner(self, startup_id):
+        """The owner the current context acts for in the startup's workspace, or None."""
+        acting = _acting.get()
+        return acting[1] if acting and acting[0] == startup_id else None
+
+    def refused(self, startup_id, paths):
+        """
+        Returns the paths the current context may not write: for an owner, workspace paths
+        outside its claim and SHARED_PATHS that no surrounding hold() covers (a held directory
+        covers its files).
+        Absolute paths outside /app are not part of the workspace and never refused.
+        Outside acting_as() nothing is refused.
+        """
+        owner = self.owner(startup_id)
+        if owner is None:
+            return []
+        held = {path for held_id, path in _held.get() if held_id == startup_id}
+        with self._lock:
+            allowed = held | self._claims.get(startup_id, {}).get(owner, set())
+            allowed |= set(SHARED_PATHS)
+            refused = []
+            for path in paths:
+                if path.startswith("/") and not (path == "/app" or path.startswith("/app/")):
+                    continue
+                path_key = self.normalize(path)
+                if not any(self._covers(a, path_key) for a in allowed):
+                    refused.append(path)
+            if refused:
+                self.refused_writes += 1
+        return refused
+
+    def own_claim(self, startup_id):
+        """Sorted paths claimed by the owner the current context acts for, or None outside acting_as()."""
+        owner = self.owner(startup_id)
+        if owner is None:
+            return None
+        with self._lock:
+            return sorted(self._claims.get(startup_id, {}).get(owner, set()))
+
+    def claimed(self, startup_id):
+        """Returns {owner: sorted paths} of the startup's current claims."""
+        with self._lock:
+            return {owner: sorted(paths) for owner, paths in self._claims.get(startup_id, {}).items()}
+
+    def get_stats(self):
+        with self._lock:
+            return {
+                "holds": self.holds,
+                "contended_holds": self.contended_holds,
+                "claims": self.claims,
+                "refused_claims": self.refused_claims,
+                "refused_writes": self.refused_writes,
+                "active_claims": sum(len(claims) for claims in self._claims.values())
+            }
+
+workspace_locks = WorkspaceLocks()
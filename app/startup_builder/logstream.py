@@ -0,0 +1,136 @@
+import asyncio
+import codecs
+import threading
+import time
+from collections import deque
+from .asyncengine import docker_loop
+
+LOG_BUFFER_CHARS = 1024 * 1024 # characters of log kept per container
+LOG_BACKFILL_LINES = 1000 # history loaded when a container is first followed
+LOG_PUSH_INTERVAL = 0.25 # seconds between socket pushes of new output
+
+class ContainerLogStream:
+    """
+    Follows one container's stdout/stderr into a bounded ring buffer addressed by absolute
+    character offsets, so readers fetch only what they have not seen. Offsets keep growing
+    while old output is dropped. Following runs on the Docker event loop, not on threads.
+    """
+    def __init__(self, container, previous=None):
+        self.container = container
+        self.alive = True
+        self.notify = None # notify(text, offset) for pushes, set by the pool
+        self._lock = docker_loop.lock() # The follower appends on the loop thread
+        self._chunks = deque()
+        self._size = 0 # characters currently buffered
+        self.start = 0 # offset of the first buffered character
+        self.end = 0 # offset after the last buffered character
+        self._pushed = 0
+        self.stopped_at = None
+
+        if previous:
+            # A restarted container continues in the same buffer, from where the old stream stopped
+            with previous._lock:
+                self._chunks, self._size = previous._chunks, previous._size
+                self.start, self.end = previous.start, previous.end
+            self.notify, previous.notify = previous.notify, None
+            since = previous.stopped_at
+        else:
+            # Backfill synchronously so the first read is not empty, then follow from that point
+            since = time.time()
+            self._append(container.logs(stdout=True, stderr=True, tail=LOG_BACKFILL_LINES, until=since).decode('utf-8', errors='replace'))
+        self._pushed = self.end
+        self._follower = docker_loop.submit(self._follow(since))
+
+    def _append(self, text):
+        if not text:
+            return
+        with self._lock:
+            self._chunks.append(text)
+            self._size += len(text)
+            self.end += len(text)
+            while self._size > LOG_BUFFER_CHARS and len(self._chunks) > 1:
+                dropped = self._chunks.popleft()
+                self._size -= len(dropped)
+                self.start += len(dropped)
+
+    async def _follow(self, since):
+        pusher = asyncio.ensure_future(self._push_loop())
+        decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        try:
+            async for chunk in docker_loop.engine(self.container.client).logs(self.container.id, follow=True, since=since):
+                self._append(decoder.decode(chunk))
+        except asyncio.CancelledError:
+            pusher.cancel()
+            raise
+        except Exception as e:
+            print(f"Log stream error for {self.container.name}: {e}")
+        finally:
+            self.alive = False
+            self.stopped_at = time.time()
+
+    async def _push_loop(self):
+        while self.alive or self._pushed < self.end:
+            await asyncio.sleep(LOG_PUSH_INTERVAL)
+            notify = self.notify
+            if notify and self._pushed < self.end:
+                result = self.read(self._pushed)
+                self._pushed = result["offset"]
+                try:
+                    # Socket emits may block, and belong on the eventlet hub when the server runs on one
+                    await docker_loop.run_blocking(notify, result["logs"], result["start_offset"])
+                except Exception as e:
+                    print(f"Log push error for {self.container.name}: {e}")
+            elif not notify:
+                self._pushed = self.end
+
+    def read(self, offset=None, limit=None):
+        """
+        Returns {"logs", "start_offset", "offset", "reset"}: output from offset (the whole buffer
+        when None) to the current end. "offset" is what to pass next time; "reset" means output
+        before the returned text was dropped from the buffer.
+        """
+        with self._lock:
+            reset = offset is not None and (offset < self.start or offset > self.end)
+            if offset is None or reset:
+                offset = self.start
+            text = "".join(self._chunks)[offset - self.start:]
+            if limit is not None:
+                text = text[:limit]
+            return {"logs": text, "start_offset": offset, "offset": offset + len(text), "reset": reset}
+
+    def close(self):
+        self.alive = False
+        self._follower.cancel()
+
+class ContainerLogPool:
+    """Process-wide map of container id -> ContainerLogStream; stopped streams are resumed on ensure()."""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._streams = {} # Key: container id, Value: ContainerLogStream
+
+    def ensure(self, container, notify=None):
+        with self._lock:
+            stream = self._streams.get(container.id)
+            if not stream or not stream.alive:
+                stream = ContainerLogStream(container, previous=stream)
+                self._streams[container.id] = stream
+            if notify:
+                stream.notify = notify
+            return stream
+
+    def stop(self, container_id):
+        with self._lock:
+            stream = self._streams.pop(container_id, None)
+        if stream:
+            stream.close()
+
+    def get_stats(self):
+        with self._lock:
+            streams = list(self._streams.values())
+        return {
+            "streams": len(streams),
+            "following": sum(1 for s in streams if s.alive),
+            "buffered_chars": sum(s.end - s.start for s in streams)
+        }
+
+container_logs = ContainerLogPool()
@@ -1,14 +1,436 @@
+import asyncio
 import docker
+import hashlib
+import io
+import json
 import os
+import posixpath
+import re
+import shlex
+import shutil
+import tarfile
+import tempfile
+import threading
 import time
+import uuid
+from collections import deque
+from .shell import shell_sessions, SHELL_COMMAND_TIMEOUT, SHELL_MAX_OUTPUT
+from .readiness import server_readiness
+from .hibernation import hibernator
+from .admission import admission, container_limits, stack_resources
+from .daemons import docker_daemons
+from .filetree import file_trees, TREE_MAX_OUTPUT, TREE_MAX_AGE, TREE_WATCHED_MAX_AGE
+from .watcher import change_watchers
+from .pkgcache import package_caches
+from .templates import project_templates, TEMPLATE_MARKER
+from .snapshots import workspace_snapshots
+from .logstream import container_logs
+from .gateway import preview_gateway
+from .asyncengine import docker_loop, DockerEngineError
+from .gitcommits import workspace_commits
+from .linting import lint_service, LINT_CONFIG_FILES, LINT_TOOLS, DEFAULT_ESLINT_CONFIG
+from .locks import workspace_locks
+
+# Archives larger than this are spooled to disk instead of memory
+ARCHIVE_SPOOL_SIZE = 8 * 1024 * 1024
+
+# Timeout of internal one-off commands (lint fallbacks, checks); eslint's first run is slow
+PROBE_TIMEOUT = 120
+
+# Heavy or generated directories never copied out of containers
+SYNC_EXCLUDES = ["node_modules", ".git", "dist", "build", "__pycache__", ".DS_Store", "coverage", ".next"]
+
+class _ChunkStream(io.RawIOBase):
+    """File-like adapter over a generator of byte chunks, for streaming tarfile reads."""
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self._buffer = b""
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        while not self._buffer:
+            try:
+                self._buffer = next(self._chunks)
+            except StopIteration:
+                return 0
+        n = min(len(b), len(self._buffer))
+        b[:n] = self._buffer[:n]
+        self._buffer = self._buffer[n:]
+        return n
+
+def _extract_member(tar, member, dest_file):
+    """Streams a regular tar member to dest_file and returns its sha256."""
+    digest = hashlib.sha256()
+    os.makedirs(os.path.dirname(dest_file), exist_ok=True)
+    f = tar.extractfile(member)
+    with open(dest_file, "wb") as out:
+        for chunk in iter(lambda: f.read(64 * 1024), b""):
+            digest.update(chunk)
+            out.write(chunk)
+    return digest.hexdigest()
+
+def _read_member(tar, member):
+    """Reads a regular tar member, hashing it chunk by chunk."""
+    digest = hashlib.sha256()
+    parts = []
+    f = tar.extractfile(member)
+    for chunk in iter(lambda: f.read(64 * 1024), b""):
+        digest.update(chunk)
+        parts.append(chunk)
+    data = b"".join(parts)
+    return {
+        "content": data.decode('utf-8', errors='replace'),
+        "size": len(data),
+        "sha256": digest.hexdigest()
+    }
+
+class ContainerRegistry:
+    """
+    Process-wide cache of startup_id -> container name and live container handle.
+    Saves the database and Docker API lookups that every DockerManager call
+    would otherwise make. Entries are dropped on Docker die/destroy/rename/pause
+    events and whenever ensure_container/cleanup_container touch a container.
+    """
+    INVALIDATING_EVENTS = ("die", "destroy", "rename", "pause")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = {} # Key: startup_id (str), Value: {"name": str, "container": Container}
+        self._watchers = {} # Key: daemon base url, Value: event thread
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, startup_id, container_name=None):
+        """Returns the cached container handle, or None on a miss."""
+        with self._lock:
+            entry = self._entries.get(str(startup_id))
+            if entry and (not container_name or entry["name"] == container_name):
+                self.hits += 1
+                return entry["container"]
+            self.misses += 1
+            return None
+
+    def put(self, startup_id, container_name, container):
+        with self._lock:
+            self._entries[str(startup_id)] = {"name": container_name, "container": container}
+
+    def invalidate(self, startup_id=None, container_name=None, container_id=None):
+        """Drops entries matching any of the given startup_id, container name or id."""
+        with self._lock:
+            if startup_id is not None:
+                self._entries.pop(str(startup_id), None)
+            if container_name or container_id:
+                for key, entry in list(self._entries.items()):
+                    if (container_name and entry["name"] == container_name) or \
+                       (container_id and entry["container"].id == container_id):
+                        del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 3) if total else 0.0
+            }
+
+    def watch_events(self, client):
+        """Starts (once per process and daemon) a thread that invalidates entries from Docker events."""
+        with self._lock:
+            watcher = self._watchers.get(client.api.base_url)
+            if watcher and watcher.is_alive():
+                return
+            watcher = threading.Thread(target=self._consume_events, args=(client,), daemon=True)
+            self._watchers[client.api.base_url] = watcher
+            watcher.start()
+
+    def _consume_events(self, client):
+        while True:
+            try:
+                events = client.events(
+                    decode=True,
+                    filters={"type": "container", "event": list(self.INVALIDATING_EVENTS)}
+                )
+                for event in events:
+                    actor = event.get("Actor", {})
+                    attributes = actor.get("Attributes", {})
+                    self.invalidate(
+                        container_name=attributes.get("oldName", "").lstrip("/") or attributes.get("name"),
+                        container_id=actor.get("ID")
+                    )
+            except Exception as e:
+                print(f"Container event watcher error: {e}")
+            # We may have missed events while disconnected, so start from a clean slate
+            # (entries are not tagged by daemon, so this drops every daemon's entries)
+            self.clear()
+            time.sleep(5)
+
+container_registry = ContainerRegistry()
+
+STACKS_DIR = os.path.join(os.path.dirname(__file__), 'stacks')
+STACK_LABEL = "startup_builder.stack"
+
+# Server start command per container id, detected once by start_server
+_start_commands = {}
+# Rewriting one of these invalidates the cached start command
+START_COMMAND_FILES = ("package.json", "app.py", "main.py")
+
+class StackImageCache:
+    """
+    Content-addressed cache for stack images.
+    The stack directory is hashed into an image label, so an image is only rebuilt
+    when the Dockerfile (or anything else under stacks/<stack>) changes.
+    """
+    HASH_LABEL = "startup_builder.stack_hash"
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._build_locks = {} # Key: (daemon base url, stack_type), Value: Lock (one build per stack and daemon at a time)
+        self.hits = 0
+        self.misses = 0
+        self.build_seconds = {} # Key: stack_type, Value: duration of the last build
+
+    @staticmethod
+    def hash_stack_dir(stack_dir):
+        """Returns a sha256 over the relative paths and contents of every file in stack_dir."""
+        digest = hashlib.sha256()
+        for root, dirs, filenames in os.walk(stack_dir):
+            dirs.sort()
+            for filename in sorted(filenames):
+                full_path = os.path.join(root, filename)
+                digest.update(os.path.relpath(full_path, stack_dir).encode('utf-8') + b"\0")
+                with open(full_path, "rb") as f:
+                    digest.update(f.read())
+        return digest.hexdigest()
+
+    def ensure_image(self, client, stack_type):
+        """
+        Returns the image tag for stack_type, building it only if no image carries
+        the current stack hash.
+        """
+        stack_dir = os.path.join(STACKS_DIR, stack_type)
+        if not os.path.exists(stack_dir):
+            # Fallback to MERN if stack not found
+            stack_type = "MERN"
+            stack_dir = os.path.join(STACKS_DIR, stack_type)
+
+        stack_hash = self.hash_stack_dir(stack_dir)
+        image_tag = f"startup_builder_{stack_type.lower()}:{stack_hash[:12]}"
+
+        with self._lock:
+            build_lock = self._build_locks.setdefault((client.api.base_url, stack_type), threading.Lock())
+
+        with build_lock:
+            if client.images.list(filters={"label": f"{self.HASH_LABEL}={stack_hash}"}):
+                with self._lock:
+                    self.hits += 1
+                return image_tag
+
+            with self._lock:
+                self.misses += 1
+            print(f"Building image for {stack_type} ({stack_hash[:12]})...")
+            started = time.time()
+            image, _ = client.images.build(path=stack_dir, tag=image_tag, labels={self.HASH_LABEL: stack_hash})
+            # Keep the unversioned tag pointing at the newest build
+            image.tag(f"startup_builder_{stack_type.lower()}", tag="latest")
+            duration = time.time() - started
+            with self._lock:
+                self.build_seconds[stack_type] = round(duration, 2)
+            print(f"Built {image_tag} in {duration:.1f}s")
+            return image_tag
+
+    def get_stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "last_build_seconds": dict(self.build_seconds)
+            }
+
+image_cache = StackImageCache()
+
+def _run_stack_container(client, image_tag, container_name, volume_name, stack_type, labels=None):
+    """
+    Runs a keep-alive stack container with volume_name mounted at /app and the shared package
+    caches mounted under /cache, capped at the stack's cgroup limits.
+    """
+    limits, limit_labels = container_limits(stack_type)
+    labels = dict(labels or {}, **limit_labels, **{STACK_LABEL: stack_type})
+    # Shared npm/pip/node-gyp caches, so installs reuse what other startups downloaded
+    cache_volumes, cache_environment = package_caches.mounts(client, stack_type)
+    return client.containers.run(
+        image_tag,
+        command="tail -f /dev/null", # Keep alive
+        detach=True,
+        name=container_name,
+        volumes={volume_name: {'bind': '/app', 'mode': 'rw'}, **cache_volumes},
+        working_dir="/app",
+        ports={'3000/tcp': None, '8000/tcp': None, '8888/tcp': None}, # Allow mapping for various ports
+        environment={'HOST': '0.0.0.0', **cache_environment},
+        labels=labels,
+        **limits
+    )
+
+class WarmPool:
+    """
+    Idle, already-running containers per stack_type, claimed by new startups.
+    Docker cannot attach a volume to a running container, so every pooled container
+    owns a fresh workspace volume; claiming renames the container and hands its
+    volume over to the startup. Docker labels are the source of truth, so the pool
+    survives process restarts. Each Docker daemon keeps its own pool of sizes.
+    """
+    POOL_LABEL = "startup_builder.pool"
+    VOLUME_LABEL = "startup_builder.pool_volume"
+    NAME_PREFIX = "startup_pool_"
 
-class DockerManager:
     def __init__(self):
+        self.sizes = {} # Key: stack_type, Value: target number of idle containers
+        self.max_total = 10
+        self.check_interval = 60
+        self._lock = threading.Lock()
+        self._claim_lock = threading.Lock()
+        self._refilling = set() # (daemon base url, stack_type)
+        self._workers = {} # Key: daemon base url, Value: maintenance thread
+        self.claims = 0
+        self.misses = 0
+        self.claim_ms = deque(maxlen=100)
+
+    def configure(self, sizes, max_total=10, check_interval=60):
+        self.sizes = {stack: size for stack, size in sizes.items() if size > 0}
+        self.max_total = max_total
+        self.check_interval = check_interval
+
+    def start(self, client):
+        """Starts (once per process and daemon) the background health check and refill loop."""
+        with self._lock:
+            worker = self._workers.get(client.api.base_url)
+            if not self.sizes or (worker and worker.is_alive()):
+                return
+            worker = threading.Thread(target=self._maintain, args=(client,), daemon=True)
+            self._workers[client.api.base_url] = worker
+            worker.start()
+
+    def _maintain(self, client):
+        while True:
+            for stack_type in list(self.sizes):
+                try:
+                    for container in self._idle(client, stack_type):
+                        if not self._healthy(container):
+                            print(f"Warm pool: discarding unhealthy container {container.name}")
+                            self._discard(client, container)
+                    self._refill(client, stack_type)
+                except Exception as e:
+                    print(f"Warm pool maintenance error for {stack_type}: {e}")
+            time.sleep(self.check_interval)
+
+    def _idle(self, client, stack_type=None):
+        filters = {"label": f"{self.POOL_LABEL}={stack_type}" if stack_type else self.POOL_LABEL}
+        # Claimed containers keep their (immutable) labels but lose the pool name prefix
+        return [c for c in client.containers.list(all=True, filters=filters) if c.name.startswith(self.NAME_PREFIX)]
+
+    def _healthy(self, container):
+        try:
+            container.reload()
+            return container.status == 'running' and container.exec_run("true").exit_code == 0
+        except Exception:
+            return False
+
+    def _discard(self, client, container):
         try:
-            self.client = docker.from_env()
+            container.remove(force=True)
+            client.volumes.get(container.labels[self.VOLUME_LABEL]).remove()
         except Exception as e:
-            print(f"Error initializing Docker client: {e}")
-            self.client = None
+            print(f"Warm pool: error discarding {container.name}: {e}")
+
+    def _refill(self, client, stack_type):
+        key = (client.api.base_url, stack_type)
+        with self._lock:
+            if key in self._refilling:
+                return
+            self._refilling.add(key)
+        try:
+            missing = self.sizes.get(stack_type, 0) - len(self._idle(client, stack_type))
+            room = self.max_total - len(self._idle(client))
+            for _ in range(max(0, min(missing, room))):
+                image_tag = image_cache.ensure_image(client, stack_type)
+                suffix = uuid.uuid4().hex[:12]
+                volume_name = f"startup_vol_pool_{suffix}"
+                client.volumes.create(name=volume_name)
+                container = _run_stack_container(
+                    client, image_tag, f"{self.NAME_PREFIX}{suffix}", volume_name, stack_type,
+                    labels={self.POOL_LABEL: stack_type, self.VOLUME_LABEL: volume_name}
+                )
+                project_templates.seed(client, container, stack_type, image_tag)
+                print(f"Warm pool: added {stack_type} container {self.NAME_PREFIX}{suffix}")
+        finally:
+            with self._lock:
+                self._refilling.discard(key)
+
+    def refill_async(self, client, stack_type):
+        threading.Thread(target=self._refill, args=(client, stack_type), daemon=True).start()
+
+    def claim(self, client, stack_type, container_name):
+        """
+        Takes a healthy idle container for stack_type and renames it to container_name.
+        Returns: (container, volume_name) or None if the pool is empty or disabled.
+        """
+        if stack_type not in self.sizes:
+            return None
+
+        started = time.time()
+        claimed = None
+        with self._claim_lock:
+            for container in self._idle(client, stack_type):
+                if not self._healthy(container):
+                    self._discard(client, container)
+                    continue
+                container.rename(container_name)
+                claimed = container
+                break
+        self.refill_async(client, stack_type)
+
+        with self._lock:
+            if claimed is None:
+                self.misses += 1
+                return None
+            self.claims += 1
+            self.claim_ms.append((time.time() - started) * 1000)
+        claimed.reload()
+        return claimed, claimed.labels[self.VOLUME_LABEL]
+
+    def get_stats(self, clients=()):
+        with self._lock:
+            stats = {
+                "sizes": dict(self.sizes),
+                "claims": self.claims,
+                "misses": self.misses,
+                "avg_claim_ms": round(sum(self.claim_ms) / len(self.claim_ms), 1) if self.claim_ms else None,
+                "last_claim_ms": round(self.claim_ms[-1], 1) if self.claim_ms else None
+            }
+        if clients and self.sizes:
+            try:
+                stats["idle"] = {stack: sum(len(self._idle(client, stack)) for client in clients) for stack in self.sizes}
+            except Exception as e:
+                stats["idle"] = {"error": str(e)}
+        return stats
+
+warm_pool = WarmPool()
+
+class DockerManager:
+    def __init__(self):
+        docker_daemons.connect(os.environ.get("BUILDER_DOCKER_HOSTS"))
+        self.daemons = docker_daemons
+        # The default daemon; containers are reached through client_for()/their own handle
+        self.client = docker_daemons.get()
+        for client in docker_daemons.clients():
+            container_registry.watch_events(client)
 
     def get_container_name(self, startup_id, container_name=None):
         """
@@ -20,91 +442,242 @@ class DockerManager:
             return container_name
         return f"startup_dev_{startup_id}"
     
+    def lookup_placement(self, startup_id):
+        """
+        Resolves (container name, docker host) from the database, falling back to the
+        legacy name and the default daemon.
+        """
+        from app.models import Startup
+        startup = Startup.query.get(startup_id)
+        container_name = startup.container_name if startup and startup.container_name else None
+        docker_host = startup.docker_host if startup else None
+        return self.get_container_name(startup_id, container_name), docker_host
+
+    def client_for(self, startup_id=None, docker_host=None):
+        """
+        Returns the client for the daemon a startup is placed on (the default daemon if
+        it predates placement). Raises docker.errors.DockerException if that daemon is unavailable.
+        """
+        if docker_host is None and startup_id is not None and len(self.daemons.hosts()) > 1:
+            docker_host = self.lookup_placement(startup_id)[1]
+        client = self.daemons.get(docker_host)
+        if client is None:
+            raise docker.errors.DockerException(f"Docker daemon {docker_host or 'default'} not available")
+        return client
+
+    def _get_container(self, startup_id, container_name=None):
+        """
+        Returns a container handle for the startup.
+        Running containers are served from the process-wide registry; a miss falls
+        back to the database and Docker API. Raises docker.errors.NotFound.
+        """
+        container = container_registry.get(startup_id, container_name)
+        if container is not None:
+            hibernator.touch(container.name)
+            return container
+
+        docker_host = None
+        if not container_name or len(self.daemons.hosts()) > 1:
+            looked_up_name, docker_host = self.lookup_placement(startup_id)
+            container_name = container_name or looked_up_name
+        container = self.client_for(docker_host=docker_host).containers.get(container_name)
+        hibernator.touch(container_name)
+        # Transparently wake containers the idle scheduler paused or stopped
+        if container.status == 'paused' or (container.status != 'running' and hibernator.is_hibernated(container_name)):
+            hibernator.resume(container)
+        # Only running handles are cached: die/pause events keep their status accurate
+        if container.status == 'running':
+            container_registry.put(startup_id, container_name, container)
+        return container
+
+    def workspace_running(self, startup_id, container_name=None):
+        """Whether the startup's container is running, without waking it if it is hibernated."""
+        container = container_registry.get(startup_id, container_name)
+        if container is None:
+            try:
+                looked_up_name, docker_host = self.lookup_placement(startup_id)
+                container = self.client_for(docker_host=docker_host).containers.get(container_name or looked_up_name)
+            except Exception:
+                return False
+        return container.status == 'running'
+
+    def get_stats(self):
+        """Returns cache and resource statistics for the builder."""
+        return {
+            "container_registry": container_registry.get_stats(),
+            "image_cache": image_cache.get_stats(),
+            "warm_pool": warm_pool.get_stats(self.daemons.clients()),
+            "shell_sessions": shell_sessions.get_stats(),
+            "server_readiness": server_readiness.get_stats(),
+            "hibernation": hibernator.get_stats(),
+            "admission": admission.get_stats(self.daemons.clients()),
+            "daemons": self.daemons.get_stats(),
+            "file_trees": file_trees.get_stats(),
+            "change_watchers": change_watchers.get_stats(),
+            "linting": lint_service.get_stats(),
+            "package_caches": package_caches.get_stats(),
+            "templates": project_templates.get_stats(),
+            "snapshots": workspace_snapshots.get_stats(),
+            "container_logs": container_logs.get_stats(),
+            "preview_gateway": preview_gateway.get_stats(),
+            "docker_event_loop": docker_loop.get_stats(),
+            "git_checkpoints": workspace_commits.get_stats()
+        }
+
+    def prebuild_images(self, stack_types=None):
+        """
+        Builds (or confirms cached) images for the given stacks on every daemon, defaulting to all stacks,
+        and starts building their project templates in the background.
+        Returns: dict of stack_type -> image tag or {"error"}
+        """
+        if not self.client:
+            return {"error": "Docker not available"}
+
+        if stack_types is None:
+            stack_types = sorted(os.listdir(STACKS_DIR))
+
+        results = {}
+        for stack_type in stack_types:
+            try:
+                for client in self.daemons.clients():
+                    results[stack_type] = image_cache.ensure_image(client, stack_type)
+                    project_templates.ensure_async(client, stack_type, results[stack_type])
+            except Exception as e:
+                print(f"Error prebuilding image for {stack_type}: {e}")
+                results[stack_type] = {"error": str(e)}
+        return results
+
     def generate_container_name(self):
         """Generates a unique random container name."""
         import uuid
         random_suffix = uuid.uuid4().hex[:12]
         return f"startup_dev_{random_suffix}"
 
-    def ensure_container(self, startup_id, stack_type="MERN", container_name=None):
+    def ensure_container(self, startup_id, stack_type="MERN", container_name=None, volume_name=None, docker_host=None):
         """
         Ensures a dev container is running for the startup.
         stack_type: MERN, Python-Data, NextJS
         container_name: Optional existing container name from database
-        Returns: dict with status, container_id, ports, and container_name
+        volume_name: Optional workspace volume from database (set when a warm pool container was claimed)
+        docker_host: Optional daemon the startup is placed on, from database. New workspaces
+                     are placed on the least loaded daemon.
+        Returns: dict with status, container_id, ports, container_name, volume_name, docker_host and
+                 template (the project template version a new workspace was seeded from, or None)
         """
         if not self.client:
             return {"error": "Docker not available"}
 
+        if docker_host and self.daemons.get(docker_host) is None:
+            return {"error": f"Docker daemon {docker_host} not available"}
+        if not docker_host and container_name:
+            # Containers created before placement was recorded live on the default daemon
+            docker_host = self.daemons.default_host
+
         # Use provided container_name or generate a new one
         if not container_name:
             container_name = self.generate_container_name()
-        
+
+        # Drop any cached handle; the container may be (re)started or recreated below
+        container_registry.invalidate(startup_id)
+
         # Check if running
         try:
-            container = self.client.containers.get(container_name)
-            if container.status != 'running':
+            if not docker_host:
+                raise docker.errors.NotFound("Workspace not placed yet")
+            container = self.daemons.get(docker_host).containers.get(container_name)
+            hibernator.touch(container_name)
+            if container.status != 'running' and not hibernator.resume(container):
                 container.start()
-            
+
             # Get ports
             container.reload()
             ports = container.attrs['NetworkSettings']['Ports']
+            container_registry.put(startup_id, container_name, container)
             return {
-                "status": "running", 
-                "container_id": container.id, 
+                "status": "running",
+                "container_id": container.id,
                 "ports": ports,
-                "container_name": container_name
+                "container_name": container_name,
+                "docker_host": docker_host
             }
         except docker.errors.NotFound:
             # Create new container
+            placed = None
             try:
-                # Build Image based on stack
-                stack_dir = os.path.join(os.path.dirname(__file__), 'stacks', stack_type)
-                if not os.path.exists(stack_dir):
-                    # Fallback to MERN if stack not found
-                    stack_dir = os.path.join(os.path.dirname(__file__), 'stacks', 'MERN')
-                
-                image_tag = f"startup_builder_{stack_type.lower()}"
-                
-                # Build the image
-                print(f"Building image for {stack_type}...")
-                self.client.images.build(path=stack_dir, tag=image_tag)
+                default_volume = f"startup_vol_{startup_id}"
+
+                if not docker_host:
+                    if volume_name or self._volume_exists(self.client, default_volume):
+                        # Workspaces created before placement was recorded live on the default daemon
+                        docker_host = self.daemons.default_host
+                    else:
+                        docker_host = placed = self.daemons.place(stack_resources(stack_type))
+                        if not docker_host:
+                            return {"error": "No Docker daemon available"}
+                        print(f"Placed {startup_id} on Docker daemon {docker_host}")
+                client = self.daemons.get(docker_host)
+
+                # A brand-new workspace can take an already-running container from the warm pool
+                if not volume_name and not self._volume_exists(client, default_volume):
+                    claimed = warm_pool.claim(client, stack_type, container_name)
+                    if claimed:
+                        container, volume_name = claimed
+                        container_registry.put(startup_id, container_name, container)
+                        print(f"Claimed warm pool container for {startup_id} as {container_name}")
+                        return {
+                            "status": "created",
+                            "container_id": container.id,
+                            "ports": container.attrs['NetworkSettings']['Ports'],
+                            "container_name": container_name,
+                            "volume_name": volume_name,
+                            "docker_host": docker_host,
+                            "warm_pool": True
+                        }
+
+                # Build Image based on stack (skipped if the stack is unchanged)
+                image_tag = image_cache.ensure_image(client, stack_type)
 
                 # Create a volume for persistence
-                volume_name = f"startup_vol_{startup_id}"
-                try:
-                    self.client.volumes.get(volume_name)
-                except docker.errors.NotFound:
-                    self.client.volumes.create(name=volume_name)
-
-                container = self.client.containers.run(
-                    image_tag,
-                    command="tail -f /dev/null", # Keep alive
-                    detach=True,
-                    name=container_name,
-                    volumes={volume_name: {'bind': '/app', 'mode': 'rw'}},
-                    working_dir="/app",
-                    ports={'3000/tcp': None, '8000/tcp': None, '8888/tcp': None}, # Allow mapping for various ports
-                    environment={'HOST': '0.0.0.0'}
-                )
+                volume_name = volume_name or default_volume
+                new_volume = not self._volume_exists(client, volume_name)
+                if new_volume:
+                    client.volumes.create(name=volume_name)
+
+                container = _run_stack_container(client, image_tag, container_name, volume_name, stack_type)
+                # A fresh workspace starts from the stack's pre-built project template, if one is ready
+                template = project_templates.seed(client, container, stack_type, image_tag) if new_volume else None
                 # Reload to get ports
                 container.reload()
                 ports = container.attrs['NetworkSettings']['Ports']
-                
+                container_registry.put(startup_id, container_name, container)
+
                 # We no longer do auto-init or auto-start here.
                 # The Agent is now responsible for checking project state and running commands.
-                
+
                 return {
-                    "status": "created", 
-                    "container_id": container.id, 
+                    "status": "created",
+                    "container_id": container.id,
                     "ports": ports,
-                    "container_name": container_name
+                    "container_name": container_name,
+                    "volume_name": volume_name,
+                    "docker_host": docker_host,
+                    "template": template
                 }
             except Exception as e:
                 return {"error": f"Failed to create container: {str(e)}"}
+            finally:
+                if placed:
+                    self.daemons.release(placed, stack_resources(stack_type))
         except Exception as e:
             return {"error": f"Error checking container: {str(e)}"}
 
+    def _volume_exists(self, client, volume_name):
+        try:
+            client.volumes.get(volume_name)
+            return True
+        except docker.errors.NotFound:
+            return False
+
     def stop_container(self, startup_id, container_name=None):
         """
         Stops a container.
@@ -117,8 +690,15 @@ class DockerManager:
         if not container_name:
             container_name = self.get_container_name(startup_id)
             
+        container_registry.invalidate(startup_id, container_name=container_name)
         try:
-            container = self.client.containers.get(container_name)
+            container = self.client_for(startup_id).containers.get(container_name)
+            shell_sessions.close(container.id)
+            change_watchers.stop(container.id)
+            file_trees.drop(container.id)
+            lint_service.close(container.id)
+            container_logs.stop(container.id)
+            preview_gateway.forget(container_id=container.id)
             container.stop()
             return {"status": "stopped"}
         except docker.errors.NotFound:
@@ -126,16 +706,24 @@ class DockerManager:
         except Exception as e:
             return {"error": str(e)}
     
-    def cleanup_container(self, container_name):
+    def cleanup_container(self, container_name, docker_host=None):
         """
         Stops and removes a container by name.
+        docker_host: Optional daemon the container was placed on (default daemon if omitted)
         Returns: dict with status
         """
         if not self.client:
             return {"error": "Docker not available"}
         
+        container_registry.invalidate(container_name=container_name)
         try:
-            container = self.client.containers.get(container_name)
+            container = self.client_for(docker_host=docker_host).containers.get(container_name)
+            shell_sessions.close(container.id)
+            change_watchers.stop(container.id)
+            file_trees.drop(container.id)
+            lint_service.close(container.id)
+            container_logs.stop(container.id)
+            preview_gateway.forget(container_id=container.id)
             if container.status == 'running':
                 container.stop()
             container.remove()
@@ -145,24 +733,18 @@ class DockerManager:
         except Exception as e:
             return {"error": str(e)}
 
-    def run_command(self, startup_id, command, container_name=None, detach=False):
+    def run_command(self, startup_id, command, container_name=None, detach=False, timeout=SHELL_COMMAND_TIMEOUT):
         """
         Runs a command inside the container.
+        Foreground commands go through the container's persistent shell session, or the
+        session of the task worker running them (workspace_locks.owner);
+        timeout (seconds) kills a hung command and re-spawns the session.
         """
         if not self.client:
             return {"error": "Docker not available"}
 
-        # Query database for container name if not provided
-        if not container_name:
-            from app.models import Startup
-            startup = Startup.query.get(startup_id)
-            if startup and startup.container_name:
-                container_name = startup.container_name
-            else:
-                container_name = self.get_container_name(startup_id)
-        
         try:
-            container = self.client.containers.get(container_name)
+            container = self._get_container(startup_id, container_name)
             if container.status != 'running':
                 return {"error": "Container not running"}
             
@@ -176,49 +758,91 @@ class DockerManager:
                     f"bash -c 'nohup {command} > /dev/null 2>&1 &'",
                     workdir="/app"
                 )
+                file_trees.mark_dirty(container.id)
                 return {
                     "exit_code": 0,
                     "output": "Command started in background."
                 }
             else:
-                exit_code, output = container.exec_run(
-                    f"bash -c '{command}'",
-                    workdir="/app"
+                result = shell_sessions.run(
+                    container.client, container, command, timeout=timeout, lane=workspace_locks.owner(startup_id)
                 )
-                return {
-                    "exit_code": exit_code,
-                    "output": output.decode('utf-8')
-                }
+                # Any command may have changed the workspace
+                file_trees.mark_dirty(container.id)
+                return result
+        except docker.errors.NotFound:
+            return {"error": "Container not found"}
+        except Exception as e:
+            return {"error": str(e)}
+
+    def close_worker_shell(self, startup_id, container_name=None):
+        """Closes the shell session of the task worker running in this context, if it has one."""
+        lane = workspace_locks.owner(startup_id)
+        if lane is None:
+            return
+        try:
+            container = self._get_container(startup_id, container_name)
+            shell_sessions.close_lane(container.id, lane)
+        except Exception as e:
+            print(f"Error closing shell session of {lane} for {startup_id}: {e}")
+
+    def _exec_once(self, container, command, timeout, max_output=SHELL_MAX_OUTPUT):
+        """
+        Runs a short command as a one-off exec in /app, off the container's shell session:
+        it neither waits behind the agent's commands nor can its timeout kill them.
+        """
+        return docker_loop.run(docker_loop.engine(container.client).exec_run(
+            container.id, command, workdir="/app", timeout=timeout, max_output=max_output
+        ))
+
+    def probe_command(self, startup_id, command, timeout=PROBE_TIMEOUT, container_name=None):
+        """Runs a short internal command (lint, checks) as a one-off exec, like run_command otherwise."""
+        if not self.client:
+            return {"error": "Docker not available"}
+
+        try:
+            container = self._get_container(startup_id, container_name)
+            if container.status != 'running':
+                return {"error": "Container not running"}
+            return self._exec_once(container, command, timeout)
         except docker.errors.NotFound:
             return {"error": "Container not found"}
+        except DockerEngineError as e:
+            return {"error": "Container not found" if e.status == 404 else str(e)}
         except Exception as e:
             return {"error": str(e)}
 
+    def _tree_runner(self, container):
+        # Listings serve the file explorer: never queue them behind the agent's commands
+        return lambda command, timeout: self._exec_once(container, command, timeout, max_output=TREE_MAX_OUTPUT)
+
+    def _tree_max_age(self, container):
+        # A live change watcher marks the tree dirty on every change, so it rarely needs re-validating
+        return TREE_WATCHED_MAX_AGE if change_watchers.is_watching(container.id) else TREE_MAX_AGE
+
     def list_files(self, startup_id, path=".", container_name=None):
         """
         Lists files in the container directory.
+        Served from the cached file-tree index; directories the index does not descend
+        into (node_modules, .git, ...) are listed directly.
+        Returns: {"files": [{"name", "type", "path", "size", "mtime"}], "etag"} or {"error"}
         """
         if not self.client:
             return {"error": "Docker not available"}
         
-        # Query database for container name if not provided
-        if not container_name:
-            from app.models import Startup
-            startup = Startup.query.get(startup_id)
-            if startup and startup.container_name:
-                container_name = startup.container_name
-            else:
-                container_name = self.get_container_name(startup_id)
-        
         try:
-            container = self.client.containers.get(container_name)
+            container = self._get_container(startup_id, container_name)
             if container.status != 'running':
                 return {"error": "Container not running"}
+
+            files, etag = file_trees.list_dir(container.id, self._tree_runner(container), path, self._tree_max_age(container))
+            if files is not None:
+                return {"files": files, "etag": etag}
             
             # Use ls -F to distinguish directories
             # -1 forces one entry per line, -A includes hidden files (except . and ..)
             exit_code, output = container.exec_run(
-                f"ls -1FA '{path}'",
+                ["ls", "-1FA", path],
                 workdir="/app"
             )
             
@@ -248,167 +872,470 @@ class DockerManager:
         except Exception as e:
             return {"error": str(e)}
 
+    def file_tree(self, startup_id, path=".", container_name=None):
+        """
+        Returns the cached recursive listing under path.
+        Returns: {"files": [{"path", "type", "size", "mtime"}], "etag"} or {"error"}
+        """
+        if not self.client:
+            return {"error": "Docker not available"}
+
+        try:
+            container = self._get_container(startup_id, container_name)
+            if container.status != 'running':
+                return {"error": "Container not running"}
+
+            files, etag = file_trees.list_tree(container.id, self._tree_runner(container), path, self._tree_max_age(container))
+            return {"files": files, "etag": etag}
+        except Exception as e:
+            return {"error": str(e)}
+
+    def watch_changes(self, startup_id, notify=None, container_name=None):
+        """
+        Starts (if not already running) the in-container change watcher for the startup.
+        Each debounced batch of changes refreshes the workspace caches and is then passed
+        to notify(changes), changes being [{"path", "event", "is_dir"}].
+        """
+        if not self.client:
+            return {"error": "Docker not available"}
+
+        try:
+            container = self._get_container(startup_id, container_name)
+            if container.status != 'running':
+                return {"error": "Container not running"}
+
+            def on_change(changes):
+                file_trees.mark_dirty(container.id)
+                if any(posixpath.basename(change["path"]) in LINT_CONFIG_FILES for change in changes):
+                    lint_service.invalidate(container.id)
+                if any(posixpath.basename(change["path"]) in START_COMMAND_FILES for change in changes):
+                    _start_commands.pop(container.id, None)
+                if notify:
+                    notify(changes)
+
+            change_watchers.ensure(container.client, container, on_change)
+            return {"status": "watching"}
+        except Exception as e:
+            return {"error": str(e)}
+
+    def list_project_files(self, startup_id, container_name=None):
+        """
+        Returns the workspace's source files (no hidden or excluded directories), one path
+        per line, from the file-tree index. Returns "" if the container is unavailable.
+        """
+        result = self.file_tree(startup_id, container_name=container_name)
+        if result.get("error"):
+            print(f"Error listing project files: {result['error']}")
+            return ""
+        return "\n".join(
+            item["path"] for item in result["files"]
+            if item["type"] == "file" and not any(part.startswith(".") for part in item["path"].split("/"))
+        )
+
+    def workspace_template(self, startup_id, container_name=None):
+        """Returns {"stack", "version"} if the workspace was seeded from a project template, else None."""
+        result = self.read_file(startup_id, TEMPLATE_MARKER, container_name=container_name)
+        if result.get("error"):
+            return None
+        try:
+            return json.loads(result["content"])
+        except (ValueError, TypeError):
+            return None
+
+    def _container_path(self, path):
+        """Resolves a path relative to the /app workdir into an absolute container path."""
+        return posixpath.normpath(posixpath.join("/app", path))
+
     def read_file(self, startup_id, path, container_name=None):
         """
         Reads file content from the container.
         """
+        result = self.read_files(startup_id, [path], container_name=container_name)
+        if "error" in result:
+            return result
+        return result["files"][path]
+
+    def read_files(self, startup_id, paths, container_name=None):
+        """
+        Reads any number of files from the container in a single tar stream.
+        A single path goes through the archive endpoint (get_archive); several paths
+        are packed by one in-container `tar` exec, since get_archive takes one path per call.
+        Returns: {"files": {path: {"content", "size", "sha256"} or {"error"}}}
+        """
         if not self.client:
             return {"error": "Docker not available"}
-        
-        # Query database for container name if not provided
-        if not container_name:
-            from app.models import Startup
-            startup = Startup.query.get(startup_id)
-            if startup and startup.container_name:
-                container_name = startup.container_name
-            else:
-                container_name = self.get_container_name(startup_id)
-            
+
         try:
-            container = self.client.containers.get(container_name)
+            container = self._get_container(startup_id, container_name)
             if container.status != 'running':
                 return {"error": "Container not running"}
-                
-            exit_code, output = container.exec_run(
-                f"cat '{path}'",
-                workdir="/app"
-            )
-            
-            if exit_code != 0:
-                return {"error": f"Error reading file: {output.decode('utf-8')}"}
-                
-            return {"content": output.decode('utf-8')}
-            
+
+            targets = {self._container_path(p).lstrip('/'): p for p in paths}
+            files = {}
+
+            if len(paths) == 1:
+                try:
+                    stream, _ = container.get_archive(self._container_path(paths[0]))
+                except docker.errors.NotFound:
+                    return {"files": {paths[0]: {"error": f"Error reading file: {paths[0]} not found"}}}
+                with tarfile.open(fileobj=_ChunkStream(stream), mode='r|') as tar:
+                    for member in tar:
+                        # get_archive names the root entry after the basename of the path
+                        if member.isfile():
+                            files[paths[0]] = _read_member(tar, member)
+                            break
+            else:
+                cmd = ["tar", "-cf", "-", "--ignore-failed-read", "--"] + [self._container_path(p) for p in paths]
+                _, stream = container.exec_run(cmd, stream=True, stdout=True, stderr=False)
+                with tarfile.open(fileobj=_ChunkStream(stream), mode='r|') as tar:
+                    for member in tar:
+                        path = targets.get(member.name.lstrip('/'))
+                        if path is not None and member.isfile():
+                            files[path] = _read_member(tar, member)
+
+            for path in paths:
+                if path not in files:
+                    files[path] = {"error": f"Error reading file: {path} not found or not a regular file"}
+            return {"files": files}
+
         except Exception as e:
             return {"error": str(e)}
 
     def write_file(self, startup_id, path, content, container_name=None):
         """
-        Writes content to a file in the container using base64 encoding.
+        Writes content to a file in the container.
+        """
+        result = self.write_files(startup_id, {path: content}, container_name=container_name)
+        if "error" in result:
+            return result
+        return {"status": "success", **result["files"][path]}
+
+    def write_files(self, startup_id, files, container_name=None):
+        """
+        Writes any number of files to the container in a single tar stream (put_archive).
+        files: dict of path -> content (str or bytes). Parent directories are created by Docker.
+        The archive is spooled to disk past ARCHIVE_SPOOL_SIZE instead of being held in memory.
+        A task worker may only write inside its claimed paths (workspace_locks.refused).
+        Returns: {"status": "success", "files": {path: {"size", "sha256"}}}
         """
         if not self.client:
             return {"error": "Docker not available"}
 
-        # Query database for container name if not provided
-        if not container_name:
-            from app.models import Startup
-            startup = Startup.query.get(startup_id)
-            if startup and startup.container_name:
-                container_name = startup.container_name
-            else:
-                container_name = self.get_container_name(startup_id)
-        
+        refused = workspace_locks.refused(startup_id, [self._container_path(path) for path in files])
+        if refused:
+            return self._refused_writes(startup_id, refused)
+
         try:
-            container = self.client.containers.get(container_name)
+            container = self._get_container(startup_id, container_name)
             if container.status != 'running':
                 return {"error": "Container not running"}
-            
-            import base64
-            encoded_content = base64.b64encode(content.encode('utf-8')).decode('utf-8')
-            
-            # Ensure parent directory exists
-            cmd = f"mkdir -p $(dirname {path}) && echo '{encoded_content}' | base64 -d > {path}"
-            
-            exit_code, output = container.exec_run(
-                f"bash -c \"{cmd}\"",
-                workdir="/app"
-            )
-            
-            if exit_code != 0:
-                return {"error": f"Error writing file: {output.decode('utf-8')}"}
-                
-            return {"status": "success"}
-            
+
+            with tempfile.SpooledTemporaryFile(max_size=ARCHIVE_SPOOL_SIZE) as archive:
+                written = self._pack_files(files, archive)
+                container.put_archive("/", archive)
+            self._record_writes(container, written)
+
+            return {"status": "success", "files": written}
+
+        except Exception as e:
+            return {"error": f"Error writing files: {str(e)}"}
+
+    @staticmethod
+    def _refused_writes(startup_id, paths):
+        return {"error": f"Error writing files: outside the paths claimed by {workspace_locks.owner(startup_id)}: {', '.join(paths)}"}
+
+    def _pack_files(self, files, archive):
+        """Writes files (path -> content) as a tar archive into archive and rewinds it. Returns {path: {"size", "sha256"}}."""
+        written = {}
+        with tarfile.open(fileobj=archive, mode='w') as tar:
+            now = time.time()
+            for path, content in files.items():
+                data = content.encode('utf-8') if isinstance(content, str) else (content or b"")
+                info = tarfile.TarInfo(name=self._container_path(path).lstrip('/'))
+                info.size = len(data)
+                info.mtime = now
+                info.mode = 0o644
+                tar.addfile(info, io.BytesIO(data))
+                written[path] = {"size": len(data), "sha256": hashlib.sha256(data).hexdigest()}
+        archive.seek(0)
+        return written
+
+    def _record_writes(self, container, written):
+        """Invalidates what the written files affect: start command, lint config, file tree."""
+        if any(posixpath.basename(path) in START_COMMAND_FILES for path in written):
+            _start_commands.pop(container.id, None)
+        if any(posixpath.basename(path) in LINT_CONFIG_FILES for path in written):
+            lint_service.invalidate(container.id)
+        written_paths = {posixpath.relpath(self._container_path(path), "/app"): info["size"] for path, info in written.items()}
+        file_trees.record_writes(container.id, {path: size for path, size in written_paths.items() if not path.startswith("..")})
+
+    # --- Async variants, run on the Docker event loop (asyncengine.docker_loop) ---
+    # Same arguments and results as the blocking methods. Many of them can be in flight at
+    # once without a thread each; docker_loop.run()/gather() call them from blocking code.
+
+    async def _get_container_async(self, startup_id, container_name=None):
+        container = await docker_loop.call_shared(container_registry.get, startup_id, container_name)
+        if container is not None:
+            await docker_loop.call_shared(hibernator.touch, container.name)
+            return container
+        # Registry misses query the database and Docker through blocking clients
+        return await docker_loop.run_blocking(self._get_container, startup_id, container_name)
+
+    async def run_command_async(self, startup_id, command, container_name=None, timeout=SHELL_COMMAND_TIMEOUT):
+        """
+        Runs a command as a one-off exec in /app. Unlike run_command it does not queue
+        behind the container's shell session, so commands run concurrently.
+        """
+        if not self.client:
+            return {"error": "Docker not available"}
+
+        try:
+            container = await self._get_container_async(startup_id, container_name)
+            if container.status != 'running':
+                return {"error": "Container not running"}
+            result = await docker_loop.engine(container.client).exec_run(container.id, command, workdir="/app", timeout=timeout)
+            await docker_loop.call_shared(file_trees.mark_dirty, container.id)
+            return result
+        except docker.errors.NotFound:
+            return {"error": "Container not found"}
+        except DockerEngineError as e:
+            return {"error": "Container not found" if e.status == 404 else str(e)}
+        except Exception as e:
+            return {"error": str(e)}
+
+    async def read_files_async(self, startup_id, paths, container_name=None):
+        """Reads files with one concurrent archive request per path."""
+        if not self.client:
+            return {"error": "Docker not available"}
+
+        try:
+            container = await self._get_container_async(startup_id, container_name)
+            if container.status != 'running':
+                return {"error": "Container not running"}
+            engine = docker_loop.engine(container.client)
+
+            async def read(path):
+                try:
+                    data = await engine.get_archive(container.id, self._container_path(path))
+                except DockerEngineError as e:
+                    if e.status == 404:
+                        return {"error": f"Error reading file: {path} not found"}
+                    raise
+                with tarfile.open(fileobj=io.BytesIO(data), mode='r|') as tar:
+                    for member in tar:
+                        if member.isfile():
+                            return _read_member(tar, member)
+                return {"error": f"Error reading file: {path} not found or not a regular file"}
+
+            contents = await asyncio.gather(*(read(path) for path in paths))
+            return {"files": dict(zip(paths, contents))}
+
         except Exception as e:
             return {"error": str(e)}
 
-    def get_container_logs(self, startup_id, container_name=None):
+    async def write_files_async(self, startup_id, files, container_name=None):
+        """Writes files in a single tar archive, like write_files."""
+        if not self.client:
+            return {"error": "Docker not available"}
+
+        refused = await docker_loop.call_shared(workspace_locks.refused, startup_id, [self._container_path(path) for path in files])
+        if refused:
+            return self._refused_writes(startup_id, refused)
+
+        try:
+            container = await self._get_container_async(startup_id, container_name)
+            if container.status != 'running':
+                return {"error": "Container not running"}
+            archive = io.BytesIO()
+            written = self._pack_files(files, archive)
+            await docker_loop.engine(container.client).put_archive(container.id, "/", archive.getvalue())
+            await docker_loop.call_shared(self._record_writes, container, written)
+            return {"status": "success", "files": written}
+
+        except Exception as e:
+            return {"error": f"Error writing files: {str(e)}"}
+
+    def get_container_logs(self, startup_id, offset=None, container_name=None):
         """
-        Fetches logs from the container.
+        Returns container output from the startup's log ring buffer, following the container's
+        log stream from the first call on. Pass the returned offset back to get only new output.
+        Returns: {"logs", "start_offset", "offset", "reset"}
         """
         if not self.client:
             return {"error": "Docker not available"}
         
-        # Query database for container name if not provided
-        if not container_name:
-            from app.models import Startup
-            startup = Startup.query.get(startup_id)
-            if startup and startup.container_name:
-                container_name = startup.container_name
-            else:
-                container_name = self.get_container_name(startup_id)
-            
         try:
-            container = self.client.containers.get(container_name)
-            # Fetch logs (stdout and stderr)
-            logs = container.logs(stdout=True, stderr=True, tail=200)
-            return {"logs": logs.decode('utf-8')}
+            container = self._get_container(startup_id, container_name)
+            return container_logs.ensure(container).read(offset)
+        except docker.errors.NotFound:
+            return {"error": "Container not found"}
+        except Exception as e:
+            return {"error": str(e)}
+
+    def follow_logs(self, startup_id, notify, container_name=None):
+        """Pushes new container output to notify(text, offset) as it arrives."""
+        if not self.client:
+            return {"error": "Docker not available"}
+
+        try:
+            container = self._get_container(startup_id, container_name)
+            stream = container_logs.ensure(container, notify=notify)
+            return {"status": "following", "offset": stream.end}
+        except Exception as e:
+            return {"error": str(e)}
+
+    def preview_route(self, startup_id, port=None, refresh=False):
+        """
+        Returns the upstream address of the startup's app for the preview gateway:
+        {"host", "port", "container_id", "container_name"}. Without a port, the port the
+        server was detected listening on is used. refresh drops the cached route first.
+        """
+        if not self.client:
+            return {"error": "Docker not available"}
+
+        if refresh:
+            preview_gateway.forget(startup_id=startup_id)
+        try:
+            route = preview_gateway.resolve(startup_id, port, self._get_container, server_readiness.port_for)
+            # Cached routes skip _get_container, so previews still count as activity
+            hibernator.touch(route["container_name"])
+            return route
         except docker.errors.NotFound:
             return {"error": "Container not found"}
         except Exception as e:
             return {"error": str(e)}
+
+    def snapshot_workspace(self, startup_id, label="", auto=False, background=False, container_name=None):
+        """
+        Snapshots the workspace (/app) into deduplicated local storage, streaming the archive.
+        Heavy or generated directories (SYNC_EXCLUDES) are left out; restores leave them alone.
+        auto: automatic (task boundary) snapshots are pruned to the newest BUILDER_SNAPSHOT_KEEP.
+        background: capture the archive, then chunk and store it on the snapshot worker;
+        the returned summary only has "snapshot_id", "label", "auto", "created_at" and "pending".
+        Returns: {"snapshot_id", "label", "auto", "created_at", "files", "size", "stored_bytes"}
+        """
+        if not self.client:
+            return {"error": "Docker not available"}
+
+        try:
+            container = self._get_container(startup_id, container_name)
+            if container.status != 'running':
+                return {"error": "Container not running"}
+            exclude_args = [f"--exclude={name}" for name in SYNC_EXCLUDES]
+            # Entries named app/... like get_archive("/app"), which restores rely on
+            _, stream = container.exec_run(["tar", "-cf", "-", *exclude_args, "-C", "/", "app"], stream=True, stdout=True, stderr=False)
+            if not background:
+                return workspace_snapshots.create(startup_id, _ChunkStream(stream), label=label, auto=auto)
+            # The capture is what has to happen before the workspace changes; the rest can wait
+            archive = tempfile.SpooledTemporaryFile(max_size=ARCHIVE_SPOOL_SIZE)
+            for chunk in stream:
+                archive.write(chunk)
+            return workspace_snapshots.submit(startup_id, archive, label=label, auto=auto)
+        except Exception as e:
+            return {"error": f"Error taking snapshot: {str(e)}"}
+
+    def list_snapshots(self, startup_id):
+        """Returns: {"snapshots": [summary, ...]}, newest first."""
+        return {"snapshots": workspace_snapshots.list(startup_id)}
+
+    def restore_snapshot(self, startup_id, snapshot_id, source_startup_id=None, container_name=None):
+        """
+        Restores the workspace to a snapshot. Only entries that differ from the live workspace
+        (by type, size and mtime) are sent, and entries missing from the snapshot are deleted.
+        source_startup_id: restore another startup's snapshot (used to clone workspaces)
+        Returns: {"status": "restored", "snapshot_id", "sent", "deleted", "seconds"}
+        """
+        if not self.client:
+            return {"error": "Docker not available"}
+
+        manifest = workspace_snapshots.load(source_startup_id or startup_id, snapshot_id)
+        if manifest is None:
+            return {"error": f"Snapshot {snapshot_id} not found"}
+
+        try:
+            container = self._get_container(startup_id, container_name)
+            if container.status != 'running':
+                return {"error": "Container not running"}
+
+            started = time.time()
+            # Excluded directories are not in snapshots, so they are neither compared nor deleted
+            pruned = [arg for name in SYNC_EXCLUDES for arg in ("-o", "-name", name)][1:]
+            exit_code, output = container.exec_run(
+                ["find", "/app", "-mindepth", "1", "(", *pruned, ")", "-prune", "-o", "-printf", "%y\\t%s\\t%T@\\t%p\\n"]
+            )
+            if exit_code != 0:
+                return {"error": f"Error listing workspace: {output.decode('utf-8', errors='replace')[-500:]}"}
+            current = {}
+            for line in output.decode('utf-8', errors='replace').splitlines():
+                parts = line.split("\t", 3)
+                if len(parts) == 4:
+                    kind, size, mtime, path = parts
+                    current[path.lstrip("/")] = {
+                        "type": {"d": "directory", "f": "file", "l": "symlink"}.get(kind, "other"),
+                        "size": int(size), "mtime": float(mtime)
+                    }
+
+            send, delete = workspace_snapshots.restore_plan(manifest, current)
+            if delete:
+                # The list goes in as a file: NUL-separated paths are safe for any file name
+                listing = b"".join(b"/" + name.encode('utf-8') + b"\0" for name in delete)
+                archive = io.BytesIO()
+                with tarfile.open(fileobj=archive, mode='w') as tar:
+                    info = tarfile.TarInfo(name="tmp/.snapshot_delete")
+                    info.size = len(listing)
+                    tar.addfile(info, io.BytesIO(listing))
+                container.put_archive("/", archive.getvalue())
+                exit_code, output = container.exec_run(["sh", "-c", "xargs -0 rm -rf -- < /tmp/.snapshot_delete; rm -f /tmp/.snapshot_delete"])
+                if exit_code != 0:
+                    return {"error": f"Error clearing workspace: {output.decode('utf-8', errors='replace')[-500:]}"}
+            container.put_archive("/", workspace_snapshots.tar_stream(send))
+
+            file_trees.mark_dirty(container.id)
+            lint_service.invalidate(container.id)
+            _start_commands.pop(container.id, None)
+            duration = time.time() - started
+            workspace_snapshots.record_restore(duration)
+            print(f"Restored {startup_id} to snapshot {snapshot_id}: {len(send)} entries sent, {len(delete)} deleted in {duration:.1f}s")
+            return {
+                "status": "restored",
+                "snapshot_id": snapshot_id,
+                "sent": len(send),
+                "deleted": len(delete),
+                "seconds": round(duration, 2)
+            }
+        except Exception as e:
+            return {"error": f"Error restoring snapshot: {str(e)}"}
+
+    def clone_workspace(self, source_startup_id, target_startup_id, snapshot_id=None):
+        """
+        Copies a workspace into another startup's (running) container: from snapshot_id, or
+        from a fresh snapshot of the source workspace. Returns restore_snapshot's result.
+        """
+        if not snapshot_id:
+            snapshot = self.snapshot_workspace(source_startup_id, label=f"Clone to startup {target_startup_id}")
+            if snapshot.get("error"):
+                return snapshot
+            snapshot_id = snapshot["snapshot_id"]
+        return self.restore_snapshot(target_startup_id, snapshot_id, source_startup_id=source_startup_id)
+
     def copy_from_container(self, startup_id, src_path, dest_path, container_name=None):
         """Copies files from container to host, excluding heavy directories."""
         if not self.client:
             return False
         
-        # Query database for container name if not provided
-        if not container_name:
-            from app.models import Startup
-            startup = Startup.query.get(startup_id)
-            if startup and startup.container_name:
-                container_name = startup.container_name
-            else:
-                container_name = self.get_container_name(startup_id)
-            
         try:
-            container = self.client.containers.get(container_name)
+            container = self._get_container(startup_id, container_name)
             
             # Use tar inside container to stream files with excludes
             # This avoids transferring node_modules over the socket
-            excludes = [
-                "--exclude='node_modules'",
-                "--exclude='.git'",
-                "--exclude='dist'",
-                "--exclude='build'",
-                "--exclude='__pycache__'",
-                "--exclude='.DS_Store'",
-                "--exclude='coverage'",
-                "--exclude='.next'"
-            ]
-            exclude_str = " ".join(excludes)
-            
-            # Create tar stream command
-            # We tar to stdout (-)
-            # -C changes directory
-            # . is the target (relative to -C)
-            # We assume src_path is a directory. If it's a file, this might need adjustment, 
-            # but for indexing we usually copy the whole app dir.
-            
-            # Ensure src_path ends with / if it's a dir, or handle it. 
-            # Safest is to assume src_path is the root dir to copy.
-            
+            exclude_str = " ".join(f"--exclude='{name}'" for name in SYNC_EXCLUDES)
             cmd = f"tar -cf - {exclude_str} -C {src_path} ."
             
             # exec_run with stream=True returns a generator
-            exit_code, output_stream = container.exec_run(cmd, stream=True)
-            
-            # We can't easily check exit_code immediately with stream=True in all docker SDK versions/configs,
-            # but we can read the stream.
+            exit_code, output_stream = container.exec_run(cmd, stream=True, stdout=True, stderr=False)
             
-            import tarfile
-            import io
-            
-            # Read the stream into a BytesIO object (in-memory)
-            # CAUTION: If the project is huge (sans node_modules), this might consume memory.
-            # But without node_modules it should be small (MBs).
-            tar_data = io.BytesIO()
-            for chunk in output_stream:
-                tar_data.write(chunk)
-            tar_data.seek(0)
-            
-            # Extract
-            with tarfile.open(fileobj=tar_data) as tar:
+            # Extract while reading, so the archive is never held in memory
+            with tarfile.open(fileobj=_ChunkStream(output_stream), mode='r|') as tar:
                 tar.extractall(path=dest_path)
                 
             return True
@@ -416,6 +1343,136 @@ class DockerManager:
             print(f"Error copying from container: {e}")
             return False
 
+    def _commit_runner(self, startup_id, container_name=None):
+        return lambda command, timeout: self.run_command(startup_id, command, container_name=container_name, timeout=timeout)
+
+    def checkpoint_step(self, startup_id, step, paths=None, task=None, container_name=None):
+        """
+        Records a finished agent step for the next git checkpoint of the workspace.
+        paths: files the step wrote (None if it may have changed anything).
+        Returns the commit record {"commit", "task", "steps", "committed_at"} if the step's
+        batch was committed now, else None (it is committed with a later step or at the task boundary).
+        """
+        return workspace_commits.record(self._commit_runner(startup_id, container_name), startup_id, step, paths=paths, task=task)
+
+    def flush_checkpoints(self, startup_id, paths=(), task=None, container_name=None):
+        """Commits the startup's pending steps, plus paths. Returns the commit record or None."""
+        return workspace_commits.flush(self._commit_runner(startup_id, container_name), startup_id, paths=paths, task=task)
+
+    def list_checkpoints(self, startup_id):
+        """Returns the git checkpoints of the startup's steps, newest first."""
+        return {"commits": workspace_commits.history(startup_id), "pending_steps": workspace_commits.pending(startup_id)}
+
+    def rollback_workspace(self, startup_id, commit=None, step_id=None, task=None, container_name=None):
+        """
+        Resets the workspace to a git checkpoint: the given commit, or the one containing step_id.
+        Untracked files are removed too; excluded directories such as node_modules are kept.
+        """
+        commit = commit or (workspace_commits.commit_for(startup_id, step_id, task=task) if step_id is not None else None)
+        if not commit:
+            return {"error": "No checkpoint found for that step"}
+        if not re.fullmatch(r"[0-9a-f]{7,40}", commit):
+            return {"error": "Invalid commit"}
+
+        # Whatever was pending belongs to the history being discarded
+        workspace_commits.discard(startup_id)
+        result = self.run_command(startup_id, f"git reset -q --hard {commit} && git clean -fdq", container_name=container_name)
+        if result.get("error") or result.get("exit_code") != 0:
+            return {"error": result.get("error") or result.get("output", "").strip() or "Rollback failed"}
+        try:
+            container = self._get_container(startup_id, container_name)
+            _start_commands.pop(container.id, None)
+            lint_service.invalidate(container.id)
+        except Exception:
+            pass
+        return {"status": "rolled_back", "commit": commit}
+
+    def sync_workspace(self, startup_id, src_path, dest_path, container_name=None):
+        """
+        Incrementally mirrors src_path in the container to dest_path on the host.
+        A manifest (path -> size, mtime, sha256) kept next to dest_path decides which
+        files to fetch: only new/changed files are streamed out of the container, and
+        files deleted in the container are removed locally.
+        Returns: {"changed": [paths], "deleted": [paths], "fetched": int} or {"error"}
+        Paths are relative to src_path. Content-identical rewrites are not reported as changed.
+        """
+        if not self.client:
+            return {"error": "Docker not available"}
+
+        try:
+            container = self._get_container(startup_id, container_name)
+            if container.status != 'running':
+                return {"error": "Container not running"}
+
+            manifest_path = dest_path.rstrip("/") + ".manifest.json"
+            manifest = {}
+            if os.path.exists(manifest_path):
+                with open(manifest_path) as f:
+                    manifest = json.load(f)
+            elif os.path.exists(dest_path):
+                # Legacy full copy without a manifest: start clean so deletions are tracked
+                shutil.rmtree(dest_path)
+            os.makedirs(dest_path, exist_ok=True)
+
+            # 1. List files with size and mtime in one exec
+            prune = ["("]
+            for name in SYNC_EXCLUDES:
+                prune += ["-name", name, "-o"]
+            prune[-1] = ")"
+            cmd = ["find", src_path] + prune + ["-prune", "-o", "-type", "f", "-printf", "%P\\t%s\\t%T@\\n"]
+            exit_code, output = container.exec_run(cmd, stdout=True, stderr=False)
+            if exit_code != 0:
+                return {"error": f"Error listing workspace: exit code {exit_code}"}
+
+            remote = {}
+            for line in output.decode('utf-8', errors='replace').splitlines():
+                parts = line.split("\t")
+                if len(parts) == 3:
+                    remote[parts[0]] = {"size": int(parts[1]), "mtime": float(parts[2])}
+
+            stale = [
+                path for path, meta in remote.items()
+                if path not in manifest
+                or manifest[path]["size"] != meta["size"]
+                or manifest[path]["mtime"] != meta["mtime"]
+            ]
+            deleted = sorted(path for path in manifest if path not in remote)
+
+            # 2. Stream only the stale files out of the container
+            changed = []
+            if stale:
+                list_file = "/tmp/.workspace_sync_files"
+                write_result = self.write_files(startup_id, {list_file: "\n".join(stale) + "\n"}, container_name=container_name)
+                if "error" in write_result:
+                    return write_result
+                cmd = ["tar", "-cf", "-", "--ignore-failed-read", "-C", src_path, "-T", list_file]
+                _, stream = container.exec_run(cmd, stream=True, stdout=True, stderr=False)
+                with tarfile.open(fileobj=_ChunkStream(stream), mode='r|') as tar:
+                    for member in tar:
+                        path = posixpath.normpath(member.name)
+                        if not member.isfile() or path not in remote or path.startswith(".."):
+                            continue
+                        sha256 = _extract_member(tar, member, os.path.join(dest_path, path))
+                        if manifest.get(path, {}).get("sha256") != sha256:
+                            changed.append(path)
+                        manifest[path] = {**remote[path], "sha256": sha256}
+
+            # 3. Drop files that no longer exist in the container
+            for path in deleted:
+                local_path = os.path.join(dest_path, path)
+                if os.path.exists(local_path):
+                    os.remove(local_path)
+                del manifest[path]
+
+            with open(manifest_path, "w") as f:
+                json.dump(manifest, f)
+
+            return {"changed": sorted(changed), "deleted": deleted, "fetched": len(stale)}
+
+        except Exception as e:
+            print(f"Error syncing workspace: {e}")
+            return {"error": str(e)}
+
     def start_server(self, startup_id, container_name=None):
         """
         Starts the application server in the background.
@@ -424,50 +1481,22 @@ class DockerManager:
         if not self.client:
             return {"error": "Docker not available"}
 
-        # Query database for container name if not provided
-        if not container_name:
-            from app.models import Startup
-            startup = Startup.query.get(startup_id)
-            if startup and startup.container_name:
-                container_name = startup.container_name
-            else:
-                container_name = self.get_container_name(startup_id)
-
         try:
-            container = self.client.containers.get(container_name)
+            container = self._get_container(startup_id, container_name)
             if container.status != 'running':
                 return {"error": "Container not running"}
 
-            # 1. Determine Start Command
-            start_cmd = "npm start" # Default
-            
-            # Check for package.json
-            exit_code, output = container.exec_run("cat package.json", workdir="/app")
-            if exit_code == 0:
-                import json
-                try:
-                    pkg = json.loads(output.decode('utf-8'))
-                    if "scripts" in pkg and "dev" in pkg["scripts"]:
-                        start_cmd = "npm run dev"
-                    elif "scripts" in pkg and "start" in pkg["scripts"]:
-                        start_cmd = "npm start"
-                except:
-                    pass
-            else:
-                # Check for python
-                exit_code, _ = container.exec_run("ls app.py", workdir="/app")
-                if exit_code == 0:
-                    start_cmd = "python app.py"
-                else:
-                    exit_code, _ = container.exec_run("ls main.py", workdir="/app")
-                    if exit_code == 0:
-                        start_cmd = "python main.py"
+            # 1. Determine Start Command (cached until a project manifest is rewritten)
+            start_cmd = _start_commands.get(container.id)
+            if not start_cmd:
+                start_cmd = self._detect_start_command(container)
+                _start_commands[container.id] = start_cmd
 
             print(f"Starting server with command: {start_cmd}")
 
             # 2. Run in background using nohup
             # We redirect output to app.log and save PID
-            full_cmd = f"nohup {start_cmd} > app.log 2>&1 & echo $! > server.pid"
+            full_cmd = f"nohup {start_cmd} > app.log 2>&1 & echo $! > server.pid; cat server.pid"
             
             exit_code, output = container.exec_run(
                 f"bash -c '{full_cmd}'",
@@ -476,12 +1505,65 @@ class DockerManager:
             
             if exit_code != 0:
                 return {"error": f"Failed to start server: {output.decode('utf-8')}"}
+            server_readiness.mark_started(container.id)
                 
             return {"status": "started", "command": start_cmd, "pid": output.decode('utf-8').strip()}
 
         except Exception as e:
             return {"error": str(e)}
 
+    def _detect_start_command(self, container):
+        """Picks the server start command from package.json, app.py or main.py in one shell command."""
+        result = self._exec_once(
+            container,
+            "if [ -f package.json ]; then echo __PACKAGE_JSON__; cat package.json; "
+            "elif [ -f app.py ]; then echo __APP_PY__; "
+            "elif [ -f main.py ]; then echo __MAIN_PY__; fi",
+            timeout=30
+        )
+        output = result.get("output", "")
+        if output.startswith("__PACKAGE_JSON__"):
+            try:
+                scripts = json.loads(output.split("\n", 1)[1]).get("scripts", {})
+                if "dev" in scripts:
+                    return "npm run dev"
+            except (ValueError, AttributeError):
+                pass
+            return "npm start"
+        if output.startswith("__APP_PY__"):
+            return "python app.py"
+        if output.startswith("__MAIN_PY__"):
+            return "python main.py"
+        return "npm start" # Default
+
+    def wait_until_ready(self, startup_id, container_name=None, timeout=None):
+        """
+        Waits for the server started by start_server to listen on a port.
+        Uses one in-container watcher (listening sockets, app.log, server PID) rather than
+        repeated HTTP probes, with an adaptive timeout per stack.
+        Returns: {"ready": bool, "port", "time_to_ready", "reason"} or {"error"}
+        """
+        if not self.client:
+            return {"error": "Docker not available"}
+
+        try:
+            container = self._get_container(startup_id, container_name)
+            if container.status != 'running':
+                return {"error": "Container not running"}
+
+            stack_type = container.labels.get(STACK_LABEL, "default")
+            result = server_readiness.wait(
+                lambda command, timeout: self._exec_once(container, command, timeout),
+                container.id, stack_type, timeout=timeout
+            )
+            if not result["ready"]:
+                # The project may have changed shape since the start command was detected
+                _start_commands.pop(container.id, None)
+            return result
+
+        except Exception as e:
+            return {"error": str(e)}
+
     def stop_server(self, startup_id, container_name=None):
         """
         Stops the application server using the saved PID.
@@ -489,17 +1571,8 @@ class DockerManager:
         if not self.client:
             return {"error": "Docker not available"}
 
-        # Query database for container name if not provided
-        if not container_name:
-            from app.models import Startup
-            startup = Startup.query.get(startup_id)
-            if startup and startup.container_name:
-                container_name = startup.container_name
-            else:
-                container_name = self.get_container_name(startup_id)
-
         try:
-            container = self.client.containers.get(container_name)
+            container = self._get_container(startup_id, container_name)
             if container.status != 'running':
                 return {"error": "Container not running"}
 
@@ -523,50 +1596,104 @@ class DockerManager:
         except Exception as e:
             return {"error": str(e)}
 
-    def get_container_logs(self, startup_id):
-        """Returns the logs of the container."""
-        if not self.client:
-            return {"error": "Docker not available"}
-            
-        container_name = self.get_container_name(startup_id)
-        try:
-            container = self.client.containers.get(container_name)
-            return {"logs": container.logs().decode('utf-8')}
-        except Exception as e:
-            return {"error": str(e)}
-
 class Linter:
     def __init__(self, docker_manager):
         self.docker_manager = docker_manager
 
-    def lint_file(self, startup_id, file_path):
+    def lint_file(self, startup_id, file_path, content=None):
         """
         Runs the appropriate linter based on file extension.
+        content: the file's text, if known (saves reading it back from the container)
         Returns: {"passed": bool, "errors": list[str]}
         """
-        if file_path.endswith(".js") or file_path.endswith(".ts") or file_path.endswith(".jsx") or file_path.endswith(".tsx"):
-            return self.run_eslint(startup_id, file_path)
-        elif file_path.endswith(".py"):
-            return self.run_flake8(startup_id, file_path)
-        else:
-            return {"passed": True, "errors": []}
+        return self.lint_files(startup_id, {file_path: content})[file_path]
+
+    def lint_files(self, startup_id, files):
+        """
+        Lints several files with one request per linter, through warm daemons inside the
+        container. Results are cached by content hash, so unchanged files are not re-linted.
+        files: dict of path -> content (None to read it from the container)
+        Returns: {path: {"passed": bool, "errors": list[str]}}
+        """
+        results = {path: {"passed": True, "errors": []} for path in files}
+        by_tool = {}
+        for path in files:
+            tool = LINT_TOOLS.get(posixpath.splitext(path)[1])
+            if tool:
+                by_tool.setdefault(tool, []).append(path)
+        if not by_tool:
+            return results
+
+        try:
+            container = self.docker_manager._get_container(startup_id)
+            if container.status != 'running':
+                raise RuntimeError("Container not running")
+        except Exception as e:
+            for paths in by_tool.values():
+                for path in paths:
+                    results[path] = {"passed": False, "errors": [f"Error linting file: {e}"]}
+            return results
+
+        lintable = [path for paths in by_tool.values() for path in paths]
+        missing = [path for path in lintable if files[path] is None]
+        contents = dict(files)
+        if missing:
+            read = self.docker_manager.read_files(startup_id, missing).get("files", {})
+            for path in missing:
+                contents[path] = read.get(path, {}).get("content")
+
+        for tool, paths in by_tool.items():
+            pending = {}
+            for path in paths:
+                if contents[path] is None:
+                    # Unreadable (e.g. binary or missing): let the CLI report it
+                    pending[path] = None
+                    continue
+                key = lint_service.cache_key(container.id, self.docker_manager._container_path(path), contents[path])
+                cached = lint_service.cached(key)
+                if cached is not None:
+                    results[path] = cached
+                else:
+                    pending[path] = key
+            if pending:
+                results.update(self._lint_batch(startup_id, container, tool, pending, contents))
+        return results
+
+    def _lint_batch(self, startup_id, container, tool, pending, contents):
+        """Lints pending ({path: cache key or None}) through the daemon, falling back to the CLI."""
+        lint_service.record_batch()
+        texts = {self.docker_manager._container_path(path): contents[path] for path, key in pending.items() if key}
+        if len(texts) == len(pending):
+            try:
+                daemon = lint_service.daemon(container.client, container, tool)
+                output = daemon.lint(texts)
+                results = {}
+                for path, key in pending.items():
+                    found = output.get(self.docker_manager._container_path(path), {})
+                    result = {
+                        "passed": not found.get("errors"),
+                        "errors": found.get("output", "").splitlines() if found.get("errors") else []
+                    }
+                    lint_service.store(key, result)
+                    results[path] = result
+                return results
+            except Exception as e:
+                print(f"Lint daemon ({tool}) failed, falling back to the CLI: {e}")
+
+        run = self.run_eslint if tool == "eslint" else self.run_flake8
+        return {path: run(startup_id, path) for path in pending}
 
     def run_eslint(self, startup_id, file_path):
-        # Check for existing config
-        check_config = self.docker_manager.run_command(startup_id, "ls eslint.config.js")
-        config_flag = ""
-        
-        if check_config.get("exit_code") != 0:
-            # No config found, use default in /tmp
-            default_config_path = "/tmp/eslint.config.js"
-            # Create default config if not exists
-            # We use a simple check to avoid overwriting if it exists (though overwriting is fine for tmp)
-            create_config_cmd = "echo 'module.exports = [{files: [\"**/*.js\", \"**/*.ts\", \"**/*.jsx\", \"**/*.tsx\"], rules: {\"no-unused-vars\": \"warn\", \"no-undef\": \"error\"}}];' > " + default_config_path
-            self.docker_manager.run_command(startup_id, create_config_cmd)
-            config_flag = f"--config {default_config_path}"
-            
-        cmd = f"eslint {config_flag} {file_path}"
-        result = self.docker_manager.run_command(startup_id, cmd)
+        # Config check, default config creation and the lint run share one one-off exec
+        # If no project config is found, use a default in /tmp
+        default_config_path = "/tmp/eslint.config.js"
+        default_config = DEFAULT_ESLINT_CONFIG
+        cmd = (
+            f"if [ -f eslint.config.js ]; then eslint {shlex.quote(file_path)}; "
+            f"else [ -f {default_config_path} ] || echo {shlex.quote(default_config)} > {default_config_path}; "
+            f"eslint --config {default_config_path} {shlex.quote(file_path)}; fi"
+        )
+        result = self.docker_manager.probe_command(startup_id, cmd)
         
         if result.get("exit_code") == 0:
             return {"passed": True, "errors": []}
@@ -574,8 +1701,8 @@ class Linter:
             return {"passed": False, "errors": result.get("output", "").splitlines()}
 
     def run_flake8(self, startup_id, file_path):
-        cmd = f"flake8 {file_path}"
-        result = self.docker_manager.run_command(startup_id, cmd)
+        cmd = f"flake8 {shlex.quote(file_path)}"
+        result = self.docker_manager.probe_command(startup_id, cmd)
         
         if result.get("exit_code") == 0:
             return {"passed": True, "errors": []}
@@ -4,6 +4,10 @@ from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_openai import AzureOpenAIEmbeddings
 from langchain_community.vectorstores import Chroma
 import shutil
+from pathlib import Path
+
+# Must match the glob used by index_codebase
+INDEXED_EXTENSIONS = {".py", ".js", ".jsx", ".ts", ".tsx", ".html", ".css", ".md", ".json"}
 
 class MemoryManager:
     def __init__(self, startup_id):
@@ -19,8 +23,15 @@ class MemoryManager:
             api_key=os.environ.get("AZURE_OPENAI_API_KEY"),
         )
         
-    def index_codebase(self, root_path):
-        """Indexes the codebase at root_path."""
+    def index_codebase(self, root_path, changed_paths=None, deleted_paths=None):
+        """
+        Indexes the codebase at root_path.
+        If changed_paths/deleted_paths (relative to root_path) are given and an index
+        already exists, only those files are re-embedded instead of rebuilding everything.
+        """
+        if changed_paths is not None and os.path.exists(self.persist_directory):
+            return self._update_index(root_path, changed_paths, deleted_paths or [])
+
         print(f"Indexing codebase at {root_path}...")
         
         # Load documents
@@ -74,6 +85,41 @@ class MemoryManager:
         )
         print(f"Indexed {len(splits)} chunks.")
 
+    def _update_index(self, root_path, changed_paths, deleted_paths):
+        """Replaces the chunks of changed/deleted files in the existing index."""
+        print(f"Updating index at {root_path}: {len(changed_paths)} changed, {len(deleted_paths)} deleted.")
+
+        docs = []
+        for path in changed_paths:
+            if os.path.splitext(path)[1] not in INDEXED_EXTENSIONS:
+                continue
+            try:
+                docs.extend(TextLoader(str(Path(root_path) / path)).load())
+            except Exception as e:
+                print(f"Error loading {path}: {e}")
+
+        vectorstore = Chroma(
+            persist_directory=self.persist_directory,
+            embedding_function=self.embeddings
+        )
+
+        # Sources are stored as loaded by DirectoryLoader/TextLoader: root_path joined with the relative path
+        stale_sources = [str(Path(root_path) / path) for path in list(changed_paths) + list(deleted_paths)]
+        if stale_sources:
+            vectorstore._collection.delete(where={"source": {"$in": stale_sources}})
+
+        if docs:
+            text_splitter = RecursiveCharacterTextSplitter(
+                chunk_size=1000,
+                chunk_overlap=200,
+                add_start_index=True
+            )
+            splits = text_splitter.split_documents(docs)
+            vectorstore.add_documents(splits)
+            print(f"Re-indexed {len(splits)} chunks.")
+
+        self.vectorstore = vectorstore
+
     def retrieve(self, query, k=5):
         """Retrieves relevant code snippets."""
         if not os.path.exists(self.persist_directory):
@@ -0,0 +1,159 @@
+import threading
+import time
+
+CACHE_LABEL = "startup_builder.package_cache"
+
+# Shared download caches, one Docker volume per cache and daemon, mounted into every
+# stack container. npm's cacache and pip's cache are content-addressed and safe for
+# concurrent writers, so containers share them read-write; node-gyp keeps the Node
+# headers it downloads for native modules.
+PACKAGE_CACHES = {
+    "npm": {"volume": "startup_builder_cache_npm", "path": "/cache/npm", "env": {"npm_config_cache": "/cache/npm"}},
+    "pip": {"volume": "startup_builder_cache_pip", "path": "/cache/pip", "env": {"PIP_CACHE_DIR": "/cache/pip"}},
+    "node-gyp": {"volume": "startup_builder_cache_node_gyp", "path": "/cache/node-gyp", "env": {"npm_config_devdir": "/cache/node-gyp"}}
+}
+
+STACK_CACHES = {
+    "MERN": ["npm", "node-gyp", "pip"],
+    "NextJS": ["npm", "node-gyp"],
+    "Python-Data": ["pip"]
+}
+
+# Prints the cache's size, then "<files read since __SINCE__ that existed before it> <their bytes>",
+# then evicts least recently accessed files until the cache is back under __TARGET__ KiB.
+# Access times are only as fresh as the mount's atime policy (relatime: at least daily),
+# so the read figure is a lower bound.
+MAINTENANCE_SCRIPT = """
+cd __PATH__ || exit 0
+size=$(du -sk . | cut -f1)
+echo "SIZE $size"
+find . -type f -newerat @__SINCE__ ! -newermt @__SINCE__ -printf '%s\\n' | awk '{n++; b+=$1} END {print "READ", n+0, b+0}'
+if [ "$size" -gt __LIMIT__ ]; then
+  find . -type f -printf '%A@ %k %p\\n' | sort -n | awk -v over=$((size - __TARGET__)) \\
+    'over > 0 {kb = $2; sub(/^[^ ]+ [^ ]+ /, ""); print; over -= kb}' > /tmp/.cache_evict
+  freed=0
+  while IFS= read -r f; do
+    s=$(stat -c %s "$f" 2>/dev/null) && rm -f "$f" && freed=$((freed + s))
+  done < /tmp/.cache_evict
+  rm -f /tmp/.cache_evict
+  find . -mindepth 1 -type d -empty -delete 2>/dev/null
+  echo "EVICTED $freed"
+fi
+"""
+
+class PackageCacheVolumes:
+    """
+    Shared npm, pip and node-gyp cache volumes, mounted into stack containers by
+    _run_stack_container. A maintenance loop per daemon measures each cache, counts
+    the bytes installs read back from it (downloads saved) and evicts least recently
+    used files once a cache grows past its size limit.
+    Maintenance runs inside a running container that mounts the cache, so no helper
+    image is needed; a cache nobody mounts right now is simply not maintained.
+    """
+    def __init__(self):
+        self.limit_mb = 0 # per cache volume, 0 disables the caches
+        self.check_interval = 600
+        self._lock = threading.Lock()
+        self._workers = {} # Key: daemon base url, Value: maintenance thread
+        self._created = set() # (daemon base url, volume)
+        self._scanned_at = {} # Key: (daemon base url, volume), Value: timestamp of the last scan
+        self.sizes = {} # Key: (daemon base url, cache), Value: bytes
+        self.bytes_saved = 0
+        self.files_reused = 0
+        self.evicted_bytes = 0
+
+    def configure(self, limit_mb, check_interval=600):
+        self.limit_mb = limit_mb
+        self.check_interval = check_interval
+
+    def mounts(self, client, stack_type):
+        """
+        Returns (volumes, environment) for a new stack container: the stack's cache volumes
+        (created on first use) and the variables pointing the package managers at them.
+        """
+        volumes, environment = {}, {}
+        if not self.limit_mb:
+            return volumes, environment
+        for name in STACK_CACHES.get(stack_type, list(PACKAGE_CACHES)):
+            cache = PACKAGE_CACHES[name]
+            try:
+                self._ensure_volume(client, cache["volume"], name)
+            except Exception as e:
+                print(f"Package cache {name} unavailable: {e}")
+                continue
+            volumes[cache["volume"]] = {'bind': cache["path"], 'mode': 'rw'}
+            environment.update(cache["env"])
+        return volumes, environment
+
+    def _ensure_volume(self, client, volume, name):
+        key = (client.api.base_url, volume)
+        with self._lock:
+            if key in self._created:
+                return
+        existing = client.volumes.list(filters={"name": volume})
+        if not any(v.name == volume for v in existing):
+            client.volumes.create(name=volume, labels={CACHE_LABEL: name})
+        with self._lock:
+            self._created.add(key)
+
+    def start(self, client):
+        """Starts (once per process and daemon) the cache maintenance loop."""
+        with self._lock:
+            worker = self._workers.get(client.api.base_url)
+            if not self.limit_mb or (worker and worker.is_alive()):
+                return
+            worker = threading.Thread(target=self._run, args=(client,), daemon=True)
+            self._workers[client.api.base_url] = worker
+            worker.start()
+
+    def _run(self, client):
+        while True:
+            try:
+                self.check(client)
+            except Exception as e:
+                print(f"Package cache maintenance error: {e}")
+            time.sleep(self.check_interval)
+
+    def check(self, client):
+        limit_kb = self.limit_mb * 1024
+        for name, cache in PACKAGE_CACHES.items():
+            containers = client.containers.list(filters={"volume": cache["volume"], "status": "running"})
+            if not containers:
+                continue
+            key = (client.api.base_url, cache["volume"])
+            now = int(time.time())
+            since = self._scanned_at.get(key, now)
+            script = MAINTENANCE_SCRIPT.replace("__PATH__", cache["path"]).replace("__SINCE__", str(since)) \
+                .replace("__LIMIT__", str(limit_kb)).replace("__TARGET__", str(int(limit_kb * 0.8)))
+            exit_code, output = containers[0].exec_run(["nice", "-n", "19", "sh", "-c", script])
+            if exit_code != 0:
+                print(f"Package cache {name} maintenance failed: {output.decode('utf-8', errors='replace')[-500:]}")
+                continue
+            self._scanned_at[key] = now
+            self._record(client, name, output.decode('utf-8', errors='replace'))
+
+    def _record(self, client, name, output):
+        with self._lock:
+            for line in output.splitlines():
+                parts = line.split()
+                if parts[:1] == ["SIZE"]:
+                    self.sizes[(client.api.base_url, name)] = int(parts[1]) * 1024
+                elif parts[:1] == ["READ"]:
+                    self.files_reused += int(parts[1])
+                    self.bytes_saved += int(parts[2])
+                elif parts[:1] == ["EVICTED"]:
+                    self.evicted_bytes += int(parts[1])
+                    print(f"Package cache {name}: evicted {int(parts[1]) // (1024 * 1024)} MB on {client.api.base_url}")
+
+    def get_stats(self):
+        with self._lock:
+            return {
+                "enabled": bool(self.limit_mb),
+                "limit_mb": self.limit_mb,
+                "sizes": {f"{host} {name}": size for (host, name), size in self.sizes.items()},
+                "bytes_saved": self.bytes_saved,
+                "files_reused": self.files_reused,
+                "evicted_bytes": self.evicted_bytes
+            }
+
+package_caches = PackageCacheVolumes()
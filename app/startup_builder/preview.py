@@ -0,0 +1,121 @@
+import re
+from urllib.parse import quote, urlparse
+from flask import request, jsonify, redirect, Response
+import urllib3
+from . import preview_bp
+from .routes import manager
+from .gateway import preview_gateway
+
+# "<startup_id>" or "<startup_id>:<port>"
+TARGET_PATTERN = re.compile(r"^([\w-]+)(?::(\d{1,5}))?$")
+# Path of a page served through the gateway: /preview/<target>/...
+PREVIEW_PAGE_PATTERN = re.compile(r"^/preview/([\w-]+(?::\d{1,5})?)/")
+# Paths the rest of the app owns, never treated as assets of a previewed app
+RESERVED_PREFIXES = ("/api/", "/socket.io/", "/preview/")
+
+class _HandledResponse(Response):
+    """
+    Returned after a websocket tunnel has taken over the client socket, so the WSGI
+    server neither writes a response nor reuses the connection.
+    """
+    def __call__(self, environ, start_response):
+        if "eventlet.input" in environ:
+            try:
+                from eventlet.wsgi import WSGI_LOCAL
+                WSGI_LOCAL.already_handled = True
+                return []
+            except ImportError:
+                from eventlet.wsgi import ALREADY_HANDLED
+                return ALREADY_HANDLED
+        # werkzeug's dev server drops the connection on ConnectionError
+        raise ConnectionError()
+
+def _client_socket(environ):
+    if "eventlet.input" in environ:
+        return environ["eventlet.input"].get_socket()
+    return environ.get("werkzeug.socket")
+
+def _proxy(target, path):
+    match = TARGET_PATTERN.match(target)
+    if not match:
+        return jsonify({"error": "Invalid preview target"}), 400
+    startup_id, port = match.group(1), int(match.group(2)) if match.group(2) else None
+    prefix = f"/preview/{target}"
+    upstream_path = "/" + quote(path, safe="/:@!$&'()*+,;=~")
+    if request.query_string:
+        upstream_path += "?" + request.query_string.decode('latin-1')
+
+    if request.headers.get("Upgrade", "").lower() == "websocket":
+        return _tunnel(startup_id, port, upstream_path, prefix)
+
+    # Only a body that was never read can be sent again on the retry
+    body = request.stream if request.content_length or request.environ.get("wsgi.input_terminated") else None
+    for attempt in range(2):
+        route = manager.preview_route(startup_id, port, refresh=attempt > 0)
+        if "error" in route:
+            return jsonify(route), 502
+        try:
+            upstream = preview_gateway.request(
+                route, request.method, upstream_path,
+                preview_gateway.upstream_headers(request.environ, route, prefix), body
+            )
+            break
+        except (urllib3.exceptions.NewConnectionError, urllib3.exceptions.ConnectTimeoutError) as e:
+            # The cached address may be stale (container restarted, server moved ports)
+            preview_gateway.forget(startup_id=startup_id)
+            error = e
+        except urllib3.exceptions.HTTPError as e:
+            preview_gateway.forget(startup_id=startup_id)
+            preview_gateway.record_error()
+            return jsonify({"error": f"Preview upstream error: {e}"}), 502
+    else:
+        preview_gateway.record_error()
+        return jsonify({"error": f"App is not reachable on port {port or 'default'}: {error}"}), 502
+
+    return Response(
+        preview_gateway.stream(upstream), status=upstream.status,
+        headers=preview_gateway.response_headers(upstream, route, prefix), direct_passthrough=True
+    )
+
+def _tunnel(startup_id, port, upstream_path, prefix):
+    client_sock = _client_socket(request.environ)
+    if client_sock is None:
+        return jsonify({"error": "Websocket previews need the eventlet or werkzeug server"}), 501
+    route = manager.preview_route(startup_id, port)
+    if "error" in route:
+        return jsonify(route), 502
+    try:
+        preview_gateway.tunnel(client_sock, route, request.environ, upstream_path, prefix)
+    except OSError as e:
+        preview_gateway.forget(startup_id=startup_id)
+        preview_gateway.record_error()
+        return jsonify({"error": f"App is not reachable: {e}"}), 502
+    return _HandledResponse()
+
+@preview_bp.route('/<target>', methods=['GET', 'HEAD'])
+def preview_root(target):
+    # Relative asset URLs of the app only resolve below a trailing slash
+    query = "?" + request.query_string.decode('latin-1') if request.query_string else ""
+    return redirect(f"/preview/{target}/{query}", code=308)
+
+@preview_bp.route('/<target>/', defaults={'path': ''}, methods=['GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS'])
+@preview_bp.route('/<target>/<path:path>', methods=['GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS'])
+def preview(target, path):
+    """Proxies the request to the startup's running app: /preview/<startup_id>[:<port>]/<path>."""
+    return _proxy(target, path)
+
+@preview_bp.app_errorhandler(404)
+def preview_asset_fallback(e):
+    """
+    Apps reference assets and APIs by absolute path ("/static/js/main.js"), which lands
+    outside /preview. Such a request is proxied to the app only when no route of this
+    app matched it and it comes from a page of that app (a same-host Referer under
+    /preview/<target>/); every other 404, including those raised by views, is returned as is.
+    """
+    if request.url_rule is not None or request.path.startswith(RESERVED_PREFIXES):
+        return e
+    referer = urlparse(request.headers.get("Referer", ""))
+    match = PREVIEW_PAGE_PATTERN.match(referer.path)
+    if not match or referer.netloc != request.host:
+        return e
+    return _proxy(match.group(1), request.path.lstrip("/"))
@@ -0,0 +1,118 @@
+import re
+import threading
+import time
+
+# Ports the stacks' dev servers usually bind (React/Next, FastAPI/uvicorn, Flask, Jupyter)
+DEFAULT_PORTS = (3000, 8000, 5000, 8888)
+
+# Initial readiness timeouts per stack, before any boot time has been observed
+BASE_TIMEOUTS = {"MERN": 90, "NextJS": 120, "Python-Data": 45}
+DEFAULT_TIMEOUT = 60
+MIN_TIMEOUT = 15
+MAX_TIMEOUT = 300
+
+# Runs inside the container: reports as soon as a watched port is LISTENing, using
+# /proc/net/tcp{,6} instead of HTTP probes. Ports mentioned in app.log ("listening on
+# port 4000", "localhost:5173") are watched too, and a dead server PID fails fast.
+WATCH_SCRIPT = r'''
+ports=" __PORTS__ "
+deadline=$((SECONDS + __TIMEOUT__))
+while [ $SECONDS -lt $deadline ]; do
+  if [ -f app.log ]; then
+    for p in $(grep -oiE '(port|localhost:|0\.0\.0\.0:|127\.0\.0\.1:)[ :=]*[0-9]{4,5}' app.log | grep -oE '[0-9]{4,5}$'); do
+      case "$ports" in *" $p "*) ;; *) ports="$ports$p ";; esac
+    done
+  fi
+  for f in /proc/net/tcp /proc/net/tcp6; do
+    [ -r "$f" ] || continue
+    while read -r _ local _ st _; do
+      [ "$st" = "0A" ] || continue
+      port=$((16#${local##*:}))
+      case "$ports" in *" $port "*) echo "READY $port"; exit 0;; esac
+    done < <(tail -n +2 "$f")
+  done
+  if [ -f server.pid ]; then
+    # PID 1 (tail) never reaps, so an exited server lingers as a zombie
+    pid=$(cat server.pid)
+    if [ ! -f "/proc/$pid/status" ] || grep -q '^State:.*Z' "/proc/$pid/status"; then
+      echo "EXITED"; exit 2
+    fi
+  fi
+  sleep 0.2
+done
+echo "TIMEOUT"; exit 1
+'''
+
+class ServerReadiness:
+    """
+    Tracks server starts and waits for readiness with an adaptive per-stack timeout.
+    The timeout is three times the moving average of observed time-to-ready for the
+    stack, clamped to [MIN_TIMEOUT, MAX_TIMEOUT].
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._started = {} # Key: container id, Value: start timestamp
+        self._avg_ready = {} # Key: stack_type, Value: moving average of time-to-ready (seconds)
+        self._ports = {} # Key: container id, Value: port the server was last seen listening on
+        self.ready = 0
+        self.failed = 0
+
+    def mark_started(self, container_id):
+        with self._lock:
+            self._started[container_id] = time.time()
+
+    def port_for(self, container_id):
+        """Returns the port the container's server was last detected on, or None."""
+        with self._lock:
+            return self._ports.get(container_id)
+
+    def timeout_for(self, stack_type):
+        with self._lock:
+            avg = self._avg_ready.get(stack_type)
+        if avg is None:
+            return BASE_TIMEOUTS.get(stack_type, DEFAULT_TIMEOUT)
+        return int(min(MAX_TIMEOUT, max(MIN_TIMEOUT, avg * 3)))
+
+    def wait(self, run_command, container_id, stack_type, timeout=None, ports=DEFAULT_PORTS):
+        """
+        Blocks until the server in the container listens on a watched port.
+        run_command: callable(command, timeout) -> {"exit_code", "output"}
+        Returns: {"ready": bool, "port", "time_to_ready", "reason"}
+        """
+        timeout = timeout or self.timeout_for(stack_type)
+        script = WATCH_SCRIPT.replace("__PORTS__", " ".join(str(p) for p in ports)).replace("__TIMEOUT__", str(timeout))
+        result = run_command(script, timeout + 10)
+
+        with self._lock:
+            started = self._started.get(container_id, time.time())
+        elapsed = round(time.time() - started, 2)
+        output = result.get("output", "") or result.get("error", "")
+
+        match = re.search(r"READY (\d+)", output)
+        if match:
+            with self._lock:
+                self.ready += 1
+                avg = self._avg_ready.get(stack_type)
+                self._avg_ready[stack_type] = elapsed if avg is None else 0.7 * avg + 0.3 * elapsed
+                self._ports[container_id] = int(match.group(1))
+            return {"ready": True, "port": int(match.group(1)), "time_to_ready": elapsed, "reason": "listening"}
+
+        with self._lock:
+            self.failed += 1
+        if "EXITED" in output:
+            reason = "server process exited"
+        elif "TIMEOUT" in output:
+            reason = f"no watched port listening after {timeout}s"
+        else:
+            reason = output.strip() or "readiness check failed"
+        return {"ready": False, "port": None, "time_to_ready": None, "reason": reason}
+
+    def get_stats(self):
+        with self._lock:
+            return {
+                "ready": self.ready,
+                "failed": self.failed,
+                "avg_time_to_ready": {stack: round(avg, 2) for stack, avg in self._avg_ready.items()}
+            }
+
+server_readiness = ServerReadiness()
@@ -0,0 +1,150 @@
+import re
+import shlex
+import threading
+
+# Same keywords the reviewer prompt tells the LLM to scan for, plus the runtime errors the
+# reviewer has always treated as failures despite exit code 0
+ERROR_KEYWORDS = ["error", "failed", "exception", "externally-managed-environment", "command not found",
+                  "npm error", "fatal", "typeerror", "syntaxerror", "referenceerror", "error:"]
+# Warnings alone do not make a step fail ("npm warn deprecated ...")
+WARNING_LINE = re.compile(r"^\s*(npm warn|npm WARN|warning:|WARNING:|DEPRECATION:)", re.IGNORECASE)
+
+# Commands that print nothing on success
+SILENT_TOOLS = {"mkdir", "touch", "cp", "mv", "rm", "chmod", "ln", "echo", "true"}
+
+# Output that proves a tool succeeded, per tool
+SUCCESS_SIGNATURES = {
+    "npm": [r"^added \d+ packages?", r"^up to date", r"^removed \d+ packages?", r"^changed \d+ packages?",
+            r"found 0 vulnerabilities"],
+    "pip": [r"^Successfully installed ", r"^Requirement already satisfied: "],
+    "git": [r"^\[[\w./-]+( \(root-commit\))? [0-9a-f]{7,}\] ", r"^Initialized empty Git repository",
+            r"^Reinitialized existing Git repository", r"^nothing to commit, working tree clean",
+            r"^Switched to (a new )?branch "]
+}
+
+# Non-zero exits that only mean the work was already done: (pattern, reason)
+IDEMPOTENT_FAILURES = [
+    (r"mkdir: cannot create directory .*: File exists", "Directory already exists"),
+    (r"^nothing to commit, working tree clean", "Nothing left to commit")
+]
+
+# Non-zero exits whose cause is unambiguous: (pattern, category)
+CLEAR_FAILURES = [
+    (r"command not found|: not found$", "INFRASTRUCTURE"),
+    (r"externally-managed-environment", "INFRASTRUCTURE"),
+    (r"\b(SyntaxError|TypeError|ReferenceError|IndentationError|NameError)\b", "LOGIC_SYNTAX"),
+    (r"^Traceback \(most recent call last\)", "LOGIC_SYNTAX")
+]
+
+def _tool(command):
+    """The program a command runs: "npm" for "cd web && npm install", None if it cannot be parsed."""
+    try:
+        lexer = shlex.shlex(command or "", posix=True, punctuation_chars=True)
+        lexer.whitespace_split = True
+        words = list(lexer)
+    except ValueError:
+        return None
+    # The last && / ; / | segment decides the exit code ("npm test | tee log" exits with tee's)
+    segment = []
+    for word in words:
+        segment = [] if word in ("&&", ";", "||", "|", "|&", "&") else segment + [word]
+    while segment and "=" in segment[0] and not segment[0].startswith("="):
+        segment = segment[1:] # VAR=value prefixes
+    if segment and segment[0] in ("sudo", "npx", "python", "python3") and len(segment) > 1:
+        if segment[0].startswith("python") and segment[1] == "-m" and len(segment) > 2:
+            return segment[2]
+        if segment[0] in ("sudo", "npx"):
+            return segment[1]
+    if segment and segment[0] in ("pip3", "yarn", "pnpm"):
+        return {"pip3": "pip", "yarn": "npm", "pnpm": "npm"}[segment[0]]
+    return segment[0] if segment else None
+
+class ReviewRules:
+    """
+    Deterministic verdicts on executed steps, tried before the LLM reviewer.
+    evaluate() settles clear-cut outcomes (a verified write, a clean install, an idempotent
+    mkdir, a missing command) and returns None for anything ambiguous, which goes to the
+    LLM. Counts how often each rule fires and how many steps were escalated.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.rules = {} # Key: rule name, Value: times it decided a step
+        self.escalated = 0
+
+    def evaluate(self, step, result, verified_files=False):
+        """
+        step: the plan step; result: the executor's last_result; verified_files: the written
+        files' checksums were re-read and matched.
+        Returns {"status": "success" | "failed", "reason", "category", "rule"} or None to escalate.
+        """
+        verdict = self._evaluate(step, result, verified_files)
+        with self._lock:
+            if verdict:
+                self.rules[verdict["rule"]] = self.rules.get(verdict["rule"], 0) + 1
+            else:
+                self.escalated += 1
+        return verdict
+
+    def _evaluate(self, step, result, verified_files):
+        if step.get("action") == "write_file":
+            if verified_files and not result.get("linter_errors"):
+                return self._success("checksum_verified", "Written file checksums verified")
+            return None
+
+        if step.get("action") != "command":
+            return None
+        output = result.get("output", "") or result.get("error", "")
+        exit_code = result.get("exit_code", 0)
+        tool = _tool(step.get("command"))
+
+        if result.get("error") and exit_code == 0 and not result.get("output"):
+            return None # The command never ran (container down): not a verdict on the step
+        if output == "Command started in background.":
+            return self._success("background_start", "Background command started")
+
+        if exit_code != 0:
+            for pattern, reason in IDEMPOTENT_FAILURES:
+                if re.search(pattern, output, re.MULTILINE):
+                    return self._success("idempotent", reason)
+            if exit_code == 127:
+                return self._failure("command_not_found", f"{tool or 'Command'} not found (exit 127)", "INFRASTRUCTURE")
+            for pattern, category in CLEAR_FAILURES:
+                match = re.search(pattern, output, re.MULTILINE)
+                if match:
+                    return self._failure("error_signature", f"{match.group(0).strip()} (exit {exit_code})", category)
+            return None
+
+        # Exit code 0: succeed only when nothing in the output contradicts it
+        meaningful = [line for line in output.splitlines() if line.strip() and not WARNING_LINE.match(line)]
+        text = "\n".join(meaningful).lower()
+        if any(keyword in text for keyword in ERROR_KEYWORDS):
+            return None # pip and npm exit 0 on some failures; let the LLM weigh the context
+        if not meaningful and tool in SILENT_TOOLS:
+            return self._success(f"{tool}_silent", f"{tool} completed without output")
+        for pattern in SUCCESS_SIGNATURES.get(tool, []):
+            if re.search(pattern, output, re.MULTILINE):
+                return self._success(f"{tool}_signature", f"{tool} reported success")
+        if tool == "git" and not meaningful:
+            return self._success("git_silent", "git completed without output")
+        return None
+
+    @staticmethod
+    def _success(rule, reason):
+        return {"status": "success", "reason": reason, "category": None, "rule": rule}
+
+    @staticmethod
+    def _failure(rule, reason, category):
+        return {"status": "failed", "reason": reason, "category": category, "rule": rule}
+
+    def get_stats(self):
+        with self._lock:
+            decided = sum(self.rules.values())
+            total = decided + self.escalated
+            return {
+                "rules": dict(self.rules),
+                "decided": decided,
+                "escalated": self.escalated,
+                "fast_path_rate": round(decided / total, 3) if total else 0.0
+            }
+
+review_rules = ReviewRules()
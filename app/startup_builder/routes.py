@@ -4,6 +4,8 @@ from . import builder_bp
 from .manager import DockerManager
 from .graph import create_graph
 from .agent import MultiAgentSystem
+from .admission import admission, stack_resources, AGENT_RESOURCES, NO_RESOURCES
+from .taskscheduler import task_scheduler
 
 manager = DockerManager()
 agent = MultiAgentSystem()
@@ -20,13 +22,26 @@ graph = create_graph(
     agent.strategist_node, # New Node
     agent.overseer_node,
     agent.tester_node,
-    agent.test_gen_node
+    agent.test_gen_node,
+    task_workers_node=agent.task_workers_node
 )
 
 import threading
 
 building_tasks = {}
 
+def queue_notifier(startup_id, kind):
+    """Returns an admission notify callback that reports queue position to the startup's room."""
+    def notify(position, queue_length):
+        from app.extensions import socketio
+        socketio.emit('queue_position', {
+            'startup_id': startup_id,
+            'kind': kind,
+            'position': position, # 0 once admitted
+            'queue_length': queue_length
+        }, room=f"startup_{startup_id}", namespace='/builder')
+    return notify
+
 @builder_bp.route('/<startup_id>/start', methods=['POST'])
 def start_env(startup_id):
     from app.models import Startup
@@ -48,7 +63,7 @@ def start_env(startup_id):
     # Check if already running (fast check)
     if startup.container_name:
         try:
-            container = manager.client.containers.get(startup.container_name)
+            container = manager.client_for(docker_host=startup.docker_host).containers.get(startup.container_name)
             if container.status == 'running':
                 container.reload()
                 ports = container.attrs['NetworkSettings']['Ports']
@@ -90,8 +105,26 @@ def start_env(startup_id):
                     }, room=room, namespace='/builder')
                     return
                 
-                print(f"Starting async build for {startup_id}")
-                result = manager.ensure_container(startup_id, stack_type=stack_type, container_name=startup_obj.container_name)
+                # Wait for host capacity; the container itself is capped by the stack's cgroup limits
+                ticket = admission.acquire(manager.daemons.clients(), "build", startup_id, stack_resources(stack_type),
+                                           notify=queue_notifier(startup_id, "build"))
+                if ticket is None:
+                    socketio.emit('build_failed', {
+                        'startup_id': startup_id,
+                        'error': 'Timed out waiting for host capacity; try again later'
+                    }, room=room, namespace='/builder')
+                    return
+                try:
+                    print(f"Starting async build for {startup_id}")
+                    result = manager.ensure_container(
+                        startup_id,
+                        stack_type=stack_type,
+                        container_name=startup_obj.container_name,
+                        volume_name=startup_obj.workspace_volume,
+                        docker_host=startup_obj.docker_host
+                    )
+                finally:
+                    admission.release(ticket)
                 
                 # Check for errors
                 if result.get("error"):
@@ -108,8 +141,22 @@ def start_env(startup_id):
                     db.session.commit()
                     print(f"Saved container name {result['container_name']} to database")
                 
+                # Placement is sticky: the workspace volume lives on that daemon
+                if result.get("docker_host") and result["docker_host"] != startup_obj.docker_host:
+                    startup_obj.docker_host = result["docker_host"]
+                    db.session.commit()
+                
+                # A claimed warm pool container brings its own workspace volume
+                if result.get("volume_name") and result["volume_name"] != startup_obj.workspace_volume:
+                    startup_obj.workspace_volume = result["volume_name"]
+                    db.session.commit()
+                
                 print(f"Async build finished for {startup_id}")
                 
+                # Subscribed clients get file changes pushed from now on
+                from .sockets import file_change_notifier
+                manager.watch_changes(startup_id, notify=file_change_notifier(startup_id))
+                
                 # Emit build complete event
                 socketio.emit('build_complete', {
                     'startup_id': startup_id,
@@ -145,7 +192,7 @@ def env_status(startup_id):
         return jsonify({"status": "stopped"})
     
     try:
-        container = manager.client.containers.get(startup.container_name)
+        container = manager.client_for(docker_host=startup.docker_host).containers.get(startup.container_name)
         if container.status == 'running':
             ports = container.attrs['NetworkSettings']['Ports']
             return jsonify({"status": "running", "container_id": container.id, "ports": ports})
@@ -165,7 +212,7 @@ def stop_env(startup_id):
     
     # Stop and remove the container
     if startup.container_name:
-        result = manager.cleanup_container(startup.container_name)
+        result = manager.cleanup_container(startup.container_name, docker_host=startup.docker_host)
         # Clear container_name from database
         startup.container_name = None
         db.session.commit()
@@ -341,6 +388,27 @@ def run_agent_bg(startup_id, initial_state, yolo, feature_id=None):
     app = current_app._get_current_object()
     
     def task():
+        # Agent runs beyond host capacity wait here, reporting their queue position.
+        # A workspace that is already running has its resources committed; its run adds nothing
+        with app.app_context():
+            running = manager.workspace_running(startup_id)
+        ticket = admission.acquire(manager.daemons.clients(), "agent", startup_id,
+                                   NO_RESOURCES if running else AGENT_RESOURCES,
+                                   notify=queue_notifier(startup_id, "agent"))
+        if ticket is None:
+            from app.extensions import socketio
+            socketio.emit('agent_update', {
+                'task_status': 'failed',
+                'logs': ["System Error: Timed out waiting for host capacity; try again later."]
+            }, room=f"startup_{startup_id}", namespace='/builder')
+            return
+        try:
+            run_graph()
+        finally:
+            task_scheduler.detach(startup_id)
+            admission.release(ticket)
+
+    def run_graph():
         with app.app_context():
             config = {"configurable": {"thread_id": startup_id}, "recursion_limit": 100}
             
@@ -357,6 +425,23 @@ def run_agent_bg(startup_id, initial_state, yolo, feature_id=None):
             state_tracker.update(initial_state)
             current_input = initial_state
             final_state = None
+
+            def task_progress(progress):
+                # Parallel task workers report from inside a single graph step
+                from app.extensions import socketio
+                socketio.emit('agent_update', {
+                    'logs': state_tracker.get("logs", []) + progress["logs"],
+                    'plan': [],
+                    'task_status': 'parallel_tasks',
+                    'total_tasks': state_tracker.get("total_tasks", 0),
+                    'completed_tasks': progress["completed_tasks"],
+                    'running_tasks': progress["running_tasks"],
+                    'current_step': {},
+                    'waiting_approval': False
+                }, room=f"startup_{startup_id}", namespace='/builder')
+
+            # Tasks only run in parallel workers when no step waits for approval
+            task_scheduler.attach(startup_id, notify=task_progress, parallel=yolo)
             
             try:
                 while True:
@@ -439,9 +524,20 @@ def get_logs(startup_id):
 
 @builder_bp.route('/<startup_id>/files', methods=['GET'])
 def list_files(startup_id):
+    """Lists a directory, or the whole subtree with ?recursive=1. Supports If-None-Match."""
     path = request.args.get('path', '.')
-    result = manager.list_files(startup_id, path)
-    return jsonify(result)
+    if request.args.get('recursive') in ('1', 'true'):
+        result = manager.file_tree(startup_id, path)
+    else:
+        result = manager.list_files(startup_id, path)
+
+    etag = result.get("etag")
+    if etag and request.if_none_match.contains(etag):
+        return '', 304
+    response = jsonify(result)
+    if etag:
+        response.set_etag(etag)
+    return response
 
 @builder_bp.route('/<startup_id>/files/content', methods=['GET'])
 def read_file(startup_id):
@@ -451,9 +547,49 @@ def read_file(startup_id):
     result = manager.read_file(startup_id, path)
     return jsonify(result)
 
+@builder_bp.route('/<startup_id>/snapshots', methods=['GET'])
+def list_snapshots(startup_id):
+    return jsonify(manager.list_snapshots(startup_id))
+
+@builder_bp.route('/<startup_id>/snapshots', methods=['POST'])
+def create_snapshot(startup_id):
+    label = (request.json or {}).get('label', '')
+    result = manager.snapshot_workspace(startup_id, label=label)
+    return jsonify(result)
+
+@builder_bp.route('/<startup_id>/snapshots/<snapshot_id>/restore', methods=['POST'])
+def restore_snapshot(startup_id, snapshot_id):
+    result = manager.restore_snapshot(startup_id, snapshot_id)
+    return jsonify(result)
+
+@builder_bp.route('/<startup_id>/clone', methods=['POST'])
+def clone_workspace(startup_id):
+    """Copies this startup's workspace (or one of its snapshots) into another startup's running container."""
+    data = request.json or {}
+    target_startup_id = data.get('target_startup_id')
+    if not target_startup_id:
+        return jsonify({'error': 'target_startup_id required'}), 400
+    result = manager.clone_workspace(startup_id, target_startup_id, snapshot_id=data.get('snapshot_id'))
+    return jsonify(result)
+
+@builder_bp.route('/<startup_id>/checkpoints', methods=['GET'])
+def list_checkpoints(startup_id):
+    return jsonify(manager.list_checkpoints(startup_id))
+
+@builder_bp.route('/<startup_id>/rollback', methods=['POST'])
+def rollback_workspace(startup_id):
+    """Resets the workspace to a git checkpoint, by "commit" or by "step_id" (and optional "task")."""
+    data = request.json or {}
+    if not data.get('commit') and data.get('step_id') is None:
+        return jsonify({'error': 'commit or step_id required'}), 400
+    result = manager.rollback_workspace(startup_id, commit=data.get('commit'), step_id=data.get('step_id'), task=data.get('task'))
+    return jsonify(result)
+
 @builder_bp.route('/<startup_id>/container-logs', methods=['GET'])
 def get_container_logs(startup_id):
-    result = manager.get_container_logs(startup_id)
+    """Returns container output; with ?offset=<offset from the last response> only what is new."""
+    offset = request.args.get('offset', type=int)
+    result = manager.get_container_logs(startup_id, offset=offset)
     return jsonify(result)
 
 @builder_bp.route('/<startup_id>/reset', methods=['POST'])
@@ -485,3 +621,10 @@ def reset_agent(startup_id):
         return jsonify({"status": "success", "message": "Agent memory reset."})
     except Exception as e:
         return jsonify({"status": "error", "error": str(e)})
+
+@builder_bp.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Returns builder cache and resource statistics, including the agent's."""
+    stats = manager.get_stats()
+    stats.update(agent.get_stats())
+    return jsonify(stats)
@@ -0,0 +1,348 @@
+import base64
+import socket
+import struct
+import threading
+import time
+import uuid
+
+# Default limits for commands run through a shell session
+SHELL_COMMAND_TIMEOUT = 600 # seconds from the moment the command starts; npm installs and scaffolding can take minutes
+SHELL_QUEUE_TIMEOUT = None # seconds a command may wait behind earlier ones before it is cancelled; None waits
+SHELL_MAX_OUTPUT = 1024 * 1024 # bytes kept per command, the rest is dropped
+
+TIMEOUT_EXIT_CODE = 124 # Same as coreutils `timeout`
+
+class ShellSessionError(Exception):
+    pass
+
+def _recv_exact(sock, size):
+    data = b""
+    while len(data) < size:
+        chunk = sock.read(size - len(data)) if hasattr(sock, 'read') else sock.recv(size - len(data))
+        if not chunk:
+            return None
+        data += chunk
+    return data
+
+def iter_exec_frames(sock):
+    """
+    Yields (stream, payload) from a hijacked non-TTY exec socket until it closes.
+    Non-TTY exec streams are multiplexed: 8-byte header (stream type, size) + payload;
+    stream is 1 for stdout and 2 for stderr.
+    """
+    while True:
+        header = _recv_exact(sock, 8)
+        if not header:
+            return
+        payload = _recv_exact(sock, struct.unpack('>I', header[4:])[0])
+        if payload is None:
+            return
+        yield header[0], payload
+
+def send_exec_input(sock, data):
+    """Writes to the stdin of a hijacked exec socket."""
+    sock = getattr(sock, '_sock', sock)
+    if hasattr(sock, 'sendall'):
+        sock.sendall(data)
+    else:
+        sock.write(data)
+        sock.flush()
+
+class _PendingCommand:
+    def __init__(self, line, marker, max_output):
+        self.line = line
+        self.marker = marker
+        self.max_output = max_output
+        self.output = bytearray()
+        self.truncated = False
+        self.exit_code = None
+        self.sent = False # Written to bash: only then can it have run
+        self.started_at = None
+        self.started = threading.Event() # Set once sent, or when the session closes before that
+        self.done = threading.Event()
+
+    def append(self, data):
+        room = self.max_output - len(self.output)
+        if len(data) > room:
+            self.truncated = True
+            data = data[:max(room, 0)]
+        self.output += data
+
+class ShellSession:
+    """
+    A long-lived bash process inside a container, driven over one hijacked exec socket.
+    Each command is framed with a unique completion marker carrying its exit code.
+    Commands run in a subshell rooted at /app with stdin from /dev/null, matching the
+    semantics of a fresh `exec_run` while skipping exec create/start per command.
+    Callers may submit at any time; commands queue here and each is written to bash only
+    once the one before it has completed, so a command's timeout counts from its own start
+    and a command still waiting in the queue can be cancelled without touching the session.
+    """
+    def __init__(self, client, container):
+        self.client = client
+        self.container = container
+        self._send_lock = threading.Lock()
+        self._pending = [] # FIFO of _PendingCommand; only the first one has been written to bash
+        self._pending_lock = threading.Lock()
+        self._window = b""
+        self.alive = False
+        self.pgid = None
+
+        # setsid gives the shell its own process group so a timed-out command can be killed with it
+        exec_id = client.api.exec_create(
+            container.id,
+            cmd=["setsid", "-w", "bash", "--noprofile", "--norc"],
+            stdin=True,
+            tty=False,
+            workdir="/app"
+        )['Id']
+        self._sock = client.api.exec_start(exec_id, detach=False, tty=False, socket=True)
+        self.alive = True
+        self._reader = threading.Thread(target=self._read_loop, daemon=True)
+        self._reader.start()
+
+        result = self.run("echo $$", timeout=10)
+        if result["exit_code"] != 0:
+            self.close()
+            raise ShellSessionError(f"Shell session failed to start: {result['output']}")
+        self.pgid = result["output"].strip()
+
+    def _read_loop(self):
+        try:
+            for _, payload in iter_exec_frames(self._sock):
+                self._feed(payload)
+        except Exception as e:
+            print(f"Shell session read error: {e}")
+        finally:
+            self.alive = False
+            self._release_pending()
+
+    def _release_pending(self):
+        """Wakes the waiters of every queued command once the session is gone."""
+        with self._pending_lock:
+            pending, self._pending = self._pending, []
+        for command in pending:
+            command.started.set()
+            command.done.set()
+
+    def _feed(self, data):
+        self._window += data
+        while True:
+            with self._pending_lock:
+                command = self._pending[0] if self._pending else None
+            if command is None:
+                self._window = b""
+                return
+
+            idx = self._window.find(command.marker)
+            if idx == -1:
+                # Keep enough bytes to match a marker split across frames
+                keep = len(command.marker) + 16
+                if len(self._window) > keep:
+                    command.append(self._window[:-keep])
+                    self._window = self._window[-keep:]
+                return
+
+            end = self._window.find(b"\n", idx + len(command.marker))
+            if end == -1:
+                return
+            command.append(self._window[:idx])
+            try:
+                command.exit_code = int(self._window[idx + len(command.marker):end])
+            except ValueError:
+                command.exit_code = 1
+            self._window = self._window[end + 1:]
+            with self._pending_lock:
+                self._pending.pop(0)
+                following = self._pending[0] if self._pending else None
+            command.done.set()
+            if following is not None:
+                self._send(following)
+
+    def _send(self, pending):
+        """Writes the command at the head of the queue to bash, which starts its timeout."""
+        try:
+            with self._send_lock:
+                pending.started_at = time.time()
+                pending.sent = True
+                send_exec_input(self._sock, pending.line)
+        except OSError as e:
+            print(f"Shell session write error: {e}")
+            pending.sent = False
+            self.close()
+        finally:
+            pending.started.set()
+
+    def submit(self, command, max_output=SHELL_MAX_OUTPUT):
+        """Queues a command without waiting for it. Returns a handle for wait()."""
+        if not self.alive:
+            raise ShellSessionError("Shell session is closed")
+        marker = f"__SHELL_DONE_{uuid.uuid4().hex}__:"
+        encoded = base64.b64encode(command.encode('utf-8')).decode('ascii')
+        # Base64 keeps arbitrary quoting intact; a syntax error fails the command, not the session
+        line = (
+            f"( cd /app && eval \"$(printf %s {encoded} | base64 -d)\" ) < /dev/null 2>&1; "
+            f"printf '\\n{marker}%s\\n' \"$?\"\n"
+        )
+        pending = _PendingCommand(line.encode('utf-8'), f"\n{marker}".encode('utf-8'), max_output)
+        with self._pending_lock:
+            self._pending.append(pending)
+            first = len(self._pending) == 1
+        if first:
+            self._send(pending)
+            if not pending.sent:
+                raise ShellSessionError("Shell session is closed")
+        return pending
+
+    def cancel(self, pending):
+        """Drops a command that has not started yet. Returns False if it already started."""
+        with self._pending_lock:
+            if pending.sent or pending not in self._pending:
+                return False
+            self._pending.remove(pending)
+        pending.started.set()
+        pending.done.set()
+        return True
+
+    def wait(self, pending, timeout=SHELL_COMMAND_TIMEOUT, queue_timeout=SHELL_QUEUE_TIMEOUT):
+        """
+        Waits for a submitted command. timeout counts from the moment the command starts;
+        once it runs out the session is killed and must be replaced. A command still queued
+        after queue_timeout is cancelled instead, leaving the session and the command
+        ahead of it alone.
+        """
+        if not pending.started.wait(queue_timeout) and self.cancel(pending):
+            return {"exit_code": TIMEOUT_EXIT_CODE, "output": f"[Command cancelled after waiting {queue_timeout}s for earlier commands]"}
+        pending.started.wait()
+        if not pending.sent:
+            raise ShellSessionError("Shell session closed before the command started")
+
+        finished = pending.done.wait(max(pending.started_at + timeout - time.time(), 0))
+        output = pending.output.decode('utf-8', errors='replace')
+        if pending.truncated:
+            output += f"\n[Output truncated at {pending.max_output} bytes]"
+
+        if not finished:
+            self.kill()
+            return {"exit_code": TIMEOUT_EXIT_CODE, "output": output + f"\n[Command timed out after {timeout}s]"}
+        if pending.exit_code is None:
+            raise ShellSessionError("Shell session closed before the command finished")
+        return {"exit_code": pending.exit_code, "output": output}
+
+    def run(self, command, timeout=SHELL_COMMAND_TIMEOUT, max_output=SHELL_MAX_OUTPUT):
+        return self.wait(self.submit(command, max_output=max_output), timeout=timeout)
+
+    def kill(self):
+        """
+        Kills the shell's whole process group (including a hung command) and closes the socket.
+        Commands queued behind it were never written to bash; ShellSessionPool.run re-submits them.
+        """
+        if self.pgid:
+            try:
+                # bash's builtin kill: slim images don't ship procps
+                self.container.exec_run(["bash", "-c", f"kill -KILL -- -{self.pgid}"])
+            except Exception as e:
+                print(f"Error killing shell session {self.pgid}: {e}")
+        self.close()
+
+    def close(self):
+        self.alive = False
+        try:
+            # shutdown() wakes the reader blocked in recv; close() alone does not
+            getattr(self._sock, '_sock', self._sock).shutdown(socket.SHUT_RDWR)
+        except Exception:
+            pass
+        try:
+            self._sock.close()
+        except Exception:
+            pass
+        self._release_pending()
+
+class ShellSessionPool:
+    """
+    Process-wide map of (container id, lane) -> ShellSession, re-spawning dead sessions on demand.
+    The default lane (None) is the container's session; parallel task workers each run on a
+    lane of their own, so they neither queue behind each other nor share a timeout kill.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._sessions = {} # Key: (container id, lane), Value: ShellSession
+        self._spawn_locks = {}
+        self.spawned = 0
+        self.commands = 0
+        self.requeued = 0 # commands re-submitted after the session ahead of them was killed
+
+    def get(self, client, container, lane=None):
+        key = (container.id, lane)
+        with self._lock:
+            session = self._sessions.get(key)
+            if session and session.alive:
+                return session
+            spawn_lock = self._spawn_locks.setdefault(key, threading.Lock())
+
+        with spawn_lock:
+            with self._lock:
+                session = self._sessions.get(key)
+                if session and session.alive:
+                    return session
+            session = ShellSession(client, container)
+            with self._lock:
+                self._sessions[key] = session
+                self.spawned += 1
+            return session
+
+    def run(self, client, container, command, timeout=SHELL_COMMAND_TIMEOUT, max_output=SHELL_MAX_OUTPUT,
+            queue_timeout=SHELL_QUEUE_TIMEOUT, lane=None):
+        """
+        Runs a command on the container's session (or the given lane's), re-spawning the session if it died.
+        Only commands bash never received are retried, so a command is never executed twice:
+        a failed submit, or a command queued behind one whose timeout killed the session.
+        """
+        with self._lock:
+            self.commands += 1
+        session = self.get(client, container, lane)
+        try:
+            pending = session.submit(command, max_output=max_output)
+        except (ShellSessionError, OSError):
+            session.close()
+            session = self.get(client, container, lane)
+            pending = session.submit(command, max_output=max_output)
+        try:
+            return session.wait(pending, timeout=timeout, queue_timeout=queue_timeout)
+        except ShellSessionError:
+            if pending.sent:
+                raise
+            with self._lock:
+                self.requeued += 1
+            session = self.get(client, container, lane)
+            return session.wait(session.submit(command, max_output=max_output), timeout=timeout, queue_timeout=queue_timeout)
+
+    def close(self, container_id):
+        """Closes every session of the container, on all lanes."""
+        with self._lock:
+            keys = [key for key in self._sessions if key[0] == container_id]
+            sessions = [self._sessions.pop(key) for key in keys]
+            for key in list(self._spawn_locks):
+                if key[0] == container_id:
+                    self._spawn_locks.pop(key)
+        for session in sessions:
+            session.close()
+
+    def close_lane(self, container_id, lane):
+        with self._lock:
+            session = self._sessions.pop((container_id, lane), None)
+            self._spawn_locks.pop((container_id, lane), None)
+        if session:
+            session.close()
+
+    def get_stats(self):
+        with self._lock:
+            return {
+                "sessions": sum(1 for s in self._sessions.values() if s.alive),
+                "lane_sessions": sum(1 for (_, lane), s in self._sessions.items() if lane is not None and s.alive),
+                "spawned": self.spawned,
+                "commands": self.commands,
+                "requeued": self.requeued
+            }
+
+shell_sessions = ShellSessionPool()
@@ -0,0 +1,352 @@
+import hashlib
+import json
+import os
+import queue
+import shutil
+import tarfile
+import tempfile
+import threading
+import time
+import uuid
+import zstandard
+
+CHUNK_SIZE = 4 * 1024 * 1024 # files are split into chunks of at most this many bytes
+ZSTD_LEVEL = 3
+# Chunks younger than this are never garbage collected: a snapshot being taken may
+# reference them before its manifest is written
+GC_GRACE = 3600 # seconds
+# Garbage collection runs in the background, at most this often and only once a snapshot was dropped
+GC_INTERVAL = 600 # seconds
+# Longest a load() waits for a snapshot still being written in the background
+PENDING_WAIT = 300 # seconds
+
+_TAR_TYPES = {
+    tarfile.REGTYPE: "file", tarfile.AREGTYPE: "file", tarfile.DIRTYPE: "directory",
+    tarfile.SYMTYPE: "symlink", tarfile.LNKTYPE: "hardlink"
+}
+_TAR_TYPE_CODES = {"file": tarfile.REGTYPE, "directory": tarfile.DIRTYPE, "symlink": tarfile.SYMTYPE, "hardlink": tarfile.LNKTYPE}
+
+class WorkspaceSnapshots:
+    """
+    Content-addressed snapshots of workspace volumes on local storage.
+    A snapshot is a manifest of the tar entries of /app. File contents are split into
+    chunks stored once under chunks/<sha256[:2]>/<sha256>.zst (zstd), so consecutive
+    snapshots of a workspace only store the files that changed. Restores rebuild a tar
+    stream from the manifest; restore_plan() lets callers send only what differs from
+    the live workspace.
+    submit() takes a captured archive and chunks it on a background worker, which also
+    collects garbage, so automatic snapshots cost their callers only the capture.
+    """
+    def __init__(self):
+        self.directory = os.path.join(tempfile.gettempdir(), "startup_builder_snapshots")
+        self.keep = 20 # automatic snapshots kept per startup, 0 keeps all
+        self._lock = threading.Lock()
+        self._jobs = queue.Queue() # (startup_id, spooled archive, label, auto, snapshot_id, created_at)
+        self._pending = {} # Key: snapshot_id, Value: threading.Event set once written (or failed)
+        self._worker = None
+        self._gc_due = False
+        self._last_gc = 0
+        self.snapshots_taken = 0
+        self.background_failures = 0
+        self.gc_runs = 0
+        self.gc_removed = 0
+        self.restores = 0
+        self.logical_bytes = 0 # bytes seen by snapshots
+        self.stored_bytes = 0 # compressed bytes of new chunks written
+        self.last_snapshot_seconds = None
+        self.last_restore_seconds = None
+
+    def configure(self, directory=None, keep=20):
+        if directory:
+            self.directory = directory
+        self.keep = keep
+
+    def _chunk_path(self, digest):
+        return os.path.join(self.directory, "chunks", digest[:2], digest + ".zst")
+
+    def _manifest_dir(self, startup_id):
+        return os.path.join(self.directory, "manifests", str(startup_id))
+
+    def _manifest_path(self, startup_id, snapshot_id):
+        return os.path.join(self._manifest_dir(startup_id), f"{snapshot_id}.json")
+
+    def _store_chunk(self, data, compressor):
+        """Stores data under its sha256 unless already present. Returns (digest, compressed bytes written)."""
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._chunk_path(digest)
+        if os.path.exists(path):
+            # Refresh the mtime so a concurrent garbage collection spares it
+            os.utime(path)
+            return digest, 0
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        compressed = compressor.compress(data)
+        partial = f"{path}.{uuid.uuid4().hex[:8]}.partial"
+        with open(partial, "wb") as f:
+            f.write(compressed)
+        os.replace(partial, path)
+        return digest, len(compressed)
+
+    @staticmethod
+    def _new_id(now):
+        # Sortable by creation time, down to the millisecond
+        return time.strftime("%Y%m%d-%H%M%S", time.gmtime(now)) + f"{int(now * 1000) % 1000:03d}-" + uuid.uuid4().hex[:6]
+
+    def create(self, startup_id, fileobj, label="", auto=False, snapshot_id=None, created_at=None):
+        """
+        Snapshots the tar archive read (streamed) from fileobj, e.g. get_archive("/app").
+        Returns the manifest summary: {"snapshot_id", "label", "auto", "created_at", "files", "size", "stored_bytes"}
+        """
+        started = time.time()
+        compressor = zstandard.ZstdCompressor(level=ZSTD_LEVEL)
+        entries = []
+        size = 0
+        stored = 0
+        with tarfile.open(fileobj=fileobj, mode='r|') as tar:
+            for member in tar:
+                kind = _TAR_TYPES.get(member.type)
+                if kind is None:
+                    continue # devices and fifos have no place in a workspace
+                entry = {
+                    "name": member.name, "type": kind, "mode": member.mode, "mtime": int(member.mtime),
+                    "uid": member.uid, "gid": member.gid, "size": member.size if kind == "file" else 0
+                }
+                if kind in ("symlink", "hardlink"):
+                    entry["linkname"] = member.linkname
+                if kind == "file":
+                    f = tar.extractfile(member)
+                    entry["chunks"] = []
+                    for data in iter(lambda: f.read(CHUNK_SIZE), b""):
+                        digest, written = self._store_chunk(data, compressor)
+                        entry["chunks"].append(digest)
+                        stored += written
+                    size += member.size
+                entries.append(entry)
+
+        now = created_at or time.time()
+        snapshot_id = snapshot_id or self._new_id(now)
+        manifest = {
+            "snapshot_id": snapshot_id,
+            "startup_id": str(startup_id),
+            "label": label,
+            "auto": auto,
+            "created_at": now,
+            "files": sum(1 for entry in entries if entry["type"] == "file"),
+            "size": size,
+            "stored_bytes": stored,
+            "entries": entries
+        }
+        os.makedirs(self._manifest_dir(startup_id), exist_ok=True)
+        partial = self._manifest_path(startup_id, snapshot_id) + ".partial"
+        with open(partial, "w") as f:
+            json.dump(manifest, f)
+        os.replace(partial, self._manifest_path(startup_id, snapshot_id))
+
+        duration = time.time() - started
+        with self._lock:
+            self.snapshots_taken += 1
+            self.logical_bytes += size
+            self.stored_bytes += stored
+            self.last_snapshot_seconds = round(duration, 2)
+        print(f"Snapshot {snapshot_id} of {startup_id}: {manifest['files']} files, {size} bytes, {stored} new bytes stored in {duration:.1f}s")
+        if auto:
+            self._prune(startup_id)
+        return self._summary(manifest)
+
+    def submit(self, startup_id, fileobj, label="", auto=False):
+        """
+        Queues a snapshot of an archive already captured into fileobj (a seekable, e.g.
+        spooled, file the worker closes) and returns at once with its future summary:
+        {"snapshot_id", "label", "auto", "created_at", "pending": True}.
+        """
+        now = time.time()
+        snapshot_id = self._new_id(now)
+        with self._lock:
+            self._pending[snapshot_id] = threading.Event()
+        self._jobs.put((startup_id, fileobj, label, auto, snapshot_id, now))
+        self._ensure_worker()
+        return {"snapshot_id": snapshot_id, "label": label, "auto": auto, "created_at": now, "pending": True}
+
+    def schedule_gc(self):
+        """Asks the background worker for a garbage collection once it is idle."""
+        self._gc_due = True
+        self._ensure_worker()
+
+    def _ensure_worker(self):
+        with self._lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._work, name="snapshot-worker", daemon=True)
+                self._worker.start()
+
+    def _work(self):
+        while True:
+            wait = max(self._last_gc + GC_INTERVAL - time.time(), 0) if self._gc_due else None
+            try:
+                startup_id, fileobj, label, auto, snapshot_id, created_at = self._jobs.get(timeout=wait)
+            except queue.Empty:
+                self._gc_due = False
+                self._last_gc = time.time()
+                removed = self.collect_garbage()
+                with self._lock:
+                    self.gc_runs += 1
+                    self.gc_removed += removed
+                continue
+            try:
+                with fileobj:
+                    fileobj.seek(0)
+                    self.create(startup_id, fileobj, label=label, auto=auto, snapshot_id=snapshot_id, created_at=created_at)
+            except Exception as e:
+                print(f"Snapshot {snapshot_id} of {startup_id} failed: {e}")
+                with self._lock:
+                    self.background_failures += 1
+            finally:
+                with self._lock:
+                    done = self._pending.pop(snapshot_id, None)
+                if done:
+                    done.set()
+
+    @staticmethod
+    def _summary(manifest):
+        return {key: value for key, value in manifest.items() if key != "entries"}
+
+    def load(self, startup_id, snapshot_id):
+        """Returns the full manifest, or None if there is no such snapshot. Waits for one still being written."""
+        if not snapshot_id or os.path.basename(snapshot_id) != snapshot_id:
+            return None
+        with self._lock:
+            pending = self._pending.get(snapshot_id)
+        # The worker itself lists its snapshot (pruning) before marking it written
+        if pending and threading.current_thread() is not self._worker:
+            pending.wait(PENDING_WAIT)
+        try:
+            with open(self._manifest_path(startup_id, snapshot_id)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def list(self, startup_id):
+        """Returns the startup's snapshot summaries, newest first."""
+        directory = self._manifest_dir(startup_id)
+        if not os.path.isdir(directory):
+            return []
+        summaries = []
+        for name in sorted(os.listdir(directory), reverse=True):
+            if name.endswith(".json"):
+                manifest = self.load(startup_id, name[:-len(".json")])
+                if manifest:
+                    summaries.append(self._summary(manifest))
+        return summaries
+
+    def restore_plan(self, manifest, current):
+        """
+        Compares a manifest with the live workspace.
+        current: {tar name ("app/src/a.js"): {"type", "size", "mtime"}} listed from the container.
+        Returns (entries to send, names to delete first). Regular files whose size and mtime
+        match are assumed unchanged and skipped, the same quick check rsync uses.
+        """
+        wanted = {entry["name"].rstrip("/"): entry for entry in manifest["entries"]}
+        delete = sorted(
+            name for name, state in current.items()
+            if name not in wanted or wanted[name]["type"] != state["type"]
+        )
+        send = []
+        needed_links = {entry["linkname"] for entry in manifest["entries"] if entry["type"] == "hardlink"}
+        for name, entry in wanted.items():
+            state = current.get(name)
+            unchanged = entry["type"] == "file" and state and name not in delete and name not in needed_links \
+                and state["size"] == entry["size"] and int(state["mtime"]) == entry["mtime"]
+            if not unchanged:
+                send.append(entry)
+        return send, delete
+
+    def tar_stream(self, entries):
+        """Yields an uncompressed tar archive of the given manifest entries, reading chunks lazily."""
+        decompressor = zstandard.ZstdDecompressor()
+        for entry in entries:
+            info = tarfile.TarInfo(name=entry["name"])
+            info.type = _TAR_TYPE_CODES[entry["type"]]
+            info.mode = entry["mode"]
+            info.mtime = entry["mtime"]
+            info.uid = entry["uid"]
+            info.gid = entry["gid"]
+            info.linkname = entry.get("linkname", "")
+            info.size = entry["size"]
+            yield info.tobuf(format=tarfile.PAX_FORMAT)
+            if entry["type"] == "file":
+                for digest in entry["chunks"]:
+                    with open(self._chunk_path(digest), "rb") as f:
+                        yield decompressor.decompress(f.read())
+                remainder = entry["size"] % tarfile.BLOCKSIZE
+                if remainder:
+                    yield b"\0" * (tarfile.BLOCKSIZE - remainder)
+        yield b"\0" * (2 * tarfile.BLOCKSIZE)
+
+    def record_restore(self, duration):
+        with self._lock:
+            self.restores += 1
+            self.last_restore_seconds = round(duration, 2)
+
+    def delete(self, startup_id, snapshot_id=None):
+        """Deletes one snapshot, or all of the startup's snapshots, then collects unreferenced chunks."""
+        if snapshot_id:
+            if self.load(startup_id, snapshot_id) is None:
+                return False
+            os.remove(self._manifest_path(startup_id, snapshot_id))
+        else:
+            shutil.rmtree(self._manifest_dir(startup_id), ignore_errors=True)
+        self.schedule_gc()
+        return True
+
+    def _prune(self, startup_id):
+        """Keeps only the newest `keep` automatic snapshots of the startup."""
+        if not self.keep:
+            return
+        automatic = [s["snapshot_id"] for s in self.list(startup_id) if s.get("auto")]
+        expired = automatic[self.keep:]
+        for snapshot_id in expired:
+            os.remove(self._manifest_path(startup_id, snapshot_id))
+        if expired:
+            self.schedule_gc()
+
+    def collect_garbage(self):
+        """Removes chunks no manifest references (sparing recently written ones)."""
+        referenced = set()
+        manifests_dir = os.path.join(self.directory, "manifests")
+        for root, _, names in os.walk(manifests_dir):
+            for name in names:
+                if not name.endswith(".json"):
+                    continue
+                try:
+                    with open(os.path.join(root, name)) as f:
+                        for entry in json.load(f)["entries"]:
+                            referenced.update(entry.get("chunks", ()))
+                except (OSError, ValueError, KeyError):
+                    # An unreadable manifest would make its chunks look unreferenced
+                    print(f"Snapshot GC: skipping, unreadable manifest {name}")
+                    return 0
+        removed = 0
+        cutoff = time.time() - GC_GRACE
+        for root, _, names in os.walk(os.path.join(self.directory, "chunks")):
+            for name in names:
+                path = os.path.join(root, name)
+                if name.endswith(".zst") and name[:-len(".zst")] not in referenced and os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+                    removed += 1
+        return removed
+
+    def get_stats(self):
+        with self._lock:
+            return {
+                "snapshots_taken": self.snapshots_taken,
+                "restores": self.restores,
+                "logical_bytes": self.logical_bytes,
+                "stored_bytes": self.stored_bytes,
+                "dedup_ratio": round(self.logical_bytes / self.stored_bytes, 2) if self.stored_bytes else None,
+                "last_snapshot_seconds": self.last_snapshot_seconds,
+                "last_restore_seconds": self.last_restore_seconds,
+                "pending": len(self._pending),
+                "background_failures": self.background_failures,
+                "gc_runs": self.gc_runs,
+                "gc_removed_chunks": self.gc_removed
+            }
+
+workspace_snapshots = WorkspaceSnapshots()
@@ -2,6 +2,7 @@ from flask import request
 from flask_socketio import emit, disconnect, join_room, leave_room
 from app.extensions import socketio
 from app.startup_builder.manager import DockerManager
+from app.startup_builder.hibernation import hibernator
 import docker
 import threading
 import time
@@ -61,16 +62,18 @@ def start_terminal(data):
     
     sid = request.sid
     manager = DockerManager()
-    container_name = manager.get_container_name(startup_id)
+    container_name, docker_host = manager.lookup_placement(startup_id)
     
     try:
-        container = manager.client.containers.get(container_name)
-        if container.status != 'running':
+        client = manager.client_for(docker_host=docker_host)
+        container = client.containers.get(container_name)
+        hibernator.touch(container.name)
+        if container.status != 'running' and not hibernator.resume(container):
             container.start()
             
         # Use low-level API to create an exec instance with PTY
         # This allows for a persistent, interactive shell session
-        exec_id = manager.client.api.exec_create(
+        exec_id = client.api.exec_create(
             container.id,
             cmd="/bin/bash",
             stdin=True,
@@ -79,7 +82,7 @@ def start_terminal(data):
         )['Id']
         
         # Start the exec instance and get the raw socket
-        sock = manager.client.api.exec_start(
+        sock = client.api.exec_start(
             exec_id,
             detach=False,
             tty=True,
@@ -91,7 +94,7 @@ def start_terminal(data):
         thread.daemon = True
         thread.start()
         
-        active_streams[sid] = {'sock': sock, 'thread': thread, 'exec_id': exec_id}
+        active_streams[sid] = {'sock': sock, 'thread': thread, 'exec_id': exec_id, 'container_name': container.name, 'client': client}
         
     except docker.errors.NotFound:
         emit('output', {'data': f'Container {container_name} not found. Please start the environment.\r\n'})
@@ -110,6 +113,8 @@ def handle_input(data):
     if sid in active_streams:
         try:
             sock = active_streams[sid]['sock']
+            # Terminal input counts as activity for the idle scheduler
+            hibernator.touch(active_streams[sid]['container_name'])
             data_bytes = input_data.encode('utf-8')
             
             # Try different methods to write to the socket/file
@@ -147,8 +152,7 @@ def handle_resize(data):
     
     if exec_id:
         try:
-            manager = DockerManager()
-            manager.client.api.exec_resize(exec_id, height=rows, width=cols)
+            active_streams[sid]['client'].api.exec_resize(exec_id, height=rows, width=cols)
         except Exception as e:
             print(f"Error resizing terminal {sid}: {e}")
 
@@ -156,6 +160,26 @@ def handle_resize(data):
 # Builder Namespace - Environment Status Updates
 # ============================================
 
+def file_change_notifier(startup_id):
+    """Returns a change watcher callback that pushes file changes to the startup's room."""
+    def notify(changes):
+        socketio.emit('file_changes', {
+            'startup_id': startup_id,
+            'changes': changes
+        }, room=f"startup_{startup_id}", namespace='/builder')
+    return notify
+
+def container_log_notifier(startup_id):
+    """Returns a log stream callback that pushes new container output to the startup's room."""
+    def notify(text, offset):
+        socketio.emit('container_logs', {
+            'startup_id': startup_id,
+            'logs': text,
+            'start_offset': offset,
+            'offset': offset + len(text)
+        }, room=f"startup_{startup_id}", namespace='/builder')
+    return notify
+
 @socketio.on('connect', namespace='/builder')
 def builder_connect():
     print(f'Client connected to builder: {request.sid}')
@@ -198,7 +222,7 @@ def subscribe_to_startup(data):
     if startup and startup.container_name:
         manager = DockerManager()
         try:
-            container = manager.client.containers.get(startup.container_name)
+            container = manager.client_for(docker_host=startup.docker_host).containers.get(startup.container_name)
             if container.status == 'running':
                 ports = container.attrs['NetworkSettings']['Ports']
                 emit('env_status', {
@@ -206,6 +230,9 @@ def subscribe_to_startup(data):
                     'container_id': container.id,
                     'ports': ports
                 })
+                # Push file changes to this room instead of having the client poll
+                manager.watch_changes(startup_id, notify=file_change_notifier(startup_id))
+                manager.follow_logs(startup_id, notify=container_log_notifier(startup_id))
             else:
                 emit('env_status', {'status': 'stopped'})
         except:
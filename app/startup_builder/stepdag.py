@@ -0,0 +1,134 @@
+import threading
+
+STEP_PARALLELISM = 1 # steps run at once; 1 keeps plans strictly sequential
+# Commands the executor detaches as servers (they never exit)
+SERVER_COMMANDS = ("npm start", "node api.js", "python app.py", "python3 app.py")
+
+def is_server_command(command):
+    """Whether a command starts a server the executor runs in the background."""
+    return any(server in (command or "") for server in SERVER_COMMANDS)
+
+class StepScheduler:
+    """
+    Orders plan steps into waves from their optional "depends_on" ids.
+    A step's wave is one past the latest wave it depends on, and the plan is stably
+    reordered by wave, so each wave is a contiguous slice the executor can run
+    concurrently while current_step_index keeps working as before. Plans that declare
+    no dependencies (or have duplicate ids or a cycle) keep their order and run one
+    step at a time.
+    """
+    def __init__(self):
+        self.max_parallel = STEP_PARALLELISM
+        self._lock = threading.Lock()
+        self.plans = 0
+        self.parallel_plans = 0
+        self.sequential_fallbacks = 0 # plans with duplicate ids or dependency cycles
+        self.dropped_dependencies = 0 # ids that named no step of the plan
+        self.waves = 0
+        self.parallel_steps = 0
+        self.widest_wave = 0
+
+    def configure(self, max_parallel=STEP_PARALLELISM):
+        self.max_parallel = max(int(max_parallel or 1), 1)
+
+    def schedule(self, plan):
+        """Returns the plan reordered by wave, each step annotated with "wave", or the plan unchanged."""
+        with self._lock:
+            self.plans += 1
+        if self.max_parallel <= 1 or not any("depends_on" in step for step in plan):
+            return plan
+        ids = [str(step.get("id")) for step in plan]
+        if len(set(ids)) != len(ids):
+            return self._fallback(plan, "duplicate step ids")
+
+        dependencies = self._dependencies(plan, ids)
+        waves = {}
+        visiting = set()
+
+        def wave_of(i):
+            if i in waves:
+                return waves[i]
+            if i in visiting:
+                raise ValueError(f"dependency cycle through step {ids[i]}")
+            visiting.add(i)
+            waves[i] = 1 + max((wave_of(dep) for dep in dependencies[i]), default=-1)
+            visiting.discard(i)
+            return waves[i]
+
+        try:
+            for i in range(len(plan)):
+                wave_of(i)
+        except ValueError as e:
+            return self._fallback(plan, str(e))
+
+        order = sorted(range(len(plan)), key=lambda i: (waves[i], i))
+        with self._lock:
+            self.parallel_plans += 1
+        return [{**plan[i], "wave": waves[i]} for i in order]
+
+    def _dependencies(self, plan, ids):
+        """Per step, the indexes it waits on: declared ids plus the ordering no declaration may break."""
+        index = {step_id: i for i, step_id in enumerate(ids)}
+        dependencies = []
+        last_write = {} # Key: file path, Value: index of the latest earlier step writing it
+        for i, step in enumerate(plan):
+            declared = step.get("depends_on")
+            if isinstance(declared, (list, tuple)):
+                deps = set()
+                for step_id in declared:
+                    if str(step_id) in index and index[str(step_id)] != i:
+                        deps.add(index[str(step_id)])
+                    else:
+                        with self._lock:
+                            self.dropped_dependencies += 1
+            else:
+                # Undeclared: the step waits for the one before it, as in a sequential plan
+                deps = {i - 1} if i else set()
+            server = step.get("action") == "command" and is_server_command(step.get("command"))
+            if step.get("interactive") or step.get("background") or server:
+                # Interactive steps and background servers (declared or detected) see every earlier change
+                deps.update(range(i))
+            path = step.get("file_path") if step.get("action") == "write_file" else None
+            if path in last_write:
+                deps.add(last_write[path]) # Writes to one file keep their plan order
+            if path:
+                last_write[path] = i
+            dependencies.append(deps)
+        return dependencies
+
+    def _fallback(self, plan, reason):
+        print(f"Step scheduler: running plan sequentially ({reason})")
+        with self._lock:
+            self.sequential_fallbacks += 1
+        return plan
+
+    def next_wave(self, plan, idx):
+        """Returns the steps to run from plan[idx]: the rest of its wave, up to max_parallel steps."""
+        first = plan[idx]
+        wave = [first]
+        if self.max_parallel > 1 and "wave" in first and not first.get("interactive"):
+            for step in plan[idx + 1:]:
+                if len(wave) >= self.max_parallel or step.get("wave") != first["wave"] or step.get("interactive"):
+                    break
+                wave.append(step)
+        if len(wave) > 1:
+            with self._lock:
+                self.waves += 1
+                self.parallel_steps += len(wave)
+                self.widest_wave = max(self.widest_wave, len(wave))
+        return wave
+
+    def get_stats(self):
+        with self._lock:
+            return {
+                "max_parallel": self.max_parallel,
+                "plans": self.plans,
+                "parallel_plans": self.parallel_plans,
+                "sequential_fallbacks": self.sequential_fallbacks,
+                "dropped_dependencies": self.dropped_dependencies,
+                "parallel_waves": self.waves,
+                "parallel_steps": self.parallel_steps,
+                "widest_wave": self.widest_wave
+            }
+
+step_scheduler = StepScheduler()
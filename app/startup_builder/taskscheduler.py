@@ -0,0 +1,198 @@
+import contextvars
+import threading
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from .locks import workspace_locks
+
+TASK_WORKERS = 1 # tasks of one startup run at once; 1 keeps the task queue serial
+
+class TaskScheduler:
+    """
+    Runs a startup's pending tasks in parallel workers, in dependency order.
+    A task starts once the tasks it depends on have completed and it can claim the paths
+    it declared (workspace_locks), so tasks touching the same files never overlap.
+    Tasks that declare no dependencies wait for the task before them, and tasks that
+    declare no paths claim the whole workspace: a task list with neither runs exactly
+    like the serial queue. Only agent runs attached with parallel=True use workers
+    (runs that stop for step approvals stay serial).
+    Each worker acts as its task's owner: DockerManager runs its commands on a shell session
+    of its own and refuses its file writes outside the task's claimed paths.
+    """
+    def __init__(self):
+        self.max_workers = TASK_WORKERS
+        self._lock = threading.Lock()
+        self._runs = {} # Key: startup_id, Value: {"notify", "parallel"}
+        self.batches = 0
+        self.tasks_completed = 0
+        self.tasks_failed = 0
+        self.peak_workers = 0
+        self.claim_waits = 0 # times a ready task waited for another task's paths
+        self.dependency_fallbacks = 0 # task lists with a dependency cycle, run in queue order
+
+    def configure(self, max_workers=TASK_WORKERS):
+        self.max_workers = max(int(max_workers or 1), 1)
+
+    def attach(self, startup_id, notify=None, parallel=False):
+        """Registers an agent run. notify(progress) receives worker progress while tasks run."""
+        with self._lock:
+            self._runs[startup_id] = {"notify": notify, "parallel": parallel}
+
+    def detach(self, startup_id):
+        with self._lock:
+            self._runs.pop(startup_id, None)
+
+    def enabled(self, startup_id):
+        with self._lock:
+            run = self._runs.get(startup_id)
+            return self.max_workers > 1 and bool(run and run["parallel"])
+
+    def dependencies(self, tasks):
+        """
+        Per task id, the ids of the tasks it waits on among tasks (ids outside the list
+        are already done). Declared "depends_on" ids are used as given; a task without
+        one waits for the task before it. A cycle makes the whole list serial.
+        """
+        ids = [str(task["id"]) for task in tasks]
+        known = set(ids)
+        dependencies = {}
+        for i, task in enumerate(tasks):
+            declared = task.get("depends_on")
+            if isinstance(declared, (list, tuple)):
+                dependencies[ids[i]] = {str(dep) for dep in declared if str(dep) in known and str(dep) != ids[i]}
+            else:
+                dependencies[ids[i]] = {ids[i - 1]} if i else set()
+
+        # Kahn's algorithm: whatever cannot be ordered is part of a cycle
+        remaining = {task_id: set(deps) for task_id, deps in dependencies.items()}
+        while True:
+            ready = [task_id for task_id, deps in remaining.items() if not deps]
+            if not ready:
+                break
+            for task_id in ready:
+                remaining.pop(task_id)
+            for deps in remaining.values():
+                deps.difference_update(ready)
+        if remaining:
+            print(f"Task scheduler: dependency cycle among tasks {sorted(remaining)}; running them in queue order")
+            with self._lock:
+                self.dependency_fallbacks += 1
+            return {task_id: ({ids[i - 1]} if i else set()) for i, task_id in enumerate(ids)}
+        return dependencies
+
+    @staticmethod
+    def owner(task):
+        """Name a task's worker claims paths under and acts as (workspace_locks)."""
+        return f"task-{task['id']}"
+
+    def run(self, startup_id, tasks, run_task, completed_base=0):
+        """
+        tasks: task entries in queue order ({"id", "title"} plus optional "depends_on" and "paths").
+        run_task(task, log): runs one task to its end, reporting log lines through log(line);
+        returns a dict whose "status" is "completed" or "failed".
+        After a failure no further task starts; running ones are finished.
+        Returns {"completed": [task], "failed": [(task, result)], "not_run": [task], "logs": [line]},
+        lists in queue order, logs grouped per task.
+        """
+        dependencies = self.dependencies(tasks)
+        pending = list(tasks)
+        running = {} # Key: Future, Value: task
+        done = set()
+        results = {} # Key: task id, Value: run_task result
+        task_logs = {str(task["id"]): [] for task in tasks}
+        live_logs = [] # Lines in arrival order, for progress updates
+        with self._lock:
+            self.batches += 1
+
+        def log_for(task):
+            def log(line):
+                with self._lock:
+                    task_logs[str(task["id"])].append(line)
+                    live_logs.append(line)
+                    progress = {
+                        "completed_tasks": completed_base + len(done),
+                        "running_tasks": [other["title"] for other in running.values()],
+                        "logs": list(live_logs)
+                    }
+                self._notify(startup_id, progress)
+            return log
+
+        def start(task):
+            log_for(task)(f"Task Workers: Started task '{task['title']}'")
+            # The worker's writes are held to its claim, and its commands get a shell of their own
+            with workspace_locks.acting_as(startup_id, self.owner(task)):
+                return run_task(task, log_for(task))
+
+        stopping = False
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix=f"tasks-{startup_id}") as pool:
+            while True:
+                for task in list(pending):
+                    if stopping or len(running) >= self.max_workers:
+                        break
+                    if dependencies[str(task["id"])] - done:
+                        continue
+                    if not workspace_locks.claim(startup_id, self.owner(task), task.get("paths") or [""]):
+                        with self._lock:
+                            self.claim_waits += 1
+                        continue
+                    pending.remove(task)
+                    with self._lock:
+                        # Workers keep the caller's context variables (e.g. Flask's app context)
+                        running[pool.submit(contextvars.copy_context().run, start, task)] = task
+                        self.peak_workers = max(self.peak_workers, len(running))
+                if not running:
+                    break
+                finished, _ = wait(list(running), return_when=FIRST_COMPLETED)
+                for future in finished:
+                    with self._lock:
+                        task = running.pop(future)
+                    workspace_locks.release(startup_id, self.owner(task))
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        result = {"status": "failed", "error_history": [str(e)]}
+                    results[str(task["id"])] = result
+                    if result.get("status") == "completed":
+                        with self._lock:
+                            done.add(str(task["id"]))
+                        log_for(task)(f"Task Workers: Completed task '{task['title']}'")
+                    else:
+                        stopping = True
+                        log_for(task)(f"Task Workers: Task '{task['title']}' failed; no further tasks are started")
+
+        completed = [task for task in tasks if str(task["id"]) in done]
+        failed = [(task, results[str(task["id"])]) for task in tasks
+                  if str(task["id"]) in results and str(task["id"]) not in done]
+        with self._lock:
+            self.tasks_completed += len(completed)
+            self.tasks_failed += len(failed)
+        return {
+            "completed": completed,
+            "failed": failed,
+            "not_run": pending,
+            "logs": [line for task in tasks for line in task_logs[str(task["id"])]]
+        }
+
+    def _notify(self, startup_id, progress):
+        """progress: {"completed_tasks", "running_tasks": [title], "logs": [line]} of the current batch."""
+        with self._lock:
+            run = self._runs.get(startup_id)
+            notify = run and run["notify"]
+        if notify:
+            try:
+                notify(progress)
+            except Exception as e:
+                print(f"Task progress notification failed for {startup_id}: {e}")
+
+    def get_stats(self):
+        with self._lock:
+            return {
+                "max_workers": self.max_workers,
+                "parallel_runs": sum(1 for run in self._runs.values() if run["parallel"]),
+                "batches": self.batches,
+                "tasks_completed": self.tasks_completed,
+                "tasks_failed": self.tasks_failed,
+                "peak_workers": self.peak_workers,
+                "claim_waits": self.claim_waits,
+                "dependency_fallbacks": self.dependency_fallbacks
+            }
+
+task_scheduler = TaskScheduler()
@@ -0,0 +1,174 @@
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+import uuid
+from .pkgcache import package_caches
+
+TEMPLATE_MARKER = ".template.json"
+TEMPLATE_LABEL = "startup_builder.template_build"
+
+# Project skeletons, built once per stack image and copied into every new workspace
+# volume. Changing a script (or the stack image) produces a new template version.
+TEMPLATE_SCRIPTS = {
+    "MERN": "npx --yes create-react-app . --use-npm",
+    "NextJS": "npx --yes create-next-app . --js --eslint --app --no-src-dir --no-tailwind --import-alias '@/*' --use-npm",
+    "Python-Data": """cat > app.py <<'EOF'
+from flask import Flask
+
+app = Flask(__name__)
+
+
+@app.route("/")
+def index():
+    return "Hello from your startup!"
+
+
+if __name__ == "__main__":
+    app.run(host="0.0.0.0", port=8000)
+EOF
+printf 'flask\\npandas\\nnumpy\\n' > requirements.txt"""
+}
+
+_FINISH_SCRIPT = """
+[ -f README.md ] || printf '# Project\\n\\nCreated from the __STACK__ project template.\\n' > README.md
+printf '%s\\n' '__MARKER__' > __MARKER_FILE__
+"""
+
+class ProjectTemplates:
+    """
+    Pre-initialized project skeletons per stack, stored as gzipped tarballs of /app.
+    A template is built in a throwaway container of the stack image (in the background,
+    with the package caches mounted) and then extracted into fresh workspace volumes by
+    put_archive, which takes seconds instead of the minutes the init command takes.
+    Seeded workspaces carry TEMPLATE_MARKER, which tells the agent to skip initialization.
+    """
+    def __init__(self):
+        self.directory = os.path.join(tempfile.gettempdir(), "startup_builder_templates")
+        self._lock = threading.Lock()
+        self._building = set() # template keys
+        self.seeded = 0
+        self.misses = 0
+        self.build_seconds = {} # Key: stack_type, Value: duration of the last build
+
+    def configure(self, directory):
+        if directory:
+            self.directory = directory
+
+    @staticmethod
+    def version(stack_type, image_tag):
+        """Template version: changes with the init script and the stack image."""
+        script = TEMPLATE_SCRIPTS.get(stack_type, "")
+        return hashlib.sha256(f"{image_tag}\0{script}\0{_FINISH_SCRIPT}".encode('utf-8')).hexdigest()[:12]
+
+    def _path(self, stack_type, version):
+        return os.path.join(self.directory, f"{stack_type.lower()}-{version}.tar.gz")
+
+    def ensure_async(self, client, stack_type, image_tag):
+        """Starts building the template for stack_type in the background unless it exists or is building."""
+        if stack_type not in TEMPLATE_SCRIPTS:
+            return
+        version = self.version(stack_type, image_tag)
+        key = (stack_type, version)
+        with self._lock:
+            if key in self._building or os.path.exists(self._path(stack_type, version)):
+                return
+            self._building.add(key)
+        threading.Thread(target=self._build_and_release, args=(client, stack_type, image_tag, version), daemon=True).start()
+
+    def _build_and_release(self, client, stack_type, image_tag, version):
+        try:
+            self.build(client, stack_type, image_tag, version)
+        except Exception as e:
+            print(f"Error building {stack_type} project template: {e}")
+        finally:
+            with self._lock:
+                self._building.discard((stack_type, version))
+
+    def build(self, client, stack_type, image_tag, version):
+        print(f"Building {stack_type} project template ({version})...")
+        started = time.time()
+        cache_volumes, cache_environment = package_caches.mounts(client, stack_type)
+        container = client.containers.run(
+            image_tag,
+            command="tail -f /dev/null",
+            detach=True,
+            name=f"startup_template_{uuid.uuid4().hex[:12]}",
+            volumes=cache_volumes,
+            working_dir="/app",
+            environment=cache_environment,
+            labels={TEMPLATE_LABEL: stack_type}
+        )
+        try:
+            marker = json.dumps({"stack": stack_type, "version": version})
+            script = TEMPLATE_SCRIPTS[stack_type] + _FINISH_SCRIPT.replace("__STACK__", stack_type) \
+                .replace("__MARKER__", marker).replace("__MARKER_FILE__", TEMPLATE_MARKER)
+            exit_code, output = container.exec_run(["bash", "-c", "set -e\n" + script], workdir="/app")
+            if exit_code != 0:
+                raise RuntimeError(output.decode('utf-8', errors='replace')[-2000:])
+
+            os.makedirs(self.directory, exist_ok=True)
+            path = self._path(stack_type, version)
+            partial = f"{path}.{uuid.uuid4().hex[:8]}.partial"
+            stream, _ = container.get_archive("/app")
+            # Docker accepts gzipped archives in put_archive, so the tarball is stored compressed
+            with gzip.open(partial, "wb", compresslevel=1) as f:
+                for chunk in stream:
+                    f.write(chunk)
+            os.replace(partial, path)
+        finally:
+            container.remove(force=True)
+
+        duration = time.time() - started
+        with self._lock:
+            self.build_seconds[stack_type] = round(duration, 2)
+        print(f"Built {stack_type} project template in {duration:.1f}s")
+        self._prune(stack_type, version)
+
+    def _prune(self, stack_type, version):
+        """Removes the stack's older template versions."""
+        prefix = f"{stack_type.lower()}-"
+        for name in os.listdir(self.directory):
+            if name.startswith(prefix) and name.endswith(".tar.gz") and name != os.path.basename(self._path(stack_type, version)):
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except OSError:
+                    pass
+
+    def seed(self, client, container, stack_type, image_tag):
+        """
+        Extracts the stack's template into the container's (empty) /app.
+        Returns the template version, or None if none is built yet (a build is then started).
+        """
+        if stack_type not in TEMPLATE_SCRIPTS:
+            return None
+        version = self.version(stack_type, image_tag)
+        path = self._path(stack_type, version)
+        try:
+            with open(path, "rb") as f:
+                container.put_archive("/", f)
+        except FileNotFoundError:
+            with self._lock:
+                self.misses += 1
+            self.ensure_async(client, stack_type, image_tag)
+            return None
+        with self._lock:
+            self.seeded += 1
+        return version
+
+    def get_stats(self):
+        with self._lock:
+            available = sorted(name for name in os.listdir(self.directory) if name.endswith(".tar.gz")) \
+                if os.path.isdir(self.directory) else []
+            return {
+                "templates": available,
+                "building": sorted(stack for stack, _ in self._building),
+                "seeded": self.seeded,
+                "misses": self.misses,
+                "last_build_seconds": dict(self.build_seconds)
+            }
+
+project_templates = ProjectTemplates()
@@ -0,0 +1,179 @@
+import threading
+import time
+from .filetree import TREE_EXCLUDES
+from .shell import iter_exec_frames
+
+# Events are flushed once the workspace has been quiet for DEBOUNCE seconds,
+# or at the latest MAX_DELAY seconds after the first buffered event
+DEBOUNCE = 0.3
+MAX_DELAY = 2.0
+
+# Files the feed ignores: the dev server appends to its log continuously
+IGNORED_FILES = ("app.log",)
+
+_EXCLUDE_REGEX = "(^|/)(" + "|".join(name.replace(".", "\\.") for name in TREE_EXCLUDES) + ")(/|$)|/app\\.log$"
+_PRUNE = "\\( " + " -o ".join(f"-name '{name}'" for name in TREE_EXCLUDES) + " \\) -prune"
+
+# Runs in the container for as long as the exec stream is open. Prefers inotify; images
+# without inotify-tools fall back to a once-a-second mtime scan (deletions then show up
+# as a modified parent directory).
+WATCH_SCRIPT = f"""
+cd /app
+if command -v inotifywait >/dev/null 2>&1; then
+  exec inotifywait -m -r -q --format '%e|%w%f' \\
+    -e close_write -e create -e delete -e moved_from -e moved_to \\
+    --exclude '{_EXCLUDE_REGEX}' /app
+fi
+stamp=/tmp/.watch_stamp
+touch $stamp
+while sleep 1; do
+  touch $stamp.new
+  # A failed write means the host closed the stream
+  find . {_PRUNE} -o -newer $stamp -printf 'MODIFY|%p\\n' || exit 0
+  mv -f $stamp.new $stamp
+done
+"""
+
+def _classify(events):
+    """Maps inotify event names (e.g. 'CREATE,ISDIR') to created/deleted/modified."""
+    if "CREATE" in events or "MOVED_TO" in events:
+        return "created"
+    if "DELETE" in events or "MOVED_FROM" in events:
+        return "deleted"
+    return "modified"
+
+def _coalesce(previous, current):
+    """Folds two events for one path into one; None means the path nets out unchanged."""
+    if previous == "created" and current == "deleted":
+        return None
+    if previous == "created":
+        return "created"
+    if previous == "deleted" and current == "created":
+        return "modified"
+    return current
+
+def _relative(path):
+    """'/app/src/a.js' or './src/a.js' -> 'src/a.js'"""
+    for prefix in ("/app/", "./"):
+        if path.startswith(prefix):
+            return path[len(prefix):]
+    return "" if path in ("/app", ".") else path
+
+class ChangeWatcher:
+    """
+    A watcher process inside one container, streaming change events over an exec socket.
+    Events are debounced and coalesced per path before on_change(changes) is called with
+    [{"path", "event", "is_dir"}], paths relative to /app.
+    """
+    def __init__(self, client, container, on_change):
+        self.container = container
+        self.on_change = on_change
+        self.alive = True
+        self._lock = threading.Lock()
+        self._buffer = {} # Key: path, Value: {"event", "is_dir"}
+        self._first_at = None
+        self._last_at = None
+        self.events = 0
+        self.flushes = 0
+
+        exec_id = client.api.exec_create(container.id, cmd=["bash", "-c", WATCH_SCRIPT], stdin=False, tty=False)['Id']
+        self._sock = client.api.exec_start(exec_id, detach=False, tty=False, socket=True)
+        threading.Thread(target=self._read_loop, daemon=True).start()
+        threading.Thread(target=self._flush_loop, daemon=True).start()
+
+    def _read_loop(self):
+        pending = b""
+        try:
+            for stream, payload in iter_exec_frames(self._sock):
+                if stream != 1: # stderr: inotifywait warnings
+                    continue
+                pending += payload
+                *lines, pending = pending.split(b"\n")
+                for line in lines:
+                    self._record(line.decode('utf-8', errors='replace'))
+        except Exception as e:
+            print(f"Change watcher read error for {self.container.name}: {e}")
+        finally:
+            self.alive = False
+
+    def _record(self, line):
+        events, _, path = line.partition("|")
+        path = _relative(path)
+        if not path or path.split("/")[-1] in IGNORED_FILES:
+            return
+        event = _classify(events)
+        now = time.time()
+        with self._lock:
+            self.events += 1
+            previous = self._buffer.get(path)
+            merged = _coalesce(previous["event"], event) if previous else event
+            if merged is None:
+                del self._buffer[path]
+            else:
+                self._buffer[path] = {"event": merged, "is_dir": "ISDIR" in events}
+            self._first_at = self._first_at or now
+            self._last_at = now
+
+    def _flush_loop(self):
+        while self.alive:
+            time.sleep(DEBOUNCE / 3)
+            now = time.time()
+            with self._lock:
+                if not self._first_at:
+                    continue
+                if now - self._last_at < DEBOUNCE and now - self._first_at < MAX_DELAY:
+                    continue
+                buffered, self._buffer = self._buffer, {}
+                self._first_at = self._last_at = None
+            if not buffered:
+                continue
+            self.flushes += 1
+            changes = [dict(change, path=path) for path, change in sorted(buffered.items())]
+            try:
+                self.on_change(changes)
+            except Exception as e:
+                print(f"Change watcher callback error for {self.container.name}: {e}")
+
+    def close(self):
+        self.alive = False
+        try:
+            self._sock.close()
+        except Exception:
+            pass
+
+class ChangeWatcherPool:
+    """Process-wide map of container id -> ChangeWatcher; dead watchers are replaced on ensure()."""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._watchers = {} # Key: container id, Value: ChangeWatcher
+
+    def ensure(self, client, container, on_change):
+        with self._lock:
+            watcher = self._watchers.get(container.id)
+            if watcher and watcher.alive:
+                return watcher
+            watcher = ChangeWatcher(client, container, on_change)
+            self._watchers[container.id] = watcher
+            return watcher
+
+    def is_watching(self, container_id):
+        with self._lock:
+            watcher = self._watchers.get(container_id)
+            return bool(watcher and watcher.alive)
+
+    def stop(self, container_id):
+        with self._lock:
+            watcher = self._watchers.pop(container_id, None)
+        if watcher:
+            watcher.close()
+
+    def get_stats(self):
+        with self._lock:
+            watchers = [w for w in self._watchers.values() if w.alive]
+            return {
+                "watchers": len(watchers),
+                "events": sum(w.events for w in watchers),
+                "flushes": sum(w.flushes for w in watchers)
+            }
+
+change_watchers = ChangeWatcherPool()
@@ -28,6 +28,8 @@ const StartupCodeStudio: React.FC = () => {
     const [taskStatus, setTaskStatus] = useState<string>('idle');
     const logsEndRef = useRef<HTMLDivElement>(null);
     const socketRef = useRef<Socket | null>(null);
+    // Offset of the container log text shown, or null when the log modal shows something else
+    const containerLogsOffsetRef = useRef<number | null>(null);
 
     // New State for Refactor
     const [showChatModal, setShowChatModal] = useState(false);
@@ -159,6 +161,14 @@ const StartupCodeStudio: React.FC = () => {
             }
         });
 
+        socket.on('container_logs', (data) => {
+            // Append pushed output only if it continues exactly where the shown text ends
+            if (containerLogsOffsetRef.current === data.start_offset) {
+                setContainerLogs(prev => prev + data.logs);
+                containerLogsOffsetRef.current = data.offset;
+            }
+        });
+
         socket.on('disconnect', () => {
             console.log('Disconnected from builder namespace');
         });
@@ -444,14 +454,22 @@ const StartupCodeStudio: React.FC = () => {
 
     const fetchContainerLogs = async () => {
         try {
-            const res = await fetch(`/api/builder/${id}/container-logs`);
+            // Only fetch what is new since the text already shown
+            const offset = containerLogsOffsetRef.current;
+            const query = offset !== null ? `?offset=${offset}` : '';
+            const res = await fetch(`/api/builder/${id}/container-logs${query}`);
             const data = await res.json();
-            if (data.logs) {
+            if (data.error || (offset === null && !data.logs)) {
+                alert("No logs found or container not running.");
+                return;
+            }
+            if (offset === null || data.reset) {
                 setContainerLogs(data.logs);
-                setShowContainerLogs(true);
             } else {
-                alert("No logs found or container not running.");
+                setContainerLogs(prev => prev + data.logs);
             }
+            containerLogsOffsetRef.current = data.offset;
+            setShowContainerLogs(true);
         } catch (e) {
             console.error(e);
             alert("Error fetching logs.");
@@ -549,11 +567,10 @@ const StartupCodeStudio: React.FC = () => {
                     {ports && Object.entries(ports).map(([port, mappings]) => {
                         const maps = mappings as any[];
                         if (!maps || maps.length === 0) return null;
-                        const hostPort = maps[0].HostPort;
                         return (
                             <a
                                 key={port}
-                                href={`http://${window.location.hostname}:${hostPort}`}
+                                href={`/preview/${id}:${port.split('/')[0]}/`}
                                 target="_blank"
                                 rel="noopener noreferrer"
                                 className="flex items-center gap-2 bg-blue-600 hover:bg-blue-700 px-3 py-1.5 rounded text-sm font-medium transition-colors"
@@ -854,6 +871,7 @@ const StartupCodeStudio: React.FC = () => {
                                             <button
                                                 onClick={() => {
                                                     setContainerLogs(parsedLog.details); // Reuse container logs modal for simplicity
+                                                    containerLogsOffsetRef.current = null;
                                                     setShowContainerLogs(true);
                                                 }}
                                                 className="shrink-0 text-[10px] bg-gray-800 hover:bg-gray-700 text-gray-400 px-1.5 py-0.5 rounded border border-gray-700 transition-colors"
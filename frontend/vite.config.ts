@@ -16,6 +16,10 @@ export default defineConfig(({ mode }) => {
           target: 'http://127.0.0.1:5000',
           changeOrigin: true,
         },
+        '/preview': {
+          target: 'http://127.0.0.1:5000',
+          ws: true,
+        },
         '/socket.io': {
           target: 'http://127.0.0.1:5000',
           ws: true,
@@ -0,0 +1,26 @@
+"""Add workspace_volume to Startup model
+
+Revision ID: 3e8d1c6f2a9b
+Revises: 94fc951de216
+Create Date: 2026-10-18 10:12:31.482913
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3e8d1c6f2a9b'
+down_revision = '94fc951de216'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('startups', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('workspace_volume', sa.String(length=100), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('startups', schema=None) as batch_op:
+        batch_op.drop_column('workspace_volume')
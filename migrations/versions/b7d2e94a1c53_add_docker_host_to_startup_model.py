@@ -0,0 +1,26 @@
+"""Add docker_host to Startup model
+
+Revision ID: b7d2e94a1c53
+Revises: 3e8d1c6f2a9b
+Create Date: 2026-10-18 14:03:52.117406
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7d2e94a1c53'
+down_revision = '3e8d1c6f2a9b'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('startups', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('docker_host', sa.String(length=255), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('startups', schema=None) as batch_op:
+        batch_op.drop_column('docker_host')
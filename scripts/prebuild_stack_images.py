@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""
+Builds the startup builder stack images ahead of time.
+Images are labelled with a hash of their stack directory, so stacks that
+haven't changed since the last build are skipped.
+
+Usage: python scripts/prebuild_stack_images.py [MERN NextJS Python-Data]
+This version doesn't require the Flask app to be running.
+"""
+import sys
+import os
+
+# Add parent directory to path to import app modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.startup_builder.manager import DockerManager, image_cache
+
+def prebuild(stack_types=None):
+    manager = DockerManager()
+    results = manager.prebuild_images(stack_types)
+    if "error" in results and isinstance(results["error"], str):
+        print(f"Error: {results['error']}")
+        print("\nMake sure Docker is running and you have permission to access it.")
+        return False
+
+    ok = True
+    for stack_type, result in results.items():
+        if isinstance(result, dict):
+            print(f"✗ {stack_type}: {result['error']}")
+            ok = False
+        else:
+            print(f"✓ {stack_type}: {result}")
+
+    stats = image_cache.get_stats()
+    print(f"\nCache hits: {stats['hits']}, builds: {stats['misses']}")
+    for stack_type, seconds in stats["last_build_seconds"].items():
+        print(f"  {stack_type} built in {seconds}s")
+    return ok
+
+if __name__ == '__main__':
+    print("=" * 60)
+    print("Stack Image Prebuild")
+    print("=" * 60)
+    if not prebuild(sys.argv[1:] or None):
+        sys.exit(1)
@@ -0,0 +1,105 @@
+import eventlet
+eventlet.monkey_patch() # As run.py does, before anything else is imported
+
+import sys
+import os
+import asyncio
+import contextvars
+import threading
+import time
+
+# Add app to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.startup_builder.asyncengine import docker_loop
+
+request_id = contextvars.ContextVar("request_id", default=None)
+
+def test_loop_runs_on_os_thread():
+    print("Testing the Docker event loop under eventlet...")
+
+    async def sleeper(i):
+        await asyncio.sleep(0.3)
+        return i, request_id.get()
+
+    def caller(i):
+        request_id.set(i)
+        return docker_loop.run(sleeper(i), timeout=5)
+
+    ticks = []
+    def ticker():
+        for _ in range(10):
+            ticks.append(time.time())
+            eventlet.sleep(0.05)
+
+    started = time.time()
+    pool = eventlet.GreenPool()
+    pool.spawn(ticker)
+    results = list(pool.imap(caller, range(20)))
+    pool.waitall()
+    elapsed = time.time() - started
+
+    assert results == [(i, i) for i in range(20)], f"Unexpected results {results}"
+    print("PASS: Results and caller context variables come back to the green threads")
+    assert elapsed < 2, f"20 concurrent operations took {elapsed:.1f}s"
+    print(f"PASS: 20 operations ran concurrently ({elapsed:.2f}s)")
+    assert len(ticks) == 10, f"The hub ticked {len(ticks)} times instead of 10"
+    print("PASS: The eventlet hub kept running while the loop waited")
+    assert docker_loop.get_stats()["eventlet_bridge"], "No hub bridge under monkey-patching"
+    print("PASS: Results go back through the hub bridge")
+
+def test_shared_state_stays_on_hub():
+    print("\nTesting shared state access from coroutines...")
+    shared_lock = threading.Lock() # Green under monkey-patching, like the app's caches
+    touched = []
+
+    def touch(value):
+        with shared_lock:
+            touched.append(value)
+        return value
+
+    def blocking(value):
+        eventlet.sleep(0.2) # A green blocking call, like a docker-py request
+        return value * 2
+
+    async def worker(i):
+        await docker_loop.call_shared(touch, i)
+        return await docker_loop.run_blocking(blocking, i)
+
+    def holder():
+        # Hold the lock while the coroutines want it, so they have to wait on the hub
+        with shared_lock:
+            eventlet.sleep(0.2)
+
+    eventlet.spawn(holder)
+    eventlet.sleep(0)
+    results = docker_loop.gather([worker(i) for i in range(10)], timeout=5)
+    assert results == [i * 2 for i in range(10)], f"Unexpected results {results}"
+    assert sorted(touched) == list(range(10)), f"Unexpected shared state {touched}"
+    print("PASS: Contended green locks and green blocking calls work from coroutines")
+
+def test_timeout_cancels():
+    print("\nTesting timeouts...")
+    cancelled = []
+
+    async def hang():
+        try:
+            await asyncio.sleep(30)
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+
+    try:
+        docker_loop.run(hang(), timeout=0.3)
+        assert False, "Expected a TimeoutError"
+    except TimeoutError:
+        pass
+    eventlet.sleep(0.2)
+    assert cancelled, "The timed-out coroutine was not cancelled"
+    print("PASS: A caller that stops waiting cancels the operation")
+
+if __name__ == "__main__":
+    test_loop_runs_on_os_thread()
+    test_shared_state_stays_on_hub()
+    test_timeout_cancels()
+    print("\nAll eventlet loop checks passed.")